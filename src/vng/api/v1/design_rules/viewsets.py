@@ -1,4 +1,3 @@
-from django.http.response import JsonResponse
 from django.shortcuts import get_object_or_404
 
 from rest_framework import mixins, permissions
@@ -12,6 +11,8 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from vng.api_authentication.authentication import CustomTokenAuthentication
 from vng.design_rules.models import DesignRuleTestSuite, DesignRuleSession, DesignRuleTestVersion
 from vng.servervalidation.serializers import ServerRunResultShield
+from vng.utils import badges
+from vng.utils.badges import badge_response
 
 from .serializers import DesignRuleSessionSerializer, DesignRuleTestSuiteSerializer, DesignRuleTestVersionSerializer, StartSessionSerializer
 
@@ -82,6 +83,9 @@ class DesignRuleSessionShieldView(APIView):
         """
         Get the shield badge to display on a website.
         """
+        return badge_response(request, badges.DESIGN_RULE_SESSION, uuid, lambda: self.get_badge(uuid))
+
+    def get_badge(self, uuid):
         session = get_object_or_404(DesignRuleSession, uuid=uuid)
 
         if session.percentage_score == 100:
@@ -99,4 +103,4 @@ class DesignRuleSessionShieldView(APIView):
             'isError': is_error,
         }
 
-        return JsonResponse(result)
+        return result
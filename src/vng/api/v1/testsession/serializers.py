@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.conf import settings
 from subdomains.utils import reverse as reverse_sub
 
-from vng.testsession.models import SessionType, ExposedUrl, Session, ScenarioCase
+from vng.testsession.models import SessionType, ExposedUrl, Session, SessionSummary, ScenarioCase
 
 
 class SessionTypesSerializer(serializers.ModelSerializer):
@@ -48,8 +48,17 @@ class ExposedUrlSerializer(serializers.ModelSerializer):
         return v
 
 
+class SessionSummarySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = SessionSummary
+        fields = ['success', 'failed', 'not_called', 'calls', 'last_call']
+
+
 class SessionStatusSerializer(serializers.ModelSerializer):
 
+    summary = SessionSummarySerializer(read_only=True)
+
     class Meta:
         model = Session
         fields = [
@@ -59,7 +68,8 @@ class SessionStatusSerializer(serializers.ModelSerializer):
             'stopped',
             'status',
             'deploy_status',
-            'deploy_percentage'
+            'deploy_percentage',
+            'summary'
         ]
 
 
@@ -67,6 +77,7 @@ class SessionSerializer(serializers.ModelSerializer):
 
     exposedurl_set = ExposedUrlSerializer(read_only=True, many=True)
     build_version = serializers.CharField(required=False)
+    summary = SessionSummarySerializer(read_only=True)
 
     session_type = serializers.SlugRelatedField(
         slug_field='name',
@@ -83,7 +94,8 @@ class SessionSerializer(serializers.ModelSerializer):
             'status',
             'exposedurl_set',
             'build_version',
-            'sandbox'
+            'sandbox',
+            'summary'
         ]
         read_only_fields = ['started', 'stopped', 'status']
 
@@ -3,7 +3,10 @@ from rest_framework import routers
 from django.urls import path
 
 from vng.testsession import apps
-from .views import SessionViewSet, SessionTypesViewSet, ExposedUrlView, SessionViewStatusSet, ResultSessionView, ResultTestsessionViewShield, StopSessionView
+from .views import (
+    SessionViewSet, SessionTypesViewSet, ExposedUrlView, SessionViewStatusSet, ResultSessionView,
+    ResultTestsessionViewShield, StopSessionView, UpstreamPoolStatsView, ProxyMetricsView, ExportSessionView
+)
 
 
 app_name = apps.AppConfig.__name__
@@ -20,4 +23,7 @@ urlpatterns = router.urls + [
     path('testsession-run-shield/<uuid:uuid>/', ResultTestsessionViewShield.as_view(), name='testsession-shield'),
     path('testsessions/<uuid:uuid>/stop', StopSessionView.as_view(), name='stop_session'),
     path('testsessions/<uuid:uuid>/result', ResultSessionView.as_view(), name='result_session'),
+    path('testsessions/<uuid:uuid>/export/<str:export_format>', ExportSessionView.as_view(), name='export_session'),
+    path('upstream-stats', UpstreamPoolStatsView.as_view(), name='upstream_stats'),
+    path('metrics', ProxyMetricsView.as_view(), name='proxy_metrics'),
 ]
@@ -1,19 +1,18 @@
 import json
-import re
 import logging
-from urllib import parse
+import time
 
-from subdomains.utils import reverse as reverse_sub
 from django.shortcuts import get_object_or_404
 from django.views import View
 from django.utils import timezone
-from django.db.models import Count
 from django.core.exceptions import PermissionDenied
+from django.conf import settings
 from django.http import (
-    Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+    Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 )
 
 import requests
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework import generics, permissions, viewsets, views, mixins
 from rest_framework.authentication import (
     SessionAuthentication
@@ -21,12 +20,25 @@ from rest_framework.authentication import (
 from drf_spectacular.utils import extend_schema
 
 from vng.testsession.models import (
-    ScenarioCase, Session, SessionLog, SessionType, ExposedUrl, Report,
-    QueryParamsScenario, InjectHeader
+    ScenarioCase, Session, SessionLog, SessionSummary, SessionType, ExposedUrl
 )
+from vng.testsession.context import get_proxy_context
+from vng.testsession.export import CONTENT_TYPES, EXPORTERS
+from vng.testsession.logwriter import flush_log_writer, get_log_writer
+from vng.testsession.matching import get_case_index
+from vng.testsession.replay import replay_call
+from vng.testsession.results import SessionResult
+from vng.testsession.rewrite import (
+    BINARY, MULTIPART, BodyCapture, binary_log_text, body_kind, decode_stream,
+    log_body, replay_upstream
+)
+from vng.testsession.timing import PhaseTimer, render_metrics
+from vng.testsession.upload import Upload, is_large_upload
+from vng.testsession.upstream import get_upstream_client
 
 from vng.servervalidation.serializers import ServerRunResultShield
-from vng.utils import choices
+from vng.utils import badges, choices
+from vng.utils.badges import badge_response
 from vng.utils.views import CSRFExemptMixin
 
 from vng.testsession.permission import IsOwner
@@ -36,7 +48,7 @@ from .serializers import (
 )
 from vng.testsession.views import bootstrap_session
 from vng.testsession.task import run_tests, stop_session
-from vng.utils.auth import get_jwt
+from vng.utils.auth import get_jwt_credentials
 
 from vng.api_authentication.authentication import CustomTokenAuthentication
 
@@ -54,7 +66,7 @@ class SessionViewStatusSet(
     serializer_class = SessionStatusSerializer
     authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
     permission_classes = (permissions.IsAuthenticated, IsOwner)
-    queryset = Session.objects.all()
+    queryset = Session.objects.select_related('summary')
     lookup_field = 'uuid'
 
 
@@ -85,7 +97,9 @@ class SessionViewSet(
     lookup_field = 'uuid'
 
     def get_queryset(self):
-        return Session.objects.all().prefetch_related('exposedurl_set').filter(user=self.request.user)
+        return Session.objects.all().select_related('summary').prefetch_related('exposedurl_set').filter(
+            user=self.request.user
+        )
 
     def perform_create(self, serializer):
         session = serializer.save(
@@ -115,6 +129,7 @@ class StopSessionView(generics.ListAPIView):
     def perform_operations(self, session):
         if session.status == choices.StatusChoices.stopped or session.status == choices.StatusChoices.shutting_down:
             return
+        flush_log_writer()
         stop_session.delay(session.uuid)
         session.status = choices.StatusChoices.shutting_down
         session.save()
@@ -143,45 +158,29 @@ class ResultSessionView(views.APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request, uuid, *args, **kwargs):
-        res = None
         session = self.get_object()
         if session.user != request.user:
             raise PermissionDenied
-        scenario_cases = session.session_type.scenario_cases
-        report = list(Report.objects.filter(session_log__session=session))
-
-        def check(scenario_cases, report):
-            if len(report) == 0:
-                return {'result': 'Geen oproep uitgevoerd'}
-            for rp in report:
-                if rp.result == choices.HTTPCallChoices.failed:
-                    return {'result': 'mislukt'}
-            if len(report) < len(scenario_cases):
-                return {'result': 'Gedeeltelijk succesvol'}
-            else:
-                return {'result': 'Succesvol'}
+        result = SessionResult(session)
 
-        if len(scenario_cases) == 0:
+        if not result.has_cases():
             res = {'result': 'No scenario cases available'}
+        elif not result.reports:
+            res = {'result': 'Geen oproep uitgevoerd'}
+        elif result.is_failed():
+            res = {'result': 'mislukt'}
+        elif len(result.reports) < len(result.cases):
+            res = {'result': 'Gedeeltelijk succesvol'}
         else:
-            res = check(scenario_cases, report)
-
-        res['report'] = []
-        for case in scenario_cases:
-            is_in = False
-            for rp in report:
-                if rp.scenario_case == case:
-                    is_in = True
-                    break
-            if not is_in:
-                report.append(Report(scenario_case=case))
-
-        for rp in report:
-            call = {
-                'scenario_case': ScenarioCaseSerializer(rp.scenario_case).data
+            res = {'result': 'Succesvol'}
+
+        res['report'] = [
+            {
+                'scenario_case': ScenarioCaseSerializer(rp.scenario_case).data,
+                'result': rp.result,
             }
-            call['result'] = rp.result
-            res['report'].append(call)
+            for rp in result.case_reports()
+        ]
 
         res['test_session_url'] = session.get_absolute_request_url(request)
         response = HttpResponse(json.dumps(res))
@@ -193,6 +192,30 @@ class ResultSessionView(views.APIView):
         return self.session
 
 
+class ExportSessionView(views.APIView):
+    """
+    Export of a Session
+
+    Stream all the calls logged for the session, with the scenario cases they matched, as NDJSON
+    (`ndjson`) or as a HAR 1.2 document (`har`).
+    """
+    authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, uuid, export_format, *args, **kwargs):
+        exporter = EXPORTERS.get(export_format)
+        if exporter is None:
+            raise Http404
+        session = get_object_or_404(Session, uuid=uuid)
+        if session.user != request.user:
+            raise PermissionDenied
+        flush_log_writer()
+
+        response = StreamingHttpResponse(exporter(session), content_type=CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = 'attachment; filename="{}.{}"'.format(session.uuid, export_format)
+        return response
+
+
 class SessionTypesViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     """
     Session types
@@ -227,35 +250,16 @@ class ExposedUrlView(mixins.ListModelMixin, viewsets.GenericViewSet):
 class RunTest(CSRFExemptMixin, View):
     """ Proxy-view between clients and servers """
     error_codes = [(400, 599)]  # boundaries considered as errors
+    stream_uploads = True  # stream the large request bodies to the upstream
+    upload = None
 
-    def get_queryset(self):
-        return get_object_or_404(ExposedUrl, subdomain=self.request.subdomain).session
+    def get_context(self):
+        context = get_proxy_context(self.request.subdomain)
+        if context is None:
+            raise Http404()
+        return context
 
-    def match_url(self, url, compare, query_params):
-        '''
-        Return True if the url matches the compare url.
-        The compare url contains the parameter matching group {param}
-        '''
-        # casting of the reference url into a regex
-        param_pattern = '{[^/]+}'
-        any_c = '[^/]+'
-        parsed_url = '( |/)*' + re.sub(param_pattern, any_c, compare)
-        if len(query_params) == 0:
-            parsed_url += '$'
-        else:
-            parsed_url += '?'
-        check_url = url.replace('/api/v1//', '/api/v1/')
-        logger.info("Parsed: %s", parsed_url)
-        logger.info("URL: %s", check_url)
-        if re.search(parsed_url, check_url) is not None:
-            params = self.request.GET
-            for qp in query_params:
-                par = params.get(qp.name)
-                if par is None or (qp.expected_value != '*' and qp.expected_value != par):
-                    return False
-            return True
-
-    def get_http_header(self, request, endpoint, session):
+    def get_http_header(self, request, context):
         '''
         Extracts the http header from the request and add the authorization header for
         gemma platform
@@ -266,165 +270,73 @@ class RunTest(CSRFExemptMixin, View):
             if header.lower() not in whitelist:
                 request_headers[header] = value
 
-        if session.session_type.authentication == choices.AuthenticationChoices.jwt:
-            jwt_auth = get_jwt(session.session_type).credentials()
+        session_type = context.session_type
+        if session_type.authentication == choices.AuthenticationChoices.jwt:
+            jwt_auth = get_jwt_credentials(session_type)
             for k, i in jwt_auth.items():
                 if k not in request_headers:
                     request_headers[k] = i
-        elif session.session_type.authentication == choices.AuthenticationChoices.header:
-            request_headers['authorization'] = session.session_type.header
+        elif session_type.authentication == choices.AuthenticationChoices.header:
+            request_headers['authorization'] = session_type.header
 
         # inject the eventual headers
-        to_inject = InjectHeader.objects.filter(session_type=session.session_type)
-        for header in to_inject:
-            request_headers[header.key] = header.value
+        for key, value in context.inject_headers:
+            request_headers[key] = value
 
         return request_headers
 
-    def save_call(self, request, request_method_name, url, relative_url, session, status_code, session_log):
+    def save_call(self, request, request_method_name, exposed, relative_url, session, status_code, session_log):
         '''
         Find the matching scenario case with the same url and method, if one match is found,
         the result of the call is overrided
         '''
         logger.info("Saving call")
         logger.info(request_method_name)
-        logger.info(url)
+        logger.info(exposed.subdomain)
         logger.info(relative_url)
 
-        exposed = ExposedUrl.objects.get(subdomain=url, session=session)
         endpoint = exposed.vng_endpoint
-        if endpoint.scenario_collection:
-            scenario_cases = endpoint.scenario_collection.scenariocase_set.filter(http_method__iexact=request_method_name)
-            ordered_scenario_cases = scenario_cases.annotate(count=Count('queryparamsscenario')).order_by('-count')
-            for case in ordered_scenario_cases:
-                logger.info(case)
-                if self.match_url(request.build_absolute_uri(), case.url, QueryParamsScenario.objects.filter(scenario_case=case)):
-                    pre_exist = Report.objects.filter(scenario_case=case).filter(session_log__session=session)
-                    if len(pre_exist) == 0:
-                        report = Report(scenario_case=case, session_log=session_log)
-                    else:
-                        report = pre_exist[0]
-                    is_failed = False
-                    for a, b in self.error_codes:
-                        if status_code >= a and status_code <= b:
-                            report.result = choices.HTTPCallChoices.failed
-                            report.session_log = session_log
-                            is_failed = True
-                            break
-                    if not is_failed and not report.is_failed() or (session.sandbox and not is_failed):
-                        report.session_log = session_log
-                        report.result = choices.HTTPCallChoices.success
-                    logger.info("Saving report: %s", report.result)
-                    report.save()
-                    break
-
-    def sub_url_response(self, content, host, endpoint):
-        '''
-        Replace the url of the response body
-
-        Arguments:
-            content Str -- Body of the response
-            host Str -- Host of the webservice
-            endpoint ExposedUrl -- ExposedUrl corresponding the call
-
-        Returns:
-            Str -- The body after the rewrite
-        '''
-
-        sub = host
-        if endpoint.vng_endpoint.url is not None:
-            if not endpoint.vng_endpoint.url.endswith('/'):
-                if sub.endswith('/'):
-                    sub = sub[:-1]
-            else:
-                if not sub.endswith('/'):
-                    sub = sub + '/'
-            return re.sub(endpoint.vng_endpoint.url, sub, content)
+        case_id = None
+        if endpoint.scenario_collection_id:
+            index = get_case_index(endpoint.scenario_collection_id)
+            case_id = index.match(request_method_name, request.build_absolute_uri(), request.GET)
+            if case_id is not None:
+                logger.info("Matched scenario case: %s", case_id)
+        failed = any(a <= status_code <= b for a, b in self.error_codes)
+        if settings.PROXY_WRITE_BEHIND:
+            get_log_writer().add_report(session, case_id, session_log, failed)
         else:
-            query = parse.urlparse(sub)
-            if not sub.endswith('/'):
-                sub = sub + '/'
-            return re.sub(
-                '{}://{}:{}/'.format(query.scheme, endpoint.docker_url, endpoint.port),
-                sub,
-                content
-            )
-
-    def sub_url_request(self, content, host, endpoint):
-        '''
-        Replace the url of the request body
+            SessionSummary.record_call(session, session_log, case_id, failed)
 
-        Arguments:
-            content Str -- Body of the request
-            host Str -- Host of the webservice
-            endpoint ExposedUrl -- ExposedUrl corresponding the call
-
-        Returns:
-            Str -- The body after the rewrite
-        '''
-        sub = host
-        if endpoint.vng_endpoint.url is not None:
-            if not endpoint.vng_endpoint.url.endswith('/'):
-                if sub.endswith('/'):
-                    sub = sub[:-1]
-            else:
-                if not sub.endswith('/'):
-                    sub = sub + '/'
-            return re.sub(sub, endpoint.vng_endpoint.url, content)
-        else:
-            query = parse.urlparse(sub)
-            if not sub.endswith('/'):
-                sub = sub + '/'
-            return re.sub(
-                sub,
-                '{}://{}:{}/'.format(query.scheme, endpoint.docker_url, endpoint.port),
-                content
-            )
-
-    def parse_response(self, response, request, base_url, endpoints):
+    def parse_response(self, response, rewriter):
         """
         Rewrites the VNG Reference responses to make use of ATV URL endpoints:
         https://ref.tst.vng.cloud/zrc/api/v1/zaken/123
         ->
         https://testplatform/runtest/XXXX/api/v1/zaken/123
-        """
-        parsed = response.text
-        for ep in endpoints:
-            host = reverse_sub('run_test', ep.subdomain, kwargs={
-                'relative_url': ''
-            })
-            parsed = self.sub_url_response(parsed, host, ep)
-            logger.info("Rewriting response body: {}".format(parsed))
-        return parsed
 
-    def parse_response_text(self, text, endpoints):
-        for ep in endpoints:
-            host = reverse_sub('run_test', ep.subdomain, kwargs={
-                'relative_url': ''
-            })
-            parsed = self.sub_url_response(text, host, ep)
+        Binary bodies are passed through untouched.
+        """
+        parsed = rewriter.rewrite_body(response.content, response.headers.get('Content-Type'), response.encoding)
+        logger.debug("Rewriting response body: %d bytes", len(parsed))
         return parsed
 
-    def rewrite_request_body(self, request, exposed):
+    def rewrite_request_body(self, request, rewriter):
         """
         Rewrites the request body's to replace the ATV URL endpoints to the VNG Reference endpoints
         https://testplatform/runtest/XXXX/api/v1/zaken/123
         ->
         https://ref.tst.vng.cloud/zrc/api/v1/zaken/123
+
+        Binary bodies are passed through untouched.
         """
-        parsed = request.body.decode('utf-8')
-        for eu in exposed:
-            host = reverse_sub('run_test', eu.subdomain, kwargs={
-                'relative_url': ''
-            })
-            parsed = self.sub_url_request(parsed, host, eu)
-        logger.info("Rewriting request body:{}".format(parsed))
-        return parsed
+        return rewriter.rewrite_body(request.body, request.META.get('CONTENT_TYPE'), request.encoding)
 
     def build_url(self, eu, arguments):
         self.kwargs['relative_url']
-        if eu.vng_endpoint.url is not None:
-            base_url = eu.vng_endpoint.url[:-1] if eu.vng_endpoint.url.endswith("/") else eu.vng_endpoint.url
+        if eu.vng_endpoint.url is not None or self.session.is_replaying():
+            upstream = replay_upstream(eu.vng_endpoint)
+            base_url = upstream[:-1] if upstream.endswith("/") else upstream
             request_url = '{}/{}?{}'.format(base_url, self.kwargs['relative_url'], arguments)
         else:
             request_url = 'http://{}:{}/{}?{}'.format(eu.docker_url, eu.port, self.kwargs['relative_url'], arguments)
@@ -432,57 +344,112 @@ class RunTest(CSRFExemptMixin, View):
             request_url = request_url[:-1]
         return request_url
 
-    def build_method(self, request_method_name, request, body=False):
-        self.session = self.get_queryset()
-        eu = get_object_or_404(ExposedUrl, session=self.session, subdomain=request.subdomain)
-        request_header = self.get_http_header(request, eu.vng_endpoint, self.session)
-        session_log, session = self.build_session_log(request, request_header)
+    def prepare_call(self, request, body=False):
+        '''
+        Resolve the context of the call and build the upstream request
+
+        Returns:
+            Tuple -- The session log, the url, the headers and the body of the upstream request
+        '''
+        timer = self.timer = PhaseTimer()
+        with timer.phase('context'):
+            context = self.context = self.get_context()
+            self.session = context.session
+            if body and self.stream_uploads and is_large_upload(request) and not self.session.is_replaying():
+                self.upload = Upload.from_request(request, context.request_rewriter)
+            request_header = self.get_http_header(request, context)
+            session_log, session = self.build_session_log(request, request_header)
         if session.is_stopped():
             raise Http404()
-        endpoints = ExposedUrl.objects.filter(session=session)
         arguments = request.META['QUERY_STRING']
 
-        request_url = self.build_url(eu, arguments)
+        request_url = self.build_url(context.exposed_url, arguments)
         logger.info('Requesting the url:{}'.format(request_url))
-        method = getattr(requests, request_method_name)
 
-        def make_call():
-            if body:
-                rewritten_body = self.rewrite_request_body(request, endpoints)
-                logger.info("Request body after rewrite: %s", rewritten_body)
-                response = method(request_url, data=rewritten_body, headers=request_header, allow_redirects=False)
+        data = None
+        if self.upload is not None:
+            # read, rewritten and logged while it is sent
+            data = self.upload.body()
+        elif body:
+            with timer.phase('rewrite_request'):
+                data = self.rewrite_request_body(request, context.request_rewriter)
+            logger.info("Request body after rewrite: %d bytes", len(data))
+        return session_log, request_url, request_header, data
+
+    def finish_call(self, request_method_name, request, response, session_log, request_url, stream=False):
+        '''
+        Log the upstream response, update the report and build the reply to the client
+        '''
+        context = self.context
+        timer = self.timer
+        with timer.phase('log'):
+            if self.upload is not None:
+                self.log_upload(request, session_log)
+                self.upload.close()
+            if stream:
+                # the body is logged once it has been streamed to the client
+                session_log.set_response(response.status_code, request_url, '')
+                self.save_log(session_log)
             else:
-                response = method(request_url, headers=request_header, allow_redirects=False)
-            return response
-        try:
-            response = make_call()
-        except Exception as e:
-            try:
-                request_header['Host'] = '{}:{}'.format(eu.docker_url, eu.port)
-                response = make_call()
-            except Exception as e:
-                logger.exception(e)
-                raise Http404()
-
-        self.add_response(response, session_log, request_url, request)
+                self.add_response(response, session_log, request_url, request)
 
-        self.save_call(request, request_method_name, request.subdomain,
-                       self.kwargs['relative_url'], session, response.status_code, session_log)
-        reply = HttpResponse(self.parse_response(response, request, eu.vng_endpoint.url, endpoints), status=response.status_code)
+        with timer.phase('report'):
+            self.save_call(request, request_method_name, context.exposed_url,
+                           self.kwargs['relative_url'], self.session, response.status_code, session_log)
+        if stream:
+            reply = self.stream_response(response, session_log, request_url, request, context.response_rewriter)
+        else:
+            with timer.phase('rewrite'):
+                reply = HttpResponse(self.parse_response(response, context.response_rewriter), status=response.status_code)
         white_headers = ['Content-type', 'location']
         for h in white_headers:
             if h in response.headers:
-                reply[h] = self.parse_response_text(response.headers[h], endpoints)
+                reply[h] = context.response_rewriter.rewrite(response.headers[h])
 
+        reply['Server-Timing'] = timer.server_timing()
+        if not stream:
+            self.observe_timing(request)
         return reply
 
+    def observe_timing(self, request):
+        self.timer.observe(self.context.session_type.name, self.context.vng_endpoint.name,
+                           '{} {}'.format(request.method, request.path))
+
+    def replay_call(self, request_method_name, request_url, data):
+        '''
+        Answer the call from the exchanges recorded for the endpoint
+        '''
+        with self.timer.phase('replay'):
+            return replay_call(self.context.vng_endpoint, request_method_name, self.kwargs['relative_url'],
+                               self.request.META['QUERY_STRING'], data, request_url)
+
+    def build_method(self, request_method_name, request, body=False):
+        session_log, request_url, request_header, data = self.prepare_call(request, body)
+        if self.session.is_replaying():
+            response = self.replay_call(request_method_name, request_url, data)
+            return self.finish_call(request_method_name, request, response, session_log, request_url)
+        stream = settings.PROXY_STREAM_RESPONSES
+        try:
+            with self.timer.phase('upstream'):
+                response = get_upstream_client().request(
+                    request_method_name, request_url, data=data, headers=request_header, stream=stream
+                )
+        except requests.exceptions.RequestException as e:
+            logger.exception(e)
+            raise Http404()
+
+        return self.finish_call(request_method_name, request, response, session_log, request_url, stream)
+
+    def turned_off_response(self):
+        return JsonResponse({
+            'info': 'The requested resource has been already turned off.'
+        })
+
     def build_method_handler(self, request_method_name, request, body=False):
         try:
             return self.build_method(request_method_name, request, body)
         except Http404:
-            return JsonResponse({
-                'info': 'The requested resource has been already turned off.'
-            })
+            return self.turned_off_response()
 
     def get(self, request, *args, **kwargs):
         return self.build_method_handler('get', request)
@@ -506,28 +473,81 @@ class RunTest(CSRFExemptMixin, View):
             if type(header['host']) != str:
                 header['host'] = header['host'].decode('utf-8')
 
-        request_dict = {
-            "request": {
-                "path": "{} {}".format(request.method, request.build_absolute_uri()),
-                "body": request.body.decode('utf-8'),
-                "header": header
-            }
-        }
-        session_log.request = json.dumps(request_dict)
+        if self.upload is not None:
+            # logged once it has been sent, see log_upload
+            body, size = '', 0
+        else:
+            body, size = log_body(request.body, request.META.get('CONTENT_TYPE'), request.encoding)
+        session_log.set_request(request.method, request.build_absolute_uri(), header, body, size)
 
         return session_log, session
 
+    def log_upload(self, request, session_log):
+        '''
+        Log the hash, the size and the beginning of a streamed request body
+        '''
+        upload = self.upload
+        session_log.set_request(request.method, session_log.url, session_log.request_headers(),
+                                upload.log_text(), upload.size)
+        session_log.request_hash = upload.hexdigest
+
     def add_response(self, response, session_log, request_url, request):
-        response_dict = {
-            "response": {
-                "status_code": response.status_code,
-                "body": response.text,
-                "path": "{} {}".format(request.method, request_url),
-            }
-        }
-        session_log.response_status = response.status_code
-        session_log.response = json.dumps(response_dict)
-        session_log.save()
+        body, size = log_body(response.content, response.headers.get('Content-Type'), response.encoding)
+        session_log.set_response(response.status_code, request_url, body, size)
+        self.save_log(session_log)
+
+    def save_log(self, session_log):
+        if settings.PROXY_WRITE_BEHIND:
+            get_log_writer().add_log(session_log)
+        else:
+            session_log.save()
+
+    def stream_response(self, response, session_log, request_url, request, rewriter):
+        '''
+        Stream the upstream response to the client, rewriting the urls chunk by chunk.
+        At most PROXY_LOG_BODY_MAX_SIZE characters of the body are kept for the log.
+        Binary and multipart bodies are passed through, only their size is logged.
+        '''
+        content_type = response.headers.get('Content-Type')
+        passthrough = body_kind(content_type) in (BINARY, MULTIPART)
+        capture = BodyCapture(settings.PROXY_LOG_BODY_MAX_SIZE)
+        size = 0
+
+        def captured(chunks):
+            for text in chunks:
+                capture.feed(text)
+                yield text
+
+        def content():
+            nonlocal size
+            started = time.perf_counter()
+            try:
+                if passthrough:
+                    for chunk in response.iter_content(settings.PROXY_STREAM_CHUNK_SIZE):
+                        size += len(chunk)
+                        yield chunk
+                else:
+                    chunks = decode_stream(response.iter_content(settings.PROXY_STREAM_CHUNK_SIZE), response.encoding)
+                    for text in rewriter.rewrite_stream(captured(chunks)):
+                        yield text.encode('utf-8')
+            finally:
+                response.close()
+                if passthrough and size:
+                    session_log.set_response(
+                        response.status_code, request_url, binary_log_text(content_type, size), size
+                    )
+                else:
+                    session_log.set_response(response.status_code, request_url, capture.getvalue(), capture.size)
+                if settings.PROXY_WRITE_BEHIND:
+                    get_log_writer().update_log(session_log)
+                else:
+                    SessionLog.objects.filter(pk=session_log.pk).update(
+                        response_size=session_log.response_size, response_data=session_log.response_data
+                    )
+                self.timer.add('stream', time.perf_counter() - started)
+                self.observe_timing(request)
+
+        return StreamingHttpResponse(content(), status=response.status_code)
 
 
 class ResultTestsessionViewShield(views.APIView):
@@ -539,39 +559,26 @@ class ResultTestsessionViewShield(views.APIView):
 
     @extend_schema(responses={200: ServerRunResultShield})
     def get(self, request, uuid=None):
-        session = get_object_or_404(Session, uuid=uuid)
-        report = list(Report.objects.filter(session_log__session=session))
-        report_ordered = []
+        return badge_response(request, badges.SESSION, uuid, lambda: self.get_badge(uuid))
+
+    def get_badge(self, uuid):
+        session = get_object_or_404(Session.objects.select_related('summary'), uuid=uuid)
+        success, failed, not_called = session.get_report_stats()
         is_error = False
-        not_full = False
-
-        scenario_cases = session.session_type.scenario_cases
-
-        for case in scenario_cases:
-            missing = False
-            for rp in report:
-                if rp.result == choices.HTTPCallChoices.failed:
-                    is_error = True
-                if rp.scenario_case == case and rp.result != choices.HTTPCallChoices.not_called:
-                    report_ordered.append(rp)
-                    missing = True
-                    break
-            if not missing:
-                not_full = True
-
-        if not scenario_cases:
+
+        if not success + failed + not_called:
             message = 'No results'
             color = 'inactive'
-        elif is_error:
+        elif failed:
             message = 'Failed'
             color = 'red'
-        elif not_full:
+            is_error = True
+        elif not_called:
             message = 'Not completed'
             color = 'orange'
         else:
             message = 'Success'
             color = 'green'
-            is_error = False
 
         result = {
             'schemaVersion': 1,
@@ -581,4 +588,30 @@ class ResultTestsessionViewShield(views.APIView):
             'isError': is_error,
         }
 
-        return JsonResponse(result)
+        return result
+
+
+class UpstreamPoolStatsView(views.APIView):
+    """
+    Upstream connection pools
+
+    Return the statistics of the connection pools used by the proxy of this process.
+    """
+    authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(get_upstream_client().stats())
+
+
+class ProxyMetricsView(views.APIView):
+    """
+    Proxy metrics
+
+    Return the histograms of the duration of the phases of the proxied calls, in the Prometheus text format.
+    """
+    authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,17 @@
+"""
+ASGI config for the proxy of the vng project.
+
+It exposes the ASGI callable serving the subdomains of the test sessions as a
+module-level variable named ``application``, e.g.::
+
+    uvicorn vng.asgi:application
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import django
+django.setup(set_prefix=False)
+
+from vng.testsession.asgi import ProxyApplication
+
+application = ProxyApplication()
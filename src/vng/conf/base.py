@@ -341,6 +341,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'performance': {
+            'handlers': ['performance'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     }
 }
 
@@ -374,6 +379,63 @@ SHOW_ALERT = True
 
 RUN_KUBERNETES_CMD = False
 
+# Seconds a proxy request context is kept in the memory of a process
+PROXY_CONTEXT_TTL = 30
+# Alias of the cache shared between processes for the proxy request contexts, if any
+PROXY_CONTEXT_CACHE = None
+# Connections kept alive per upstream host by the proxy
+PROXY_UPSTREAM_POOL_SIZE = 20
+# Timeouts (in seconds) of the calls of the proxy to the upstream services
+PROXY_UPSTREAM_CONNECT_TIMEOUT = 5
+PROXY_UPSTREAM_READ_TIMEOUT = 60
+# Times a call of the proxy is retried when the connection to the upstream fails
+PROXY_UPSTREAM_CONNECT_RETRIES = 1
+# Stream the upstream responses to the client instead of buffering them
+PROXY_STREAM_RESPONSES = False
+PROXY_STREAM_CHUNK_SIZE = 64 * 1024
+# Request bodies larger than this many bytes are streamed to the upstream, None to always buffer them
+PROXY_STREAM_REQUEST_THRESHOLD = 1024 * 1024
+# Bytes of a streamed request body kept in the session log
+PROXY_STREAM_REQUEST_PREVIEW = 4 * 1024
+# Maximum number of characters of a proxied body kept in the session log, None to keep everything
+PROXY_LOG_BODY_MAX_SIZE = 1024 * 1024
+# Threads running the database work of the ASGI proxy (vng.asgi)
+PROXY_ASYNC_THREADS = 20
+# Connections the ASGI proxy keeps open to the upstream services in total
+PROXY_ASYNC_MAX_CONNECTIONS = 1000
+# Persist the session logs and reports of the proxied calls in batches from a background thread
+PROXY_WRITE_BEHIND = False
+PROXY_WRITE_BEHIND_BATCH_SIZE = 200
+# Seconds the background thread waits for a batch to fill up
+PROXY_WRITE_BEHIND_INTERVAL = 0.5
+# Calls a process queues at most; when the queue is full the proxy persists it before replying
+PROXY_WRITE_BEHIND_QUEUE_SIZE = 10000
+# Seconds the APIs accept a signed JWT after it is issued, and the least time a reused token must stay accepted
+JWT_CREDENTIALS_LIFETIME = 60 * 60
+JWT_CREDENTIALS_MIN_LIFETIME = 5 * 60
+# Seconds a computed badge is kept at most in the cache; badges are invalidated when their results change
+BADGE_CACHE_TIMEOUT = 24 * 60 * 60
+# Cache-Control header of the badge responses
+BADGE_CACHE_CONTROL = 'public, max-age=60'
+# Folder of the default storage where the rendered PDF reports are kept, by the digest of their HTML
+PDF_CACHE_FOLDER = 'reports'
+# Seconds a PDF is considered being rendered, or failed to render, after which a new rendering can be started
+PDF_RENDER_TIMEOUT = 10 * 60
+# Seconds after which the page shown while a PDF is rendered is reloaded
+PDF_RENDER_REFRESH = 5
+# Maximum number of Postman tests of a provider run that are run at the same time
+SERVER_RUN_MAX_CONCURRENCY = 8
+# How Newman runs the collections: 'process' starts node for every run, 'pool' hands the runs to long-lived workers
+NEWMAN_BACKEND = os.getenv('NEWMAN_BACKEND', 'process')
+# Number of Newman workers of a process, runs a worker does before it is replaced, and timeouts in seconds;
+# every celery child process has its own workers, see vng.utils.newman_pool
+NEWMAN_WORKERS = 4
+NEWMAN_WORKER_MAX_RUNS = 50
+NEWMAN_WORKER_PING_TIMEOUT = 10
+NEWMAN_RUN_TIMEOUT = 30 * 60
+# Maximum heap of the node process of a Newman worker, in MB
+NEWMAN_WORKER_MAX_HEAP = 4096
+
 #
 # Library settings
 #
@@ -3,10 +3,13 @@ from uuid import uuid4
 
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 
 from ordered_model.models import OrderedModel
 
+from ..utils import badges
 from .choices import DesignRuleChoices
 from .tasks.base import run_tests
 
@@ -111,3 +114,16 @@ class DesignRuleResult(models.Model):
     def get_description(self):
         choice = DesignRuleChoices.get_choice(self.rule_type)
         return choice.description
+
+
+@receiver(post_save, sender=DesignRuleSession, dispatch_uid='invalidate_badge_design_rule_session_saved')
+@receiver(post_delete, sender=DesignRuleSession, dispatch_uid='invalidate_badge_design_rule_session_deleted')
+def invalidate_badge_design_rule_session(sender, instance, **kwargs):
+    badges.invalidate_badge(badges.DESIGN_RULE_SESSION, instance.uuid)
+
+
+@receiver(post_save, sender=DesignRuleResult, dispatch_uid='invalidate_badge_design_rule_result_saved')
+@receiver(post_delete, sender=DesignRuleResult, dispatch_uid='invalidate_badge_design_rule_result_deleted')
+def invalidate_badge_design_rule_result(sender, instance, **kwargs):
+    uuid = DesignRuleSession.objects.filter(pk=instance.design_rule_id).values_list('uuid', flat=True).first()
+    badges.invalidate_badge(badges.DESIGN_RULE_SESSION, uuid)
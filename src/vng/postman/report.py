@@ -0,0 +1,134 @@
+"""
+Streaming reader of the Newman JSON reports.
+
+A Newman JSON report holds every request and response of a run, including
+the bodies as arrays of bytes, and easily grows to hundreds of megabytes for
+large collections. ``NewmanReport`` goes through a report with an
+incremental parser and only builds one execution (or run failure) at a time,
+so the memory used does not depend on the size of the report.
+
+While doing so it can write a copy of the report in which the bodies are
+decoded and the strings are scrubbed, one execution at a time as well.
+"""
+import json
+
+import ijson
+from ijson.common import ObjectBuilder
+
+EXECUTION = 'run.executions.item'
+FAILURE = 'run.failures.item'
+STARTED = 'run.timings.started'
+
+RESPONSE = EXECUTION + '.response'
+STREAM = RESPONSE + '.stream'
+STREAM_DATA = STREAM + '.data.item'
+
+
+def decode_body(data):
+    '''
+    Return the JSON body of a response stream, or None when it is not JSON
+    '''
+    try:
+        return json.loads(bytes(data))
+    except ValueError:
+        return None
+
+
+class JSONWriter:
+    '''
+    Write a JSON document from the events of the parser
+    '''
+
+    def __init__(self, out):
+        self.out = out
+        # [is an array, number of members written] of the open containers
+        self.containers = []
+
+    def separate(self):
+        if self.containers and self.containers[-1][0]:
+            if self.containers[-1][1]:
+                self.out.write(',')
+            self.containers[-1][1] += 1
+
+    def event(self, event, value):
+        if event == 'map_key':
+            if self.containers[-1][1]:
+                self.out.write(',')
+            self.containers[-1][1] += 1
+            self.out.write(json.dumps(value) + ':')
+        elif event in ('start_map', 'start_array'):
+            self.separate()
+            self.out.write('{' if event == 'start_map' else '[')
+            self.containers.append([event == 'start_array', 0])
+        elif event in ('end_map', 'end_array'):
+            self.containers.pop()
+            self.out.write('}' if event == 'end_map' else ']')
+        else:
+            self.write_value(value)
+
+    def write_value(self, value):
+        self.separate()
+        self.out.write(json.dumps(value))
+
+
+class NewmanReport:
+    '''
+    Iterate over the executions and the run failures of a Newman JSON report,
+    as ``(EXECUTION, execution)`` and ``(FAILURE, failure)``
+
+    The response streams of the executions are replaced by their decoded
+    ``body``, as the pages show it. When ``out`` is given the report is
+    written to it with these changes, and ``scrub`` is applied to every
+    string and key of the report.
+    '''
+
+    def __init__(self, source, out=None, scrub=None):
+        self.source = source
+        self.writer = JSONWriter(out) if out is not None else None
+        self.scrub = scrub
+        self.started = None
+
+    def __iter__(self):
+        builder, depth = None, 0
+        body, in_stream = None, False
+        for prefix, event, value in ijson.parse(self.source, use_float=True):
+            if self.scrub is not None and event in ('map_key', 'string'):
+                value = self.scrub(value)
+
+            if builder is None:
+                if prefix in (EXECUTION, FAILURE) and event == 'start_map':
+                    kind, builder, depth, body = prefix, ObjectBuilder(), 0, None
+                else:
+                    if prefix == STARTED:
+                        self.started = value
+                    if self.writer is not None:
+                        self.writer.event(event, value)
+                    continue
+
+            if in_stream:
+                # the bytes of the body are gathered instead of built
+                if prefix == STREAM_DATA and event == 'number':
+                    body.append(value)
+                elif prefix == STREAM and event == 'end_map':
+                    in_stream = False
+                    body = decode_body(body)
+                continue
+            if kind == EXECUTION and prefix == RESPONSE and event == 'map_key' and value == 'stream':
+                in_stream, body = True, bytearray()
+                continue
+
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+            if depth:
+                continue
+
+            item = builder.value
+            builder = None
+            if body is not None:
+                item['response']['body'] = body
+            if self.writer is not None:
+                self.writer.write_value(item)
+            yield kind, item
@@ -38,6 +38,31 @@ def get_call_result(call):
     return ('error_test' not in call['item'] or not call['item']['error_test'])
 
 
+def normalize_execution(execution):
+    '''
+    Add the full url of the request and whether an assertion failed to the
+    execution of a Newman JSON report
+    '''
+    if 'host' in execution['request']['url']:
+        req = execution['request']['url']
+        url = '.'.join(req['host'])
+        path = ''
+        if 'path' in req:
+            path = '/'.join(req['path'])
+        if 'protocol' in req:
+            req['url'] = '{}://{}/{}'.format(req['protocol'], url, path)
+        else:
+            req['url'] = '{}/{}'.format(url, path)
+
+        execution['item']['error_test'] = False
+        if 'assertions' in execution:
+            for assertion in execution['assertions']:
+                if 'error' in assertion:
+                    execution['item']['error_test'] = True
+                    break
+    return execution
+
+
 def get_json_obj(content, file=False):
     if file:
         f = json.load(content)
@@ -45,22 +70,6 @@ def get_json_obj(content, file=False):
         f = json.loads(content)
     res = f['run']['executions']
     for execution in res:
-        if 'host' in execution['request']['url']:
-            req = execution['request']['url']
-            url = '.'.join(req['host'])
-            path = ''
-            if 'path' in req:
-                path = '/'.join(req['path'])
-            if 'protocol' in req:
-                req['url'] = '{}://{}/{}'.format(req['protocol'], url, path)
-            else:
-                req['url'] = '{}/{}'.format(url, path)
-
-            execution['item']['error_test'] = False
-            if 'assertions' in execution:
-                for assertion in execution['assertions']:
-                    if 'error' in assertion:
-                        execution['item']['error_test'] = True
-                        break
+        normalize_execution(execution)
 
     return res
@@ -79,12 +79,12 @@ class APIAdmin(GuardedModelAdmin):
 @admin.register(model.PostmanTest)
 class PostmanTestAdmin(AdminChangeLinksMixin, OrderedModelAdmin):
     list_display = ['name', 'version', 'test_scenario', 'move_up_down_links',
-                    'published_url', 'validation_file']
+                    'published_url', 'validation_file', 'order_dependent']
 
 
 @admin.register(model.PostmanTestResult)
 class PostmanTestResultAdmin(admin.ModelAdmin):
-    list_display = ['id', 'postman_test', 'log', 'server_run', 'log_json']
+    list_display = ['id', 'postman_test', 'log', 'server_run', 'log_json', 'calls_success', 'calls_failed']
 
 
 @admin.register(model.Endpoint)
@@ -132,7 +132,7 @@ class ServerRunAdmin(admin.ModelAdmin):
 
 @admin.register(model.TestScenario)
 class TestScenarioAdmin(admin.ModelAdmin):
-    list_display = ['name', 'active', 'public_logs']
+    list_display = ['name', 'active', 'public_logs', 'concurrency']
     list_filter = ['name']
     list_editable = ('active', 'public_logs')
     search_fields = ['name']
@@ -25,7 +25,8 @@ from vng.api_authentication.authentication import CustomTokenAuthentication
 from .serializers import ServerRunSerializer, ServerRunPayloadExample, ServerRunResultShield, PostmanTestSerializer
 from .models import ServerRun, PostmanTestResult, PostmanTest
 from .task import execute_test
-from ..utils import choices
+from ..utils import badges, choices
+from ..utils.badges import badge_response
 
 
 def get_server_run_badge(server_run, label):
@@ -116,8 +117,11 @@ class ResultServerViewShield(views.APIView):
 
     @extend_schema(responses={200: ServerRunResultShield})
     def get(self, request, uuid=None):
-        server = get_object_or_404(ServerRun, uuid=uuid)
-        return JsonResponse(get_server_run_badge(server, 'API Test Platform'))
+        def build():
+            server = get_object_or_404(ServerRun, uuid=uuid)
+            return get_server_run_badge(server, 'API Test Platform')
+
+        return badge_response(request, badges.SERVER_RUN, uuid, build)
 
 
 class ResultServerView(views.APIView):
@@ -231,9 +235,12 @@ class ServerRunLatestResultView(views.APIView):
             ),
         ])
     def get(self, request, uuid):
-        latest_server_run = ServerRun.objects.filter(
-            environment__uuid=uuid
-        ).order_by('-stopped').first()
-        if not latest_server_run:
-            raise Http404
-        return JsonResponse(get_server_run_badge(latest_server_run, 'API Test Platform'))
+        def build():
+            latest_server_run = ServerRun.objects.filter(
+                environment__uuid=uuid
+            ).order_by('-stopped').first()
+            if not latest_server_run:
+                raise Http404
+            return get_server_run_badge(latest_server_run, 'API Test Platform')
+
+        return badge_response(request, badges.ENVIRONMENT, uuid, build)
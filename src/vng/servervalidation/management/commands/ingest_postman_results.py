@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from vng.servervalidation.models import PostmanTestResult
+
+
+class Command(BaseCommand):
+    help = 'Store the calls and assertions of the JSON logs of the Postman test results in their tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--all', action='store_true', help='Also the results that are ingested already')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        results = PostmanTestResult.objects.order_by('pk')
+        if not options['all']:
+            results = results.filter(calls_success__isnull=True)
+        last_pk = 0
+        ingested = 0
+        while True:
+            batch = list(results.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for result in batch:
+                result.ensure_ingested(force=options['all'])
+            last_pk = batch[-1].pk
+            ingested += len(batch)
+            self.stdout.write('{} results ingested'.format(ingested))
+        self.stdout.write(self.style.SUCCESS('Done, {} results ingested'.format(ingested)))
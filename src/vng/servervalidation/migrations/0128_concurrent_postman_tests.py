@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servervalidation', '0127_auto_20201209_1536'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testscenario',
+            name='concurrency',
+            field=models.PositiveSmallIntegerField(default=1, help_text='The number of Postman tests of this test scenario that are run at the same time; a Postman test that depends on its order waits for the Postman tests before it'),
+        ),
+        migrations.AddField(
+            model_name='postmantest',
+            name='order_dependent',
+            field=models.BooleanField(default=False, help_text='Indicates whether this Postman test depends on the Postman tests before it; it is only started once all of them have finished'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servervalidation', '0128_concurrent_postman_tests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postmantestresult',
+            name='calls_success',
+            field=models.PositiveIntegerField(default=None, help_text='The number of calls that succeeded, empty while the JSON log is not ingested', null=True),
+        ),
+        migrations.AddField(
+            model_name='postmantestresult',
+            name='calls_failed',
+            field=models.PositiveIntegerField(default=None, help_text='The number of calls that failed, empty while the JSON log is not ingested', null=True),
+        ),
+        migrations.AddField(
+            model_name='postmantestresult',
+            name='assertions_passed',
+            field=models.PositiveIntegerField(default=0, help_text='The number of assertions that passed'),
+        ),
+        migrations.AddField(
+            model_name='postmantestresult',
+            name='assertions_failed',
+            field=models.PositiveIntegerField(default=0, help_text='The number of assertions that failed'),
+        ),
+        migrations.AddField(
+            model_name='postmantestresult',
+            name='script_errors',
+            field=models.PositiveIntegerField(default=0, help_text='The number of errors in the test scripts of the calls'),
+        ),
+        migrations.AddField(
+            model_name='postmantestresult',
+            name='started',
+            field=models.DateTimeField(blank=True, default=None, help_text='The moment Newman started the run', null=True),
+        ),
+        migrations.CreateModel(
+            name='PostmanExecution',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(help_text='The position of the call in the run')),
+                ('name', models.TextField(blank=True, help_text='The name of the request in the collection')),
+                ('method', models.CharField(blank=True, max_length=20)),
+                ('url', models.TextField(blank=True)),
+                ('status_code', models.PositiveSmallIntegerField(default=None, help_text='The status code of the response, empty when the call was not performed', null=True)),
+                ('status', models.CharField(blank=True, help_text='The reason phrase of the response', max_length=100)),
+                ('response_time', models.PositiveIntegerField(default=None, help_text='The time of the response in milliseconds', null=True)),
+                ('error_test', models.BooleanField(default=False, help_text='Indicates whether the test of the call failed')),
+                ('script_errors', models.PositiveIntegerField(default=0, help_text='The number of errors in the test scripts of the call')),
+                ('success', models.BooleanField(default=False, help_text='Indicates whether the call was performed without any failed test or assertion')),
+                ('result', models.ForeignKey(help_text='The result of the Postman test which this call belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='executions', to='servervalidation.PostmanTestResult')),
+            ],
+            options={
+                'ordering': ('result', 'order'),
+            },
+        ),
+        migrations.CreateModel(
+            name='PostmanAssertion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(help_text='The position of the assertion in the call')),
+                ('assertion', models.TextField(blank=True)),
+                ('passed', models.BooleanField(default=True)),
+                ('skipped', models.BooleanField(default=False)),
+                ('error_name', models.TextField(blank=True)),
+                ('error_index', models.PositiveIntegerField(blank=True, null=True)),
+                ('error_test', models.TextField(blank=True)),
+                ('error_message', models.TextField(blank=True)),
+                ('error_stack', models.TextField(blank=True)),
+                ('execution', models.ForeignKey(help_text='The call which this assertion belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='assertions', to='servervalidation.PostmanExecution')),
+            ],
+            options={
+                'ordering': ('execution', 'order'),
+            },
+        ),
+        migrations.CreateModel(
+            name='PostmanFailure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField()),
+                ('source_name', models.TextField(blank=True)),
+                ('error_name', models.TextField(blank=True)),
+                ('error_test', models.TextField(blank=True)),
+                ('error_message', models.TextField(blank=True)),
+                ('result', models.ForeignKey(help_text='The result of the Postman test which this failure belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='failures', to='servervalidation.PostmanTestResult')),
+            ],
+            options={
+                'ordering': ('result', 'order'),
+            },
+        ),
+    ]
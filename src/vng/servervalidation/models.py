@@ -1,26 +1,37 @@
 import json
-import array
 import itertools
+import tempfile
 import uuid
 
 from datetime import datetime
 
 from tinymce.models import HTMLField
 
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 
 from ordered_model.models import OrderedModel
-from django.core.files.base import ContentFile
+from django.core.files import File
 from filer.fields.file import FilerFileField
 
 from vng.accounts.models import User
+import vng.postman.report as newman_report
 import vng.postman.utils as postman
 from vng.postman.choices import ResultChoices
 
-from ..utils import choices
+from ..utils import badges, choices, pdf
+from ..utils.auth import check_jwt_credentials, invalidate_jwt_credentials, remember_jwt_credentials
+
+# the number of calls of a Newman report stored at once
+INGEST_BATCH_SIZE = 200
+# the fields of a result set when its report is ingested
+INGESTED_FIELDS = [
+    'calls_success', 'calls_failed', 'assertions_passed', 'assertions_failed', 'script_errors', 'started',
+]
 
 
 class API(models.Model):
@@ -57,6 +68,10 @@ class TestScenario(models.Model):
     api = models.ForeignKey(API, on_delete=models.PROTECT, null=True, blank=True, help_text=_(
         "The API to which this test scenario belongs"
     ))
+    concurrency = models.PositiveSmallIntegerField(default=1, help_text=_(
+        "The number of Postman tests of this test scenario that are run at the same time; "
+        "a Postman test that depends on its order waits for the Postman tests before it"
+    ))
 
     def __str__(self):
         return self.name
@@ -118,6 +133,10 @@ class PostmanTest(OrderedModel):
     published_url = models.URLField(null=True, blank=True, help_text=_(
         "The URL pointing to the published collection on the Postman website"
     ))
+    order_dependent = models.BooleanField(default=False, help_text=_(
+        "Indicates whether this Postman test depends on the Postman tests before it; "
+        "it is only started once all of them have finished"
+    ))
 
     class Meta(OrderedModel.Meta):
         unique_together = ('name', 'version',)
@@ -264,9 +283,10 @@ class ServerRun(models.Model):
         else:
             success = True
             for ptr in ptr_set:
-                if ptr.is_success() == 0:
+                result = ptr.is_success()
+                if result == 0:
                     success = None
-                elif ptr.is_success() == -1 and success is not None:
+                elif result == -1 and success is not None:
                     success = False
         return success
 
@@ -298,12 +318,114 @@ class PostmanTestResult(models.Model):
         "Indicates whether all test passed or not"
     ))
 
+    calls_success = models.PositiveIntegerField(null=True, default=None, help_text=_(
+        "The number of calls that succeeded, empty while the JSON log is not ingested"
+    ))
+    calls_failed = models.PositiveIntegerField(null=True, default=None, help_text=_(
+        "The number of calls that failed, empty while the JSON log is not ingested"
+    ))
+    assertions_passed = models.PositiveIntegerField(default=0, help_text=_(
+        "The number of assertions that passed"
+    ))
+    assertions_failed = models.PositiveIntegerField(default=0, help_text=_(
+        "The number of assertions that failed"
+    ))
+    script_errors = models.PositiveIntegerField(default=0, help_text=_(
+        "The number of errors in the test scripts of the calls"
+    ))
+    started = models.DateTimeField(null=True, blank=True, default=None, help_text=_(
+        "The moment Newman started the run"
+    ))
+
     def __str__(self):
         if self.status is None:
             return '{}'.format(self.__dict__)
         else:
             return '{} - {}'.format(self.pk, self.status)
 
+    def is_ingested(self):
+        return self.calls_success is not None
+
+    def ingest(self, report=None):
+        '''
+        Store the executions, assertions and failures of the Newman JSON report
+        (a ``NewmanReport``) in their tables and count them on the result, so
+        the pages and the API read the results from the database instead of
+        the report; the executions are stored in batches as they are read
+        '''
+        counts = {
+            'calls_success': 0, 'calls_failed': 0,
+            'assertions_passed': 0, 'assertions_failed': 0, 'script_errors': 0,
+        }
+        executions, failures, failure_count = [], [], 0
+        with transaction.atomic():
+            self.executions.all().delete()
+            self.failures.all().delete()
+            for kind, item in report if report is not None else []:
+                if kind == newman_report.FAILURE:
+                    failures.append(PostmanFailure.from_json(self, failure_count, item))
+                    failure_count += 1
+                    if len(failures) >= INGEST_BATCH_SIZE:
+                        PostmanFailure.objects.bulk_create(failures)
+                        failures = []
+                    continue
+                order = counts['calls_success'] + counts['calls_failed']
+                execution, assertions = PostmanExecution.from_json(self, order, item)
+                executions.append((execution, assertions))
+                counts['calls_success' if execution.success else 'calls_failed'] += 1
+                counts['script_errors'] += execution.script_errors
+                for assertion in assertions:
+                    counts['assertions_passed' if assertion.passed else 'assertions_failed'] += 1
+                if len(executions) >= INGEST_BATCH_SIZE:
+                    PostmanExecution.store(executions)
+                    executions = []
+            PostmanExecution.store(executions)
+            PostmanFailure.objects.bulk_create(failures)
+
+            started = report.started if report is not None else None
+            self.started = datetime.fromtimestamp(int(started) / 1000, timezone.utc) if started else None
+            for field, count in counts.items():
+                setattr(self, field, count)
+            self.save(update_fields=INGESTED_FIELDS)
+        self.__dict__.pop('_executions', None)
+        self.__dict__.pop('_failures', None)
+
+    def ensure_ingested(self, force=False):
+        '''
+        Ingest the JSON log of a result stored before the results had their tables;
+        ``force`` ingests it again when it is ingested already
+        '''
+        if self.is_ingested() and not force:
+            return
+        with transaction.atomic():
+            # pages and API calls of the same result may get here at the same time;
+            # the lock makes the others wait and find the result ingested
+            locked = PostmanTestResult.objects.select_for_update().get(pk=self.pk)
+            if locked.is_ingested() and not force:
+                for field in INGESTED_FIELDS:
+                    setattr(self, field, getattr(locked, field))
+                return
+            if not self.log_json:
+                self.ingest()
+                return
+            try:
+                with open(self.log_json.path, 'rb') as jfile:
+                    self.ingest(newman_report.NewmanReport(jfile))
+            except FileNotFoundError:
+                self.ingest()
+
+    def get_executions(self):
+        if not hasattr(self, '_executions'):
+            self.ensure_ingested()
+            self._executions = list(self.executions.prefetch_related('assertions'))
+        return self._executions
+
+    def get_failures(self):
+        if not hasattr(self, '_failures'):
+            self.ensure_ingested()
+            self._failures = list(self.failures.all())
+        return self._failures
+
     def is_success(self):
         _, negative = self.get_call_results()
         status = ResultChoices.success if not negative else ResultChoices.failed
@@ -325,35 +447,32 @@ class PostmanTestResult(models.Model):
                 return fp.read()
 
     def get_json_obj_info(self):
-        if hasattr(self, 'status_saved'):
-            return self.status_saved
-
-        with open(self.log_json.path) as jfile:
-            f = json.load(jfile)
-            del f['run']['executions']
-            a = int(f['run']['timings']['started'])
-            f['run']['timings']['started'] = (datetime.utcfromtimestamp(int(f['run']['timings']['started']) / 1000)
-                                              .strftime('%I:%M %p'))
-
-            self.status_saved = f
-            return f
+        self.ensure_ingested()
+        return {
+            'run': {
+                'failures': [failure.as_json() for failure in self.get_failures()],
+                'timings': {
+                    'started': self.started.strftime('%I:%M %p') if self.started else None,
+                },
+            },
+        }
 
     def get_json_obj(self):
-        try:
-            return postman.get_json_obj_file(self.log_json.path) if self.log_json else []
-        except FileNotFoundError:
-            return []
-
-    def save_json(self, filename, file):
-        content = json.load(file)
-        for execution in content['run']['executions']:
-            try:
-                buffer = execution['response']['stream']['data']
-                del execution['response']['stream']
-                execution['response']['body'] = json.loads(array.array('B', buffer).tostring())
-            except:
-                pass
-        self.log_json.save(filename, ContentFile(json.dumps(content)))
+        '''
+        Return the executions in the shape of the Newman JSON report
+        '''
+        return [execution.as_json() for execution in self.get_executions()]
+
+    def save_json(self, filename, file, scrub=None):
+        '''
+        Store the Newman JSON report, with the bodies of the responses decoded
+        and ``scrub`` applied to its strings, and ingest its results in one
+        pass over the report
+        '''
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as stored:
+            self.ingest(newman_report.NewmanReport(file, stored, scrub))
+            stored.seek(0)
+            self.log_json.save(filename, File(stored, filename))
 
     def get_outcome_html(self):
         with open(self.log.path) as f:
@@ -368,68 +487,28 @@ class PostmanTestResult(models.Model):
             return postman.get_outcome_json(jfile, file=True)
 
     def get_call_results(self):
-        positive, negative = 0, 0
-        for call in self.get_json_obj():
-            if 'testScript' in call:
-                for script in call['testScript']:
-                    if 'error' in script:
-                        negative += 1
-
-            # Count the failed and successful assertions
-            if 'assertions' in call:
-                for assertion in call['assertions']:
-                    if 'error' in assertion:
-                        negative += 1
-                    else:
-                        positive += 1
-        return positive, negative
+        self.ensure_ingested()
+        return self.assertions_passed, self.assertions_failed + self.script_errors
 
     def get_aggregate_results(self):
-        passed, error = 0, 0
-        positive, negative = 0, 0
-        for call in self.get_json_obj():
-            success = True
-            if not postman.get_call_result(call):
-                success = False
-            if 'testScript' in call:
-                for script in call['testScript']:
-                    if 'error' in script:
-                        error += 1
-                        success = False
-            if 'assertions' in call:
-                for assertion in call['assertions']:
-                    if 'error' in assertion:
-                        error += 1
-                        success = False
-                    else:
-                        passed += 1
-            if success:
-                positive += 1
-            else:
-                negative += 1
+        self.ensure_ingested()
+        failed = self.assertions_failed + self.script_errors
         return {
             'assertions': {
-                'passed': passed,
-                'failed': error,
-                'total': error + passed
+                'passed': self.assertions_passed,
+                'failed': failed,
+                'total': failed + self.assertions_passed
             },
             'calls': {
-                'success': positive,
-                'failed': negative,
-                'total': negative + positive
+                'success': self.calls_success,
+                'failed': self.calls_failed,
+                'total': self.calls_success + self.calls_failed
             }
         }
 
     def get_assertions_details(self):
-        passed, error = 0, 0
-        for call in self.get_json_obj():
-            if 'assertions' in call:
-                for assertion in call['assertions']:
-                    if 'error' in assertion:
-                        error += 1
-                    else:
-                        passed += 1
-        return passed, error
+        self.ensure_ingested()
+        return self.assertions_passed, self.assertions_failed
 
     def positive_call_result(self):
         return self.get_call_results()[0]
@@ -438,7 +517,191 @@ class PostmanTestResult(models.Model):
         return self.get_call_results()[1]
 
     def get_call_results_list(self):
-        return [postman.get_call_result(call) for call in self.get_json_obj()]
+        return [execution.success for execution in self.get_executions()]
+
+
+class PostmanExecution(models.Model):
+
+    result = models.ForeignKey(PostmanTestResult, on_delete=models.CASCADE, related_name='executions', help_text=_(
+        "The result of the Postman test which this call belongs to"
+    ))
+    order = models.PositiveIntegerField(help_text=_("The position of the call in the run"))
+    name = models.TextField(blank=True, help_text=_("The name of the request in the collection"))
+    method = models.CharField(max_length=20, blank=True)
+    url = models.TextField(blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True, default=None, help_text=_(
+        "The status code of the response, empty when the call was not performed"
+    ))
+    status = models.CharField(max_length=100, blank=True, help_text=_("The reason phrase of the response"))
+    response_time = models.PositiveIntegerField(null=True, default=None, help_text=_(
+        "The time of the response in milliseconds"
+    ))
+    error_test = models.BooleanField(default=False, help_text=_(
+        "Indicates whether the test of the call failed"
+    ))
+    script_errors = models.PositiveIntegerField(default=0, help_text=_(
+        "The number of errors in the test scripts of the call"
+    ))
+    success = models.BooleanField(default=False, help_text=_(
+        "Indicates whether the call was performed without any failed test or assertion"
+    ))
+
+    class Meta:
+        ordering = ('result', 'order')
+
+    def __str__(self):
+        return '{} {}'.format(self.method, self.url)
+
+    @classmethod
+    def store(cls, executions):
+        '''
+        Save the (execution, assertions) pairs made by ``from_json``
+        '''
+        if connection.features.can_return_ids_from_bulk_insert:
+            cls.objects.bulk_create(execution for execution, __ in executions)
+        else:
+            for execution, __ in executions:
+                execution.save()
+        for execution, assertions in executions:
+            for assertion in assertions:
+                assertion.execution = execution
+        PostmanAssertion.objects.bulk_create(
+            itertools.chain.from_iterable(assertions for __, assertions in executions), batch_size=INGEST_BATCH_SIZE
+        )
+
+    @classmethod
+    def from_json(cls, result, order, call):
+        '''
+        Return the (unsaved) call and assertions of an execution of a Newman JSON report
+        '''
+        call.setdefault('item', {})
+        call.setdefault('request', {}).setdefault('url', '')
+        postman.normalize_execution(call)
+        url = call['request']['url']
+        response = call.get('response', {})
+        execution = cls(
+            result=result,
+            order=order,
+            name=call['item'].get('name', ''),
+            method=call['request'].get('method', ''),
+            url=url.get('url', '') if isinstance(url, dict) else url,
+            status_code=response.get('code'),
+            status=response.get('status', ''),
+            response_time=response.get('responseTime'),
+            error_test=bool(call['item'].get('error_test')),
+            script_errors=sum(1 for script in call.get('testScript', []) if 'error' in script),
+        )
+        assertions = [
+            PostmanAssertion.from_json(order, assertion) for order, assertion in enumerate(call.get('assertions', []))
+        ]
+        execution.success = (
+            postman.get_call_result(call) and not execution.script_errors and
+            all(assertion.passed for assertion in assertions)
+        )
+        return execution, assertions
+
+    def as_json(self):
+        call = {
+            'item': {'name': self.name, 'error_test': self.error_test},
+            'request': {'method': self.method, 'url': {'url': self.url}},
+            'testScript': [{'error': {}} for __ in range(self.script_errors)],
+        }
+        if self.status_code is not None:
+            call['response'] = {'code': self.status_code, 'status': self.status, 'responseTime': self.response_time}
+        assertions = [assertion.as_json() for assertion in self.assertions.all()]
+        if assertions:
+            call['assertions'] = assertions
+        return call
+
+
+class PostmanAssertion(models.Model):
+
+    execution = models.ForeignKey(PostmanExecution, on_delete=models.CASCADE, related_name='assertions', help_text=_(
+        "The call which this assertion belongs to"
+    ))
+    order = models.PositiveIntegerField(help_text=_("The position of the assertion in the call"))
+    assertion = models.TextField(blank=True)
+    passed = models.BooleanField(default=True)
+    skipped = models.BooleanField(default=False)
+    error_name = models.TextField(blank=True)
+    error_index = models.PositiveIntegerField(null=True, blank=True)
+    error_test = models.TextField(blank=True)
+    error_message = models.TextField(blank=True)
+    error_stack = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ('execution', 'order')
+
+    def __str__(self):
+        return self.assertion
+
+    @classmethod
+    def from_json(cls, order, assertion):
+        assertion_obj = cls(order=order, passed='error' not in assertion)
+        if isinstance(assertion, dict):
+            assertion_obj.assertion = assertion.get('assertion', '')
+            assertion_obj.skipped = bool(assertion.get('skipped'))
+            error = assertion.get('error')
+            if isinstance(error, dict):
+                assertion_obj.error_name = error.get('name', '')
+                assertion_obj.error_index = error.get('index')
+                assertion_obj.error_test = error.get('test', '')
+                assertion_obj.error_message = error.get('message', '')
+                assertion_obj.error_stack = error.get('stack', '')
+            elif error is not None:
+                assertion_obj.error_message = str(error)
+        else:
+            assertion_obj.assertion = str(assertion)
+        return assertion_obj
+
+    def as_json(self):
+        assertion = {'assertion': self.assertion, 'skipped': self.skipped}
+        if not self.passed:
+            assertion['error'] = {
+                'name': self.error_name,
+                'index': self.error_index,
+                'test': self.error_test,
+                'message': self.error_message,
+                'stack': self.error_stack,
+            }
+        return assertion
+
+
+class PostmanFailure(models.Model):
+
+    result = models.ForeignKey(PostmanTestResult, on_delete=models.CASCADE, related_name='failures', help_text=_(
+        "The result of the Postman test which this failure belongs to"
+    ))
+    order = models.PositiveIntegerField()
+    source_name = models.TextField(blank=True)
+    error_name = models.TextField(blank=True)
+    error_test = models.TextField(blank=True)
+    error_message = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ('result', 'order')
+
+    def __str__(self):
+        return '{} - {}'.format(self.source_name, self.error_name)
+
+    @classmethod
+    def from_json(cls, result, order, failure):
+        source = failure.get('source') or {}
+        error = failure.get('error') or {}
+        return cls(
+            result=result,
+            order=order,
+            source_name=source.get('name', '') if isinstance(source, dict) else '',
+            error_name=error.get('name', '') if isinstance(error, dict) else '',
+            error_test=error.get('test', '') if isinstance(error, dict) else '',
+            error_message=error.get('message', '') if isinstance(error, dict) else str(error),
+        )
+
+    def as_json(self):
+        return {
+            'source': {'name': self.source_name},
+            'error': {'name': self.error_name, 'test': self.error_test, 'message': self.error_message},
+        }
 
 
 class Endpoint(models.Model):
@@ -466,3 +729,52 @@ class ServerHeader(models.Model):
     ))
     header_key = models.TextField(help_text=_("The name of the HTTP header"))
     header_value = models.TextField(help_text=_("The value of the HTTP header"))
+
+
+@receiver(post_init, sender=ServerRun, dispatch_uid='remember_credentials_server_run')
+def remember_credentials_server_run(sender, instance, **kwargs):
+    remember_jwt_credentials(instance)
+
+
+@receiver(post_save, sender=ServerRun, dispatch_uid='check_credentials_server_run_saved')
+def check_credentials_server_run(sender, instance, **kwargs):
+    check_jwt_credentials(instance)
+
+
+@receiver(post_delete, sender=ServerRun, dispatch_uid='invalidate_credentials_server_run_deleted')
+def invalidate_credentials_server_run(sender, instance, **kwargs):
+    invalidate_jwt_credentials(instance.client_id)
+
+
+def invalidate_server_run_badges(server_run):
+    badges.invalidate_badge(badges.SERVER_RUN, server_run.uuid)
+    if server_run.environment_id:
+        environment = Environment.objects.filter(pk=server_run.environment_id).values_list('uuid', flat=True)
+        badges.invalidate_badge(badges.ENVIRONMENT, environment.first())
+
+
+@receiver(post_save, sender=ServerRun, dispatch_uid='invalidate_badges_server_run_saved')
+@receiver(post_delete, sender=ServerRun, dispatch_uid='invalidate_badges_server_run_deleted')
+def invalidate_badges_server_run(sender, instance, **kwargs):
+    invalidate_server_run_badges(instance)
+
+
+@receiver(post_save, sender=PostmanTestResult, dispatch_uid='invalidate_badges_postman_result_saved')
+@receiver(post_delete, sender=PostmanTestResult, dispatch_uid='invalidate_badges_postman_result_deleted')
+def invalidate_badges_postman_result(sender, instance, **kwargs):
+    server_run = ServerRun.objects.filter(pk=instance.server_run_id).only('uuid', 'environment').first()
+    if server_run is not None:
+        invalidate_server_run_badges(server_run)
+
+
+@receiver(post_save, sender=ServerRun, dispatch_uid='invalidate_pdfs_server_run_saved')
+@receiver(post_delete, sender=ServerRun, dispatch_uid='invalidate_pdfs_server_run_deleted')
+def invalidate_pdfs_server_run(sender, instance, **kwargs):
+    pdf.invalidate_pdfs(pdf.SERVER_RUN, instance.uuid)
+
+
+@receiver(post_save, sender=PostmanTestResult, dispatch_uid='invalidate_pdfs_postman_result_saved')
+def invalidate_pdfs_postman_result(sender, instance, **kwargs):
+    run_uuid = ServerRun.objects.filter(pk=instance.server_run_id).values_list('uuid', flat=True).first()
+    if run_uuid is not None:
+        pdf.invalidate_pdfs(pdf.SERVER_RUN, run_uuid)
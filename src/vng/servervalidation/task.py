@@ -2,9 +2,12 @@ import uuid
 from zds_client import ClientAuth
 import traceback
 import re
-import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from django.core.files import File
+from django.db import connections
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
@@ -19,7 +22,7 @@ from ..celery.celery import app
 from .models import PostmanTest, PostmanTestResult, Endpoint, ServerRun, ServerHeader, ScheduledTestScenario
 from ..utils import choices
 from ..utils.newman import NewmanManager
-from ..utils.auth import get_jwt
+from ..utils.auth import get_jwt_credentials
 
 
 logger = get_task_logger(__name__)
@@ -46,12 +49,158 @@ def execute_test_scheduled():
     if test_results:
         send_email_failure(test_results)
 
-def substitute_hidden_vars(server_run, file):
-    data = file.read()
-    hidden_vars = server_run.endpoint_set.filter(test_scenario_url__hidden=True)
-    for hidden in hidden_vars:
-        data = re.sub('{}'.format(hidden.url), '{hidden}', data)
-    return data
+def hidden_vars_substitution(server_run):
+    '''
+    Return a function that hides the values of the hidden variables of the run in a text
+    '''
+    hidden_vars = [
+        re.compile('{}'.format(hidden.url))
+        for hidden in server_run.endpoint_set.filter(test_scenario_url__hidden=True)
+    ]
+
+    def substitute_hidden_vars(data):
+        for hidden in hidden_vars:
+            data = hidden.sub('{hidden}', data)
+        return data
+    return substitute_hidden_vars
+
+
+class RunProgress:
+    '''
+    Progress of the Postman tests of a provider run, which may run at the same time
+    '''
+
+    def __init__(self, server_run, total):
+        self.server_run_pk = server_run.pk
+        self.total = total
+        self.done = 0
+        self.running = []
+        self.lock = threading.Lock()
+
+    def start(self, postman_test):
+        with self.lock:
+            self.running.append(str(postman_test.validation_file))
+            self.save()
+
+    def finish(self, postman_test):
+        with self.lock:
+            self.running.remove(str(postman_test.validation_file))
+            self.done += 1
+
+    def save(self):
+        ServerRun.objects.filter(pk=self.server_run_pk).update(
+            status_exec='Running the test {}'.format(', '.join(self.running)),
+            percentage_exec=int(((self.done + 1) / (self.total + 1)) * 100),
+        )
+
+
+def postman_test_stages(postman_tests):
+    '''
+    Return the stages of Postman tests to run one after the other; the tests
+    of a stage may run at the same time. A test that depends on its order
+    starts a new stage, so it only runs once every test before it has finished
+    '''
+    stages = []
+    for postman_test in postman_tests:
+        if not stages or postman_test.order_dependent:
+            stages.append([])
+        stages[-1].append(postman_test)
+    return stages
+
+
+def run_postman_test(server_run, postman_test, param):
+    '''
+    Run the Postman test with Newman and store its result
+
+    Returns:
+        bool -- Whether a call of the test failed
+    '''
+    auth_choice = postman_test.test_scenario.authorization
+    nm = NewmanManager(postman_test.validation_file)
+
+    if auth_choice == choices.AuthenticationChoices.jwt:
+        # the token must outlive the run of the collection
+        jwt_auth = get_jwt_credentials(server_run, min_lifetime=settings.NEWMAN_RUN_TIMEOUT)
+        nm.replace_parameters({
+            'BEARER_TOKEN': list(jwt_auth.values())[0].split()[1]
+        })
+    elif auth_choice == choices.AuthenticationChoices.header:
+        se = ServerHeader.objects.filter(server_run=server_run)
+        for header in se:
+            nm.replace_parameters({
+                'Authentication': header.header_value
+            })
+    elif auth_choice == choices.AuthenticationChoices.no_auth:
+        pass
+    nm.replace_parameters(param)
+    file_html, file_json = nm.execute_test()
+    ptr = PostmanTestResult(
+        postman_test=postman_test,
+        server_run=server_run
+    )
+    substitute_hidden_vars = hidden_vars_substitution(server_run)
+
+    # the reports are read and stored a line or an execution at a time
+    file_name = str(uuid.uuid4())
+    with tempfile.TemporaryFile('w+') as html:
+        for line in file_html:
+            html.write(substitute_hidden_vars(line))
+        html.seek(0)
+        ptr.log.save(file_name, File(html, file_name))
+    with open(file_json.name, 'rb') as report:
+        ptr.save_json(file_name, report, substitute_hidden_vars)
+
+    _, negative = ptr.get_call_results()
+    status = ResultChoices.success if not negative else ResultChoices.failed
+    ptr.save()
+    return status == ResultChoices.failed
+
+
+def run_postman_tests(server_run, postman_tests, param, concurrency):
+    '''
+    Run the Postman tests stage after stage (see ``postman_test_stages``), at
+    most ``concurrency`` tests of a stage at the same time; the first error
+    stops the tests that have not been started
+
+    Returns:
+        bool -- Whether a call of a test failed
+    '''
+    progress = RunProgress(server_run, len(postman_tests))
+
+    def run_test(postman_test):
+        progress.start(postman_test)
+        failure = run_postman_test(server_run, postman_test, param)
+        progress.finish(postman_test)
+        return failure
+
+    def run_test_in_thread(postman_test):
+        try:
+            return run_test(postman_test)
+        finally:
+            # the connections of a thread are its own
+            connections.close_all()
+
+    stages = postman_test_stages(postman_tests)
+    largest = max((len(stage) for stage in stages), default=0)
+    concurrency = min(concurrency, settings.SERVER_RUN_MAX_CONCURRENCY, largest)
+    failure = False
+    if concurrency <= 1:
+        for postman_test in postman_tests:
+            failure = run_test(postman_test) or failure
+        return failure
+
+    # Newman runs in its own process, threads are enough to wait for it
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for stage in stages:
+            futures = [executor.submit(run_test_in_thread, postman_test) for postman_test in stage]
+            try:
+                for future in as_completed(futures):
+                    failure = future.result() or failure
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+    return failure
 
 
 @app.task
@@ -60,57 +209,16 @@ def execute_test(server_run_pk, scheduled=False, email=False):
     server_run.status = choices.StatusWithScheduledChoices.running
     endpoints = server_run.environment.endpoint_set.all()
 
-    file_name = str(uuid.uuid4())
-    postman_tests = PostmanTest.objects.filter(test_scenario=server_run.test_scenario).order_by('order')
+    test_scenario = server_run.test_scenario
+    postman_tests = list(PostmanTest.objects.filter(test_scenario=test_scenario).order_by('order'))
 
     failure = False
     try:
-        for counter, postman_test in enumerate(postman_tests):
-            auth_choice = postman_test.test_scenario.authorization
-            if auth_choice == choices.AuthenticationChoices.jwt:
-                jwt_auth = get_jwt(server_run).credentials()
-            server_run.status_exec = 'Running the test {}'.format(postman_test.validation_file)
-            server_run.percentage_exec = int(((counter + 1) / (len(postman_tests) + 1)) * 100)
-            server_run.save()
-            nm = NewmanManager(postman_test.validation_file)
-
-            if auth_choice == choices.AuthenticationChoices.jwt:
-                nm.replace_parameters({
-                    'BEARER_TOKEN': list(jwt_auth.values())[0].split()[1]
-                })
-            elif auth_choice == choices.AuthenticationChoices.header:
-                se = ServerHeader.objects.filter(server_run=server_run)
-                for header in se:
-                    nm.replace_parameters({
-                        'Authentication': header.header_value
-                    })
-            elif auth_choice == choices.AuthenticationChoices.no_auth:
-                pass
-            param = {}
-            for ep in endpoints:
-                param[ep.test_scenario_url.name] = ep.url
-            nm.replace_parameters(param)
-            file_html, file_json = nm.execute_test()
-            ptr = PostmanTestResult(
-                postman_test=postman_test,
-                server_run=server_run
-            )
-            data = substitute_hidden_vars(server_run, file_html)
-            data_json = substitute_hidden_vars(server_run, file_json)
-
-            with open(file_html.name, 'w') as f:
-                f.write(data)
-
-            with open(file_json.name, 'w') as f:
-                json.dump(json.loads(data_json), f, indent=4)
-
-            ptr.log.save(file_name, File(open(file_html.name)))
-            ptr.save_json(file_name, File(open(file_json.name)))
-
-            _, negative = ptr.get_call_results()
-            status = ResultChoices.success if not negative else ResultChoices.failed
-            ptr.save()
-            failure = failure or (status == ResultChoices.failed)
+        param = {}
+        for ep in endpoints:
+            param[ep.test_scenario_url.name] = ep.url
+        server_run.save()
+        failure = run_postman_tests(server_run, postman_tests, param, test_scenario.concurrency)
 
         server_run.status_exec = 'Completed'
     except Exception as e:
@@ -0,0 +1,26 @@
+"""
+Stand-in for newman_worker.js: answers the pings and writes the given text
+in the reports of a run; a collection named 'hang' is never answered and
+a collection named 'fail' fails.
+"""
+import json
+import os
+import sys
+
+MARKER = '@@newman-worker '
+
+for line in sys.stdin:
+    request = json.loads(line)
+    if request['type'] == 'ping':
+        response = {'id': request['id'], 'ok': True, 'pid': os.getpid()}
+    elif request['collection'] == 'hang':
+        continue
+    elif request['collection'] == 'fail':
+        response = {'id': request['id'], 'ok': False, 'pid': os.getpid(), 'error': 'Unknown collection'}
+    else:
+        for path in (request['html'], request['json']):
+            with open(path, 'w') as f:
+                f.write(json.dumps(request['envVar']))
+        print('output of the collection')
+        response = {'id': request['id'], 'ok': True, 'pid': os.getpid(), 'failures': 0}
+    print(MARKER + json.dumps(response), flush=True)
@@ -0,0 +1,82 @@
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from ..task import RunProgress, postman_test_stages, run_postman_tests
+
+
+def postman_test(name, order_dependent=False):
+    return SimpleNamespace(validation_file=name, order_dependent=order_dependent)
+
+
+@patch.object(RunProgress, 'save', lambda self: None)
+@patch('vng.servervalidation.task.connections')
+class ConcurrentExecutionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server_run = SimpleNamespace(pk=1)
+        self.tests = [
+            postman_test('a'), postman_test('b'), postman_test('c', True), postman_test('d'),
+        ]
+
+    def test_stages(self, connections):
+        a, b, c, d = self.tests
+        self.assertEqual(postman_test_stages(self.tests), [[a, b], [c, d]])
+        self.assertEqual(postman_test_stages([c, a]), [[c, a]])
+
+    def test_independent_tests_run_together(self, connections):
+        # a and b only get past the barrier if they run at the same time
+        barrier = threading.Barrier(2, timeout=5)
+        ran = []
+
+        def run(server_run, postman_test, param):
+            if postman_test.validation_file in ('a', 'b'):
+                barrier.wait()
+            ran.append(postman_test.validation_file)
+            return postman_test.validation_file == 'd'
+
+        with patch('vng.servervalidation.task.run_postman_test', run):
+            failure = run_postman_tests(self.server_run, self.tests, {}, 4)
+
+        self.assertTrue(failure)
+        self.assertEqual(sorted(ran), ['a', 'b', 'c', 'd'])
+
+    def test_dependent_test_waits_for_the_tests_before_it(self, connections):
+        create, read = postman_test('create'), postman_test('read', True)
+        created = threading.Event()
+        read_after_create = []
+
+        def run(server_run, postman_test, param):
+            if postman_test is create:
+                # give the read a chance to start too early
+                created.wait(0.2)
+                created.set()
+            else:
+                read_after_create.append(created.is_set())
+            return False
+
+        with patch('vng.servervalidation.task.run_postman_test', run):
+            run_postman_tests(self.server_run, [create, read], {}, 4)
+
+        self.assertEqual(read_after_create, [True])
+
+    def test_sequential(self, connections):
+        ran = []
+
+        def run(server_run, postman_test, param):
+            ran.append(postman_test.validation_file)
+            return False
+
+        with patch('vng.servervalidation.task.run_postman_test', run):
+            self.assertFalse(run_postman_tests(self.server_run, self.tests, {}, 1))
+        self.assertEqual(ran, ['a', 'b', 'c', 'd'])
+
+    def test_error_stops_the_run(self, connections):
+        def run(server_run, postman_test, param):
+            raise ValueError(postman_test.validation_file)
+
+        with patch('vng.servervalidation.task.run_postman_test', run):
+            with self.assertRaises(ValueError):
+                run_postman_tests(self.server_run, self.tests, {}, 2)
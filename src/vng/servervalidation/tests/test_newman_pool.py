@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from ...utils.newman_pool import NewmanPool, NewmanWorker, NewmanWorkerError
+
+FAKE_WORKER = [sys.executable, os.path.join(os.path.dirname(__file__), 'data', 'fake_newman_worker.py')]
+
+
+@override_settings(NEWMAN_WORKER_PING_TIMEOUT=5, NEWMAN_RUN_TIMEOUT=1)
+@patch.object(NewmanWorker, 'command', FAKE_WORKER)
+class NewmanPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = NewmanPool(size=1, max_runs=2)
+        self.addCleanup(self.pool.close)
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.html = os.path.join(folder.name, 'report.html')
+        self.json = os.path.join(folder.name, 'report.json')
+
+    def run_collection(self, collection='collection.json'):
+        return self.pool.run(collection, {'ZRC': 'https://ref.tst.vng.cloud/zrc'}, self.html, self.json)
+
+    def test_run(self):
+        response = self.run_collection()
+        self.assertTrue(response['ok'])
+        with open(self.json) as f:
+            self.assertEqual(json.load(f), {'ZRC': 'https://ref.tst.vng.cloud/zrc'})
+
+    def test_worker_reused_then_recycled(self):
+        first = self.run_collection()['pid']
+        self.assertEqual(self.run_collection()['pid'], first)
+        # recycled after two runs
+        self.assertNotEqual(self.run_collection()['pid'], first)
+
+    def test_dead_worker_replaced(self):
+        first = self.run_collection()['pid']
+        worker = self.pool.idle.get_nowait()
+        worker.process.kill()
+        worker.process.wait()
+        self.pool.idle.put(worker)
+
+        self.assertNotEqual(self.run_collection()['pid'], first)
+
+    def test_worker_recycled_after_failed_run(self):
+        self.pool = NewmanPool(size=1, max_runs=10)
+        self.addCleanup(self.pool.close)
+        first = self.run_collection()['pid']
+        with self.assertRaises(NewmanWorkerError):
+            self.run_collection('fail')
+
+        self.assertNotEqual(self.run_collection()['pid'], first)
+
+    def test_timeout(self):
+        with self.assertRaises(NewmanWorkerError):
+            self.run_collection('hang')
+        self.assertTrue(self.run_collection()['ok'])
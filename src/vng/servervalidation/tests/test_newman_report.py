@@ -0,0 +1,53 @@
+import io
+import json
+
+from django.test import SimpleTestCase
+
+from vng.postman.report import EXECUTION, FAILURE, NewmanReport
+
+REPORT = {
+    "collection": {"info": {"name": "ZRC"}, "item": [1, 2.5, None, True]},
+    "run": {
+        "timings": {"started": 1600000000000},
+        "executions": [{
+            "item": {"name": "Get zaak https://zrc.nl"},
+            "response": {"code": 200, "stream": {"type": "Buffer", "data": list(b'{"url": "https://zrc.nl"}')}},
+        }, {
+            "item": {"name": "Get document"},
+            "response": {"code": 200, "stream": {"type": "Buffer", "data": list(b'%PDF')}},
+        }],
+        "failures": [{"source": {"name": "Get zaak"}, "error": {"message": "404"}}],
+        "error": None,
+    },
+}
+
+
+class NewmanReportTests(SimpleTestCase):
+
+    def read(self, out=None, scrub=None):
+        report = NewmanReport(io.BytesIO(json.dumps(REPORT).encode()), out, scrub)
+        return report, list(report)
+
+    def test_executions_and_failures(self):
+        report, items = self.read()
+
+        self.assertEqual([kind for kind, _ in items], [EXECUTION, EXECUTION, FAILURE])
+        self.assertEqual(items[0][1]['response'], {'code': 200, 'body': {'url': 'https://zrc.nl'}})
+        # not a JSON body
+        self.assertEqual(items[1][1]['response'], {'code': 200})
+        self.assertEqual(items[2][1], REPORT['run']['failures'][0])
+        self.assertEqual(report.started, 1600000000000)
+
+    def test_stored_report(self):
+        out = io.StringIO()
+        self.read(out, lambda data: data.replace('https://zrc.nl', '{hidden}'))
+        stored = json.loads(out.getvalue())
+
+        self.assertEqual(stored['collection'], REPORT['collection'])
+        self.assertEqual(stored['run']['failures'], REPORT['run']['failures'])
+        self.assertEqual(stored['run']['executions'][0], {
+            'item': {'name': 'Get zaak {hidden}'},
+            # the bodies are decoded after the substitution, as before
+            'response': {'code': 200, 'body': {'url': 'https://zrc.nl'}},
+        })
+        self.assertIsNone(stored['run']['error'])
@@ -1,8 +1,41 @@
+import io
+import json
+from unittest.mock import patch
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from ..models import PostmanAssertion, PostmanExecution, PostmanTestResult
 from .factories import PostmanTestResultFactory
 
+NEWMAN_REPORT = {
+    "run": {
+        "executions": [{
+            "item": {"name": "Create zaak"},
+            "request": {
+                "method": "POST", "url": {"protocol": "https", "host": ["zrc", "nl"], "path": ["zaken"]}
+            },
+            "response": {"code": 201, "status": "Created", "responseTime": 42},
+            "assertions": [{"assertion": "Status code is 201", "skipped": False}],
+        }, {
+            "item": {"name": "Get zaak"},
+            "request": {"method": "GET", "url": {"host": ["zrc", "nl"], "path": ["zaken", "1"]}},
+            "response": {"code": 404, "status": "Not Found"},
+            "assertions": [{"assertion": "Status code is 200", "skipped": False, "error": {
+                "name": "AssertionError", "index": 0, "test": "Status code is 200",
+                "message": "expected response to have status code 200 but got 404",
+                "stack": "AssertionError: expected response to have status code 200 but got 404",
+            }}],
+        }],
+        "failures": [{
+            "source": {"name": "Get zaak"},
+            "error": {"name": "AssertionError", "test": "Status code is 200", "message": "404"},
+        }],
+        "timings": {"started": 1600000000000, "stopped": 1600000001000}
+    }
+}
+
 
 class PostmanTestResultTests(TestCase):
 
@@ -94,3 +127,84 @@ class PostmanTestResultTests(TestCase):
             'assertions': {'passed': 0, 'failed': 1, 'total': 1},
             'calls': {'success': 0, 'failed': 1, 'total': 1}
         })
+
+
+class PostmanTestResultIngestTests(TestCase):
+
+    def setUp(self):
+        self.ptr = PostmanTestResultFactory.create(log_json=None)
+        self.ptr.save_json('report', io.BytesIO(json.dumps(NEWMAN_REPORT).encode()))
+
+    def test_ingested_at_save(self):
+        self.assertEqual(PostmanExecution.objects.filter(result=self.ptr).count(), 2)
+        self.assertEqual(PostmanAssertion.objects.filter(execution__result=self.ptr).count(), 2)
+        create, get = self.ptr.executions.all()
+        self.assertEqual(create.url, 'https://zrc.nl/zaken')
+        self.assertEqual(create.status_code, 201)
+        self.assertEqual(create.response_time, 42)
+        self.assertTrue(create.success)
+        self.assertEqual(get.url, 'zrc.nl/zaken/1')
+        self.assertTrue(get.error_test)
+        self.assertFalse(get.success)
+
+    @patch('vng.servervalidation.models.INGEST_BATCH_SIZE', 1)
+    def test_ingested_in_batches(self):
+        self.ptr.save_json('report', io.BytesIO(json.dumps(NEWMAN_REPORT).encode()))
+
+        self.assertEqual(self.ptr.executions.count(), 2)
+        self.assertEqual(PostmanAssertion.objects.filter(execution__result=self.ptr).count(), 2)
+        self.assertEqual(self.ptr.failures.count(), 1)
+        self.assertEqual(self.ptr.get_aggregate_results()['calls'], {'success': 1, 'failed': 1, 'total': 2})
+        with self.ptr.log_json.open() as stored:
+            self.assertEqual(json.load(stored)['run']['failures'], NEWMAN_REPORT['run']['failures'])
+
+    def test_results_read_from_the_tables(self):
+        self.ptr.log_json.delete(save=False)
+
+        with self.assertNumQueries(0):
+            res = self.ptr.get_aggregate_results()
+        self.assertDictEqual(res, {
+            'assertions': {'passed': 1, 'failed': 1, 'total': 2},
+            'calls': {'success': 1, 'failed': 1, 'total': 2}
+        })
+        self.assertEqual(self.ptr.is_success(), -1)
+
+        calls = self.ptr.get_json_obj()
+        self.assertEqual(calls[1]['request']['url']['url'], 'zrc.nl/zaken/1')
+        self.assertEqual(calls[1]['assertions'], NEWMAN_REPORT['run']['executions'][1]['assertions'])
+
+        info = self.ptr.get_json_obj_info()
+        self.assertEqual(info['run']['timings']['started'], '12:26 PM')
+        self.assertEqual(info['run']['failures'][0]['error']['test'], 'Status code is 200')
+
+    def test_legacy_result_ingested_once(self):
+        ptr = PostmanTestResultFactory.create()
+        self.assertFalse(ptr.is_ingested())
+
+        ptr.get_call_results()
+        ptr.refresh_from_db()
+
+        self.assertTrue(ptr.is_ingested())
+        self.assertEqual(ptr.executions.count(), 1)
+
+    def test_legacy_result_ingested_by_another_request(self):
+        ptr = PostmanTestResultFactory.create()
+        stale = PostmanTestResult.objects.get(pk=ptr.pk)
+        ptr.ensure_ingested()
+
+        stale.ensure_ingested()
+
+        self.assertTrue(stale.is_ingested())
+        self.assertEqual(stale.calls_success, ptr.calls_success)
+        self.assertEqual(ptr.executions.count(), 1)
+
+    def test_command_all_ingests_again(self):
+        ptr = PostmanTestResultFactory.create()
+        ptr.ensure_ingested()
+        ptr.executions.all().delete()
+
+        call_command('ingest_postman_results', stdout=io.StringIO())
+        self.assertEqual(ptr.executions.count(), 0)
+
+        call_command('ingest_postman_results', '--all', stdout=io.StringIO())
+        self.assertEqual(ptr.executions.count(), 1)
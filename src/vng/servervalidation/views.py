@@ -23,7 +23,7 @@ from guardian.mixins import PermissionRequiredMixin
 
 import vng.postman.utils as postman
 
-from ..utils import choices
+from ..utils import choices, pdf
 from ..utils.newman import OpenAPIConverter
 from ..utils.views import OwnerSingleObject, PDFGenerator
 from .forms import (
@@ -95,7 +95,7 @@ class ServerRunList(ListView):
         return self.model.objects.filter(
             test_scenario__uuid=self.kwargs['scenario_uuid'],
             environment__uuid=self.kwargs['env_uuid'],
-        ).order_by('-stopped', '-started')
+        ).order_by('-stopped', '-started').prefetch_related('postmantestresult_set')
 
     def get_context_data(self, *args, **kwargs):
         data = super().get_context_data(*args, **kwargs)
@@ -487,17 +487,15 @@ class ServerRunPdfView(PDFGenerator, ServerRunOutputUuid):
 
     template_name = 'servervalidation/server-run-PDF.html'
 
+    def get_pdf_owner(self):
+        return (pdf.SERVER_RUN, self.object.uuid)
+
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
         server_run = context['object']
 
-        ptm = context['postman_result'].get(pk=self.kwargs['test_result_pk'])
-        ptm.json = ptm.get_json_obj()
-        for calls in ptm.json:
-            if 'response' in calls:
-                calls['response']['code'] = str(calls['response']['code'])
-            else:
-                calls['response'] = 'Error occurred call the resource'
+        # the url names a result of the run
+        get_object_or_404(context['postman_result'], pk=self.kwargs['test_result_pk'])
 
         self.filename = 'Server run {} report.pdf'.format(server_run.pk)
         context['error_codes'] = postman.get_error_codes()
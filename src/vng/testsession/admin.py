@@ -63,7 +63,8 @@ class SessionTypeAdmin(OrderedInlineModelAdminMixin, admin.ModelAdmin):
         'version',
         'header',
         'db_data',
-        'active'
+        'active',
+        'replay'
     ]
     list_filter = ['name']
     list_editable = ('active',)
@@ -96,7 +97,7 @@ class SessionAdmin(admin.ModelAdmin):
 class SessionLogAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     search_fields = ['session__name', 'date']
-    list_display = ['date', 'session', 'response_status']
+    list_display = ['date', 'session', 'method', 'url', 'response_status']
 
 
 @admin.register(model.ScenarioCaseCollection)
@@ -152,9 +153,17 @@ class VNGEndpointAdmin(OrderedModelAdmin):
     list_filter = ['session_type']
 
 
+@admin.register(model.RecordedExchange)
+class RecordedExchangeAdmin(admin.ModelAdmin):
+    list_display = ['vng_endpoint', 'method', 'path', 'query', 'status_code', 'recorded', 'source']
+    list_filter = ['vng_endpoint__session_type']
+    search_fields = ['path']
+
+
 @admin.register(model.Report)
 class ReportAdmin(admin.ModelAdmin):
     list_display = [
+        'session',
         'scenario_case',
         'session_log',
         'result'
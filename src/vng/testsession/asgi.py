@@ -0,0 +1,248 @@
+"""
+ASGI application serving the proxy of the test sessions.
+
+The calls to the subdomains of the sessions spend most of their time waiting
+on the upstream services. This application forwards them with a single
+``httpx.AsyncClient``, so one process holds many calls in flight without a
+worker (thread) blocked on each of them. The database work of a call (the
+request context, the session log and the report) is the one of ``RunTest``;
+it is run in a bounded thread pool, sized by ``PROXY_ASYNC_THREADS``.
+
+A call whose client disconnects is given up, the upstream call included.
+
+The requests and the responses are always buffered;
+``PROXY_STREAM_REQUEST_THRESHOLD`` and ``PROXY_STREAM_RESPONSES`` only apply
+to the WSGI proxy.
+"""
+import asyncio
+import functools
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+from io import BytesIO
+
+import httpx
+
+from django.conf import settings
+from django.core.exceptions import DisallowedHost
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.http import Http404, HttpResponseBadRequest, HttpResponseNotFound
+from django.urls import Resolver404, resolve
+
+from subdomains.middleware import SubdomainURLRoutingMiddleware
+
+from vng.api.v1.testsession.views import RunTest
+
+logger = logging.getLogger(__name__)
+security_logger = logging.getLogger('django.security.DisallowedHost')
+
+BODY_METHODS = ('post', 'put', 'patch')
+PROXY_METHODS = ('get', 'delete') + BODY_METHODS
+
+
+def build_environ(scope, body):
+    '''
+    Return the WSGI environ of an ASGI http scope
+    '''
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI carries the path as latin-1 decoded bytes
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            environ[name] = value
+            continue
+        key = 'HTTP_{}'.format(name)
+        if key in environ:
+            value = '{},{}'.format(environ[key], value)
+        environ[key] = value
+    return environ
+
+
+class ProxyApplication:
+
+    def __init__(self, threads=None):
+        self.executor = ThreadPoolExecutor(max_workers=threads or settings.PROXY_ASYNC_THREADS)
+        self.client = None
+
+    def get_client(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    settings.PROXY_UPSTREAM_READ_TIMEOUT,
+                    connect=settings.PROXY_UPSTREAM_CONNECT_TIMEOUT
+                ),
+                limits=httpx.Limits(
+                    max_keepalive_connections=settings.PROXY_UPSTREAM_POOL_SIZE,
+                    max_connections=settings.PROXY_ASYNC_MAX_CONNECTIONS
+                ),
+            )
+            # the client is shared by all the callers, never keep cookies
+            self.client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return self.client
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported ASGI scope: {}'.format(scope['type']))
+
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        handling = asyncio.ensure_future(self.handle(scope, body))
+        disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            await asyncio.wait([handling, disconnect], return_when=asyncio.FIRST_COMPLETED)
+            if not handling.done():
+                logger.info('Client disconnected from %s %s', scope['method'], scope['path'])
+                return
+        finally:
+            disconnect.cancel()
+            # without a client, the upstream call is of no use
+            handling.cancel()
+        await self.send_reply(handling.result(), send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.client is not None:
+                    await self.client.aclose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        '''
+        Return the body of the request, None if the client disconnected before sending it
+        '''
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    async def wait_disconnect(self, receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+    async def run_sync(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(self.call_db, func, *args))
+
+    @staticmethod
+    def call_db(func, *args):
+        # the threads outlive the calls, recycle the connections as Django does per request
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    def setup_view(self, scope, body):
+        '''
+        Return the request and the RunTest view handling it, None as view if
+        the call is not a proxied one
+        '''
+        request = WSGIRequest(build_environ(scope, body))
+        SubdomainURLRoutingMiddleware().process_request(request)
+        method = request.method.lower()
+        if getattr(request, 'subdomain', None) is None or method not in PROXY_METHODS:
+            return request, None
+        try:
+            match = resolve(request.path_info, urlconf=getattr(request, 'urlconf', None))
+        except Resolver404:
+            return request, None
+        if getattr(match.func, 'view_class', None) is not RunTest:
+            return request, None
+
+        view = RunTest()
+        # the body has already been read
+        view.stream_uploads = False
+        view.setup(request, *match.args, **match.kwargs)
+        return request, view
+
+    async def handle(self, scope, body):
+        try:
+            request, view = await self.run_sync(self.setup_view, scope, body)
+        except DisallowedHost as e:
+            # answered as Django does
+            security_logger.error(str(e))
+            return HttpResponseBadRequest()
+        if view is None:
+            return HttpResponseNotFound()
+        method = request.method.lower()
+        try:
+            session_log, request_url, request_header, data = await self.run_sync(
+                view.prepare_call, request, method in BODY_METHODS
+            )
+            if view.session.is_replaying():
+                response = await self.run_sync(view.replay_call, method, request_url, data)
+            else:
+                with view.timer.phase('upstream'):
+                    response = await self.send_upstream(method, request_url, request_header, data)
+            return await self.run_sync(view.finish_call, method, request, response, session_log, request_url)
+        except Http404:
+            return view.turned_off_response()
+
+    async def send_upstream(self, method, url, headers, data):
+        client = self.get_client()
+        retries = settings.PROXY_UPSTREAM_CONNECT_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                return await client.request(
+                    method.upper(), url, data=data, headers=headers, allow_redirects=False
+                )
+            except httpx.ConnectError as e:
+                if attempt < retries:
+                    continue
+                logger.exception(e)
+                raise Http404()
+            except httpx.HTTPError as e:
+                logger.exception(e)
+                raise Http404()
+
+    async def send_reply(self, reply, send):
+        headers = [
+            (key.lower().encode('latin-1'), str(value).encode('latin-1'))
+            for key, value in reply.items()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': reply.status_code,
+            'headers': headers,
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': reply.content,
+        })
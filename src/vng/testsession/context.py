@@ -0,0 +1,152 @@
+"""
+Request context of the proxy.
+
+Everything the proxy needs to forward a call for a subdomain (the exposed url,
+its session and session type, the endpoint, all the exposed urls of the
+session, the headers to inject and the url rewriters of the session) is loaded at once and kept in an
+in-process cache with a time to live. Optionally the context is shared
+between processes through the cache named by ``PROXY_CONTEXT_CACHE``.
+
+Every entry is bound to a version stamp stored in the default cache; the
+signal handlers in ``models`` renew the stamp whenever one of the objects of
+the context changes, so stale entries are dropped in every process.
+
+A cached context is shared by the threads of the process: every request gets
+its own copy of the exposed url and the session, see ``ProxyContext.copy``.
+"""
+import copy
+import threading
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from .rewrite import UrlRewriter
+
+VERSION_KEY = 'testsession:proxy-context-version:{}'
+CONTEXT_KEY = 'testsession:proxy-context:{}:{}'
+
+MAX_ENTRIES = 1024
+
+_contexts = {}
+_lock = threading.Lock()
+
+
+class ProxyContext:
+
+    def __init__(self, exposed_url, endpoints, inject_headers, rewrite_table):
+        self.exposed_url = exposed_url
+        self.endpoints = endpoints
+        self.inject_headers = inject_headers
+        self.response_rewriter = UrlRewriter.for_response(rewrite_table)
+        self.request_rewriter = UrlRewriter.for_request(rewrite_table)
+
+    @property
+    def session(self):
+        return self.exposed_url.session
+
+    @property
+    def session_type(self):
+        return self.exposed_url.session.session_type
+
+    @property
+    def vng_endpoint(self):
+        return self.exposed_url.vng_endpoint
+
+    def copy(self):
+        '''
+        Return a copy of the context with its own exposed url and session, so a request
+        can change or cache on them without touching the instances of the other threads
+        '''
+        context = copy.copy(self)
+        context.exposed_url = copy_instance(self.exposed_url)
+        context.exposed_url.session = copy_instance(self.session)
+        return context
+
+    @classmethod
+    def load(cls, subdomain):
+        ExposedUrl = apps.get_model('testsession', 'ExposedUrl')
+        InjectHeader = apps.get_model('testsession', 'InjectHeader')
+        exposed_url = ExposedUrl.objects.select_related(
+            'session__session_type', 'vng_endpoint'
+        ).filter(subdomain=subdomain).first()
+        if exposed_url is None:
+            return None
+
+        endpoints = list(ExposedUrl.objects.select_related('vng_endpoint').filter(session=exposed_url.session_id))
+        for endpoint in endpoints:
+            endpoint.session = exposed_url.session
+        inject_headers = [
+            (header.key, header.value)
+            for header in InjectHeader.objects.filter(session_type=exposed_url.session.session_type_id)
+        ]
+        rewrite_table = exposed_url.session.get_rewrite_table(endpoints)
+        return cls(exposed_url, endpoints, inject_headers, rewrite_table)
+
+
+def copy_instance(instance):
+    # the model state holds the cache of the related objects, it is not copied by copy.copy
+    clone = copy.copy(instance)
+    clone._state = copy.copy(instance._state)
+    clone._state.fields_cache = dict(instance._state.fields_cache)
+    return clone
+
+
+def get_shared_cache():
+    alias = getattr(settings, 'PROXY_CONTEXT_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def get_context_version(subdomain):
+    key = VERSION_KEY.format(subdomain)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_proxy_context(subdomain):
+    '''
+    Return a ProxyContext of the subdomain for the request, None if nothing is exposed on it
+    '''
+    subdomain = str(subdomain)
+    version = get_context_version(subdomain)
+    entry = _contexts.get(subdomain)
+    if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+        return entry[2].copy()
+
+    ttl = settings.PROXY_CONTEXT_TTL
+    shared = get_shared_cache()
+    context = None
+    if shared is not None:
+        context = shared.get(CONTEXT_KEY.format(subdomain, version))
+    if context is None:
+        context = ProxyContext.load(subdomain)
+        if context is None:
+            return None
+        if shared is not None:
+            shared.set(CONTEXT_KEY.format(subdomain, version), context, ttl)
+
+    now = time.monotonic()
+    with _lock:
+        if len(_contexts) >= MAX_ENTRIES:
+            for key in [key for key, value in _contexts.items() if value[1] <= now]:
+                del _contexts[key]
+        _contexts[subdomain] = (version, now + ttl, context)
+    return context.copy()
+
+
+def invalidate_proxy_context(subdomains):
+    for subdomain in subdomains:
+        if subdomain is None:
+            continue
+        subdomain = str(subdomain)
+        cache.set(VERSION_KEY.format(subdomain), uuid.uuid4().hex, None)
+        with _lock:
+            _contexts.pop(subdomain, None)
@@ -0,0 +1,201 @@
+"""
+Export of the traffic logged for a session.
+
+The logs of a session are streamed as NDJSON, one log per line, or as a HAR
+1.2 document. They are read with a server-side cursor in batches of
+``EXPORT_CHUNK_SIZE`` rows and serialized as they are read, so a session of
+any size is exported in constant memory. The scenario case matched by each
+log, and the result of that call, are included with it.
+"""
+import json
+from http.client import responses
+from urllib.parse import parse_qsl, urlsplit
+
+from django.apps import apps
+from django.utils import timezone
+
+from ..utils import choices
+from .matching import get_case_index
+from .replay import guess_content_type
+
+NDJSON = 'ndjson'
+HAR = 'har'
+
+CONTENT_TYPES = {
+    NDJSON: 'application/x-ndjson',
+    HAR: 'application/json',
+}
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def session_logs(session):
+    SessionLog = apps.get_model('testsession', 'SessionLog')
+    return SessionLog.objects.filter(session=session).order_by('date', 'pk').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def scenario_case_matcher(session):
+    '''
+    Return a function giving the scenario cases matched by a log, matched as
+    the proxy did with the index of the collection of the exposed url of the log
+    '''
+    # not at the top, the views import this module
+    from ..api.v1.testsession.views import RunTest
+
+    ExposedUrl = apps.get_model('testsession', 'ExposedUrl')
+    ScenarioCase = apps.get_model('testsession', 'ScenarioCase')
+    collections = [
+        (exposed_url.subdomain, exposed_url.vng_endpoint.scenario_collection_id)
+        for exposed_url in ExposedUrl.objects.filter(session=session).select_related('vng_endpoint')
+        if exposed_url.vng_endpoint.scenario_collection_id
+    ]
+    cases = ScenarioCase.objects.filter(
+        collection__in=[collection_id for _, collection_id in collections]
+    ).only('http_method', 'url').in_bulk()
+
+    def collection_of(host):
+        for subdomain, collection_id in collections:
+            if subdomain and host.startswith(subdomain):
+                return collection_id
+        if not host and len(collections) == 1:
+            # legacy logs only have the path of the request
+            return collections[0][1]
+        return None
+
+    def match(log):
+        method, url = log_method_url(log)
+        parts = urlsplit(url)
+        collection_id = collection_of(parts.hostname or '')
+        status = log.response_status
+        # the proxy reports a call once it has the response
+        if collection_id is None or status is None:
+            return []
+        case_id = get_case_index(collection_id).match(method, url, dict(parse_qsl(parts.query)))
+        if case_id not in cases:
+            return []
+        failed = any(a <= status <= b for a, b in RunTest.error_codes)
+        return [{
+            'scenario_case': case_id,
+            'http_method': cases[case_id].http_method,
+            'url': cases[case_id].url,
+            'result': choices.HTTPCallChoices.failed if failed else choices.HTTPCallChoices.success,
+        }]
+    return match
+
+
+def log_method_url(log):
+    if log.url:
+        return log.method, log.url
+    # legacy logs only have the path of the request
+    method, __, url = log.request_path().partition(' ')
+    return method, url
+
+
+def log_entry(log, match):
+    method, url = log_method_url(log)
+    return {
+        'uuid': str(log.uuid),
+        'date': log.date.isoformat(),
+        'request': {
+            'method': method,
+            'url': url,
+            'headers': log.request_headers(),
+            'body': log.request_body(),
+            'size': log.request_size,
+            'hash': log.request_hash,
+        },
+        'response': {
+            'status': log.response_status,
+            'upstream_url': log.upstream_url,
+            'body': log.response_body(),
+            'size': log.response_size,
+        },
+        'scenario_cases': match(log),
+    }
+
+
+def export_ndjson(session):
+    match = scenario_case_matcher(session)
+    for log in session_logs(session):
+        yield json.dumps(log_entry(log, match)) + '\n'
+
+
+def har_text(body):
+    if body is None:
+        return ''
+    if isinstance(body, str):
+        return body
+    # legacy logs may hold the parsed JSON body
+    return json.dumps(body)
+
+
+def har_entry(log, match):
+    method, url = log_method_url(log)
+    headers = log.request_headers()
+    if not isinstance(headers, dict):
+        headers = {}
+    request_body = har_text(log.request_body())
+    response_body = har_text(log.response_body())
+    status = log.response_status or 0
+    request = {
+        'method': method,
+        'url': url,
+        'httpVersion': 'HTTP/1.1',
+        'cookies': [],
+        'headers': [{'name': name, 'value': str(value)} for name, value in headers.items()],
+        'queryString': [{'name': name, 'value': value} for name, value in parse_qsl(urlsplit(url).query)],
+        'headersSize': -1,
+        'bodySize': log.request_size if log.request_size is not None else -1,
+    }
+    if request_body:
+        content_type = headers.get('Content-Type') or headers.get('content-type')
+        request['postData'] = {'mimeType': content_type or guess_content_type(request_body), 'text': request_body}
+    return {
+        'startedDateTime': log.date.isoformat(),
+        'time': 0,
+        'request': request,
+        'response': {
+            'status': status,
+            'statusText': responses.get(status, ''),
+            'httpVersion': 'HTTP/1.1',
+            'cookies': [],
+            'headers': [],
+            'content': {
+                'size': log.response_size if log.response_size is not None else len(response_body),
+                'mimeType': guess_content_type(response_body),
+                'text': response_body,
+            },
+            'redirectURL': '',
+            'headersSize': -1,
+            'bodySize': log.response_size if log.response_size is not None else -1,
+        },
+        'cache': {},
+        'timings': {'send': 0, 'wait': 0, 'receive': 0},
+        '_upstreamUrl': log.upstream_url,
+        '_scenarioCases': match(log),
+    }
+
+
+def export_har(session):
+    '''
+    Yield the HAR document of the session; the response headers and the timings
+    are not logged, so they are left empty
+    '''
+    match = scenario_case_matcher(session)
+    # the entries are written in the log object as they are read
+    yield json.dumps({'log': {
+        'version': '1.2',
+        'creator': {'name': 'API Test Platform', 'version': '1.0'},
+        'comment': 'Session {} exported on {}'.format(session.name, timezone.now().isoformat()),
+    }})[:-2] + ', "entries": ['
+    separator = ''
+    for log in session_logs(session):
+        yield separator + json.dumps(har_entry(log, match))
+        separator = ', '
+    yield ']}}'
+
+
+EXPORTERS = {
+    NDJSON: export_ndjson,
+    HAR: export_har,
+}
@@ -0,0 +1,172 @@
+"""
+Write-behind persistence of the proxied calls.
+
+When ``PROXY_WRITE_BEHIND`` is enabled the proxy does not save the session
+log and the report of a call before replying; it queues them on the
+``LogWriter`` of the process. A background thread persists the queue in
+batches of at most ``PROXY_WRITE_BEHIND_BATCH_SIZE`` calls, every
+``PROXY_WRITE_BEHIND_INTERVAL`` seconds. The queue holds at most
+``PROXY_WRITE_BEHIND_QUEUE_SIZE`` calls; when it is full, because the
+database does not keep up, the proxy persists the queue itself before
+replying, as it does without write-behind.
+
+The queue is consumed in order by a single writer, so the calls of a session
+proxied by a process are persisted in the order they were made, and the
+report of a call is merged with the previous ones exactly as the synchronous
+proxy does. The queue is flushed when a session is stopped or exported from
+this process and when the process exits. This is best effort: the calls
+queued by the other processes are only persisted by their own writers, within
+``PROXY_WRITE_BEHIND_INTERVAL`` seconds, so a session stopped or exported
+right after its last calls may still miss some of them.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CREATE_LOG = 'create_log'
+UPDATE_LOG = 'update_log'
+REPORT = 'report'
+
+
+class LogWriter:
+
+    def __init__(self, batch_size=None, interval=None, autostart=True, queue_size=None):
+        self.batch_size = batch_size or settings.PROXY_WRITE_BEHIND_BATCH_SIZE
+        self.interval = settings.PROXY_WRITE_BEHIND_INTERVAL if interval is None else interval
+        self.autostart = autostart
+        self.queue = queue.Queue(maxsize=queue_size or settings.PROXY_WRITE_BEHIND_QUEUE_SIZE)
+        self.pending = threading.Event()
+        self.flush_lock = threading.Lock()
+        self.thread = None
+        self.thread_lock = threading.Lock()
+
+    def start(self):
+        with self.thread_lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='proxy-log-writer', daemon=True)
+                self.thread.start()
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            logger.warning('The queue of the proxied calls is full, persisting it before replying')
+            # in order, so the event is queued after the ones before it
+            self.flush()
+            self.queue.put(event)
+        self.pending.set()
+        if self.autostart and (self.thread is None or not self.thread.is_alive()):
+            self.start()
+
+    def add_log(self, session_log):
+        self.put((CREATE_LOG, session_log))
+
+    def update_log(self, session_log):
+        self.put((UPDATE_LOG, session_log))
+
+    def add_report(self, session, scenario_case_id, session_log, failed):
+        self.put((REPORT, (session, scenario_case_id, session_log, failed)))
+
+    def run(self):
+        while True:
+            self.pending.wait()
+            # let a batch build up
+            time.sleep(self.interval)
+            self.pending.clear()
+            # the writer thread outlives the requests, recycle its connection as Django does per request;
+            # not in flush, which also runs in the request threads
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        '''
+        Persist everything queued so far, in order
+        '''
+        with self.flush_lock:
+            while True:
+                events = []
+                while len(events) < self.batch_size:
+                    try:
+                        events.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not events:
+                    return
+                try:
+                    self.write(events)
+                except Exception:
+                    logger.exception('Could not persist %d events of the proxied calls, writing them one by one',
+                                     len(events))
+                    self.write_one_by_one(events)
+
+    def write(self, events):
+        SessionLog = apps.get_model('testsession', 'SessionLog')
+        with transaction.atomic():
+            self.create_logs([payload for kind, payload in events if kind == CREATE_LOG])
+            reports = [payload for kind, payload in events if kind == REPORT]
+            if reports:
+                self.write_reports(reports)
+            updated = {id(log): log for kind, log in events if kind == UPDATE_LOG}
+            if updated:
+                SessionLog.objects.bulk_update(list(updated.values()), ['response_size', 'response_data'])
+
+    def write_one_by_one(self, events):
+        '''
+        Persist the events of a batch that failed one at a time, so only the bad ones are lost
+        '''
+        for kind, payload in events:
+            if kind == CREATE_LOG:
+                # forget the primary key given by the insert that was rolled back
+                payload.pk = None
+                payload._state.adding = True
+        for event in events:
+            try:
+                self.write([event])
+            except Exception:
+                logger.exception('Could not persist a %s event of the proxied calls', event[0])
+
+    def create_logs(self, logs):
+        if not logs:
+            return
+        SessionLog = apps.get_model('testsession', 'SessionLog')
+        if connection.features.can_return_ids_from_bulk_insert:
+            SessionLog.objects.bulk_create(logs)
+        else:
+            # the reports need the primary keys of the logs
+            for log in logs:
+                log.save()
+
+    def write_reports(self, events):
+        SessionSummary = apps.get_model('testsession', 'SessionSummary')
+        for session, case_id, session_log, failed in events:
+            SessionSummary.record_call(session, session_log, case_id, failed)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LogWriter()
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def flush_log_writer():
+    if _writer is not None:
+        _writer.flush()
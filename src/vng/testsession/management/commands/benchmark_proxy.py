@@ -0,0 +1,243 @@
+"""
+Load test of the RunTest proxy against a local stub upstream.
+
+For every combination of collection size and body size the command builds a
+synthetic session type with one endpoint, a scenario case collection and a
+running session, then:
+
+* profiles a few calls one at a time, counting the database queries and the
+  memory allocated per call;
+* drives the proxy with concurrent clients, measuring the throughput and the
+  latency percentiles.
+
+The proxy is measured end to end, so the objects are committed: the command
+refuses to run without ``--allow-writes`` and is meant for a disposable
+database. The synthetic objects, the benchmark user included, are removed
+afterwards unless ``--keep`` is given.
+
+    python src/manage.py benchmark_proxy --allow-writes --cases 10,100 --body-sizes 1024,65536
+"""
+import json
+import math
+import threading
+import time
+import tracemalloc
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from vng.testsession.models import (
+    ExposedUrl, ScenarioCase, ScenarioCaseCollection, Session, SessionLog, SessionType, VNGEndpoint
+)
+from vng.testsession.logwriter import flush_log_writer
+from vng.utils import choices
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        payload = self.server.payload
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubUpstream(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.url = 'http://127.0.0.1:{}/api/v1'.format(self.server_address[1])
+        self.payload = b'{}'
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def set_body_size(self, size):
+        '''
+        Reply with a JSON list of objects linking to the upstream, about ``size`` bytes long
+        '''
+        items = []
+        length = 2
+        while length < size:
+            item = {'url': '{}/bench/{}'.format(self.url, uuid.uuid4()), 'omschrijving': 'x' * 64}
+            items.append(item)
+            length += len(json.dumps(item)) + 2
+        self.payload = json.dumps(items).encode('utf-8')
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Measure the throughput and the cost per call of the RunTest proxy against a local stub upstream'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cases', default='10,100', help='Comma separated sizes of the scenario case collection')
+        parser.add_argument('--body-sizes', default='1024,65536',
+                            help='Comma separated sizes in bytes of the upstream bodies')
+        parser.add_argument('--requests', type=int, default=500, help='Calls per combination')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--profile-requests', type=int, default=20,
+                            help='Calls profiled one at a time per combination')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic objects')
+        parser.add_argument('--allow-writes', action='store_true',
+                            help='Confirm the objects of the benchmark may be written into the database')
+
+    def handle(self, *args, **options):
+        # the load runs on several connections, the objects cannot live in a transaction rolled back afterwards
+        if not options['allow_writes']:
+            raise CommandError('The benchmark writes into the database, run it with --allow-writes on a disposable one')
+        case_counts = [int(n) for n in options['cases'].split(',')]
+        body_sizes = [int(n) for n in options['body_sizes'].split(',')]
+
+        upstream = StubUpstream()
+        upstream.start()
+        self.objects = []
+        results = []
+        try:
+            session, exposed_url, endpoint = self.create_session(upstream.url)
+            self.host = '{}-{}'.format(exposed_url.subdomain, Site.objects.get_current().domain)
+            self.stdout.write('{:>6} {:>9} {:>9} {:>8} {:>8} {:>8} {:>8} {:>9}'.format(
+                'cases', 'body', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'KiB/call'
+            ))
+            with override_settings(ALLOWED_HOSTS=['*']):
+                for case_count in case_counts:
+                    self.set_collection(endpoint, case_count)
+                    for body_size in body_sizes:
+                        upstream.set_body_size(body_size)
+                        result = dict(cases=case_count, body_size=body_size)
+                        result.update(self.profile(case_count, options['profile_requests']))
+                        result.update(self.load(case_count, options['requests'], options['concurrency']))
+                        results.append(result)
+                        self.stdout.write('{cases:>6} {body_size:>9} {requests_per_second:>9.1f} {p50:>8.1f} '
+                                          '{p95:>8.1f} {p99:>8.1f} {queries:>8.1f} {memory_kib:>9.1f}'.format(**result))
+        finally:
+            upstream.stop()
+            if not options['keep']:
+                self.cleanup()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def create_session(self, upstream_url):
+        name = 'benchmark-{}'.format(uuid.uuid4().hex[:8])
+        user, created = get_user_model().objects.get_or_create(username='proxy-benchmark')
+        session_type = SessionType.objects.create(name=name, description='Proxy benchmark')
+        endpoint = VNGEndpoint.objects.create(name='BENCH', url=upstream_url, session_type=session_type)
+        session = Session.objects.create(
+            name=name, session_type=session_type, user=user, status=choices.StatusChoices.running
+        )
+        exposed_url = ExposedUrl.objects.create(session=session, vng_endpoint=endpoint, subdomain=uuid.uuid4())
+        session.update_rewrite_table()
+        self.objects = [session, endpoint, session_type]
+        if created:
+            self.objects.append(user)
+        return session, exposed_url, endpoint
+
+    def set_collection(self, endpoint, case_count):
+        collection = ScenarioCaseCollection.objects.create(name='{} {}'.format(endpoint.session_type.name, case_count))
+        for i in range(case_count):
+            ScenarioCase.objects.create(collection=collection, url='bench/{}/{{uuid}}'.format(i))
+        endpoint.scenario_collection = collection
+        endpoint.save()
+        self.objects.append(collection)
+
+    def call(self, client, i, case_count):
+        response = client.get('/bench/{}/{}'.format(i % case_count, uuid.uuid4()), HTTP_HOST=self.host)
+        if response.status_code != 200:
+            raise RuntimeError('The proxy replied {}'.format(response.status_code))
+
+    def profile(self, case_count, count):
+        client = Client()
+        queries = 0
+        memory = 0
+        for i in range(count):
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as context:
+                self.call(client, i, case_count)
+            memory += tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            queries += len(context.captured_queries)
+        return {
+            'queries': queries / max(count, 1),
+            'memory_kib': memory / max(count, 1) / 1024,
+        }
+
+    def load(self, case_count, count, concurrency):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        counter = iter(range(count))
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        i = next(counter, None)
+                    if i is None:
+                        return
+                    start = time.perf_counter()
+                    try:
+                        self.call(client, i, case_count)
+                    except Exception as e:
+                        errors.append(e)
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for __ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        if errors:
+            self.stderr.write('{} calls failed: {}'.format(len(errors), errors[0]))
+        latencies.sort()
+        return {
+            'requests_per_second': len(latencies) / elapsed,
+            'p50': percentile(latencies, 50) * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'errors': len(errors),
+        }
+
+    def cleanup(self):
+        # the logs kept by the write-behind would come back after the session is gone
+        flush_log_writer()
+        for obj in self.objects:
+            if isinstance(obj, Session):
+                SessionLog.objects.filter(session=obj).delete()
+            obj.delete()
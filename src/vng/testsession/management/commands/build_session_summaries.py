@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from vng.testsession.models import Session, SessionSummary
+
+
+class Command(BaseCommand):
+    help = 'Count the reports and the calls of the sessions into their summaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--missing', action='store_true', help='Only the sessions without a summary')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sessions = Session.objects.order_by('pk')
+        if options['missing']:
+            sessions = sessions.filter(summary__isnull=True)
+        last_pk = 0
+        built = 0
+        while True:
+            session_ids = list(sessions.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+            if not session_ids:
+                break
+            SessionSummary.rebuild(session_ids)
+            last_pk = session_ids[-1]
+            built += len(session_ids)
+            self.stdout.write('{} session summaries built'.format(built))
+        self.stdout.write(self.style.SUCCESS('Done, {} session summaries built'.format(built)))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from vng.testsession.models import SessionLog
+
+
+class Command(BaseCommand):
+    help = 'Move the bodies of the session logs stored as JSON text to the compressed columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = [
+            'method', 'url', 'upstream_url', 'request_size', 'response_size',
+            'request_data', 'response_data', 'request', 'response', 'response_status',
+        ]
+        legacy = SessionLog.objects.filter(Q(request__isnull=False) | Q(response__isnull=False)).order_by('pk')
+        last_pk = 0
+        converted = 0
+        while True:
+            logs = list(legacy.filter(pk__gt=last_pk)[:batch_size])
+            if not logs:
+                break
+            for log in logs:
+                log.compress_legacy()
+            with transaction.atomic():
+                SessionLog.objects.bulk_update(logs, fields)
+            last_pk = logs[-1].pk
+            converted += len(logs)
+            self.stdout.write('{} session logs compressed'.format(converted))
+        self.stdout.write(self.style.SUCCESS('Done, {} session logs compressed'.format(converted)))
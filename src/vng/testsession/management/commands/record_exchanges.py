@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from vng.testsession.models import RecordedExchange, Session, SessionType, VNGEndpoint
+from vng.testsession.replay import import_har, record_session
+
+
+class Command(BaseCommand):
+    help = 'Record the exchanges replayed for the sandbox sessions of a session type'
+
+    def add_arguments(self, parser):
+        parser.add_argument('session_type', help='The name of the session type')
+        parser.add_argument('--session', action='append', default=[], help='Record the logs of the session with this uuid')
+        parser.add_argument('--har', help='Import the entries of this HAR file')
+        parser.add_argument('--endpoint', help='The name of the endpoint serving the HAR entries of unknown services')
+        parser.add_argument('--replace', action='store_true', help='Remove the exchanges recorded before')
+
+    def handle(self, *args, **options):
+        try:
+            session_type = SessionType.objects.get(name=options['session_type'])
+        except SessionType.DoesNotExist:
+            raise CommandError('Session type "{}" does not exist'.format(options['session_type']))
+        if not options['session'] and not options['har']:
+            raise CommandError('Give the sessions to record (--session) or a HAR file (--har)')
+
+        exchanges = []
+        for session_uuid in options['session']:
+            try:
+                session = Session.objects.get(uuid=session_uuid, session_type=session_type)
+            except (Session.DoesNotExist, ValueError):
+                raise CommandError('Session {} of "{}" does not exist'.format(session_uuid, session_type))
+            exchanges += record_session(session)
+        if options['har']:
+            endpoint = None
+            if options['endpoint']:
+                endpoint = VNGEndpoint.objects.filter(session_type=session_type, name=options['endpoint']).first()
+                if endpoint is None:
+                    raise CommandError('Endpoint "{}" does not exist'.format(options['endpoint']))
+            with open(options['har']) as f:
+                har = json.load(f)
+            exchanges += import_har(session_type, har, endpoint, source=options['har'])
+
+        with transaction.atomic():
+            if options['replace']:
+                RecordedExchange.objects.filter(vng_endpoint__session_type=session_type).delete()
+            RecordedExchange.objects.bulk_create(exchanges, batch_size=500)
+        self.stdout.write(self.style.SUCCESS('Done, {} exchanges recorded'.format(len(exchanges))))
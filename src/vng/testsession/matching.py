@@ -0,0 +1,113 @@
+"""
+Compiled scenario case matching for the proxy.
+
+Every ``ScenarioCaseCollection`` is turned once into a ``ScenarioCaseIndex``:
+the URL patterns of its cases are compiled to regexes and grouped by HTTP
+method, ordered by the number of query parameters (most specific first). The
+index is kept in a per-process registry and is rebuilt whenever the version
+stamp of the collection in the cache changes, which happens every time one of
+its cases or query parameters is saved or deleted.
+"""
+import re
+import threading
+import uuid
+from collections import defaultdict, namedtuple
+
+from django.apps import apps
+from django.core.cache import cache
+
+PARAM_PATTERN = re.compile('{[^/]+}')
+ANY_CHARACTER = '[^/]+'
+CACHE_KEY = 'testsession:scenario-case-index:{}'
+
+Route = namedtuple('Route', ['case_id', 'regex', 'query_params'])
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def compile_case_url(url, has_query_params):
+    '''
+    Cast the url of a scenario case into a regex.
+    The url contains the parameter matching group {param}
+    '''
+    pattern = '( |/)*' + PARAM_PATTERN.sub(ANY_CHARACTER, url)
+    if has_query_params:
+        pattern += '?'
+    else:
+        pattern += '$'
+    return re.compile(pattern)
+
+
+def normalize_url(url):
+    return url.replace('/api/v1//', '/api/v1/')
+
+
+class ScenarioCaseIndex:
+    """
+    All the scenario cases of a collection, compiled and grouped by method
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+
+    @classmethod
+    def build(cls, collection_id):
+        ScenarioCase = apps.get_model('testsession', 'ScenarioCase')
+        routes = defaultdict(list)
+        cases = ScenarioCase.objects.filter(collection_id=collection_id).prefetch_related('queryparamsscenario_set')
+        for case in cases:
+            query_params = tuple(
+                (qp.name, qp.expected_value) for qp in case.queryparamsscenario_set.all()
+            )
+            routes[case.http_method.upper()].append(
+                (case.order, Route(case.pk, compile_case_url(case.url, query_params), query_params))
+            )
+        return cls({
+            method: [route for _, route in sorted(candidates, key=lambda c: (-len(c[1].query_params), c[0]))]
+            for method, candidates in routes.items()
+        })
+
+    def match(self, method, url, params):
+        '''
+        Return the primary key of the most specific scenario case matching the
+        method, the url and the query parameters, None otherwise
+        '''
+        check_url = normalize_url(url)
+        for route in self.routes.get(method.upper(), ()):
+            if route.regex.search(check_url) is None:
+                continue
+            for name, expected_value in route.query_params:
+                value = params.get(name)
+                if value is None or (expected_value != '*' and expected_value != value):
+                    break
+            else:
+                return route.case_id
+        return None
+
+
+def get_index_version(collection_id):
+    key = CACHE_KEY.format(collection_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_case_index(collection_id):
+    version = get_index_version(collection_id)
+    entry = _indexes.get(collection_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    index = ScenarioCaseIndex.build(collection_id)
+    with _lock:
+        _indexes[collection_id] = (version, index)
+    return index
+
+
+def invalidate_case_index(collection_id):
+    cache.set(CACHE_KEY.format(collection_id), uuid.uuid4().hex, None)
+    with _lock:
+        _indexes.pop(collection_id, None)
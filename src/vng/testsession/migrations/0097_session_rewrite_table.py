@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0096_auto_20200923_1054'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='rewrite_table',
+            field=models.TextField(blank=True, default=None, help_text='The pairs of upstream and exposed URLs used to rewrite the proxied bodies, computed at bootstrap', null=True),
+        ),
+    ]
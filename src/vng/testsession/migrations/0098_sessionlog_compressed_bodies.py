@@ -0,0 +1,56 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0097_session_rewrite_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionlog',
+            name='method',
+            field=models.CharField(blank=True, default='', help_text='The HTTP method of the request', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='sessionlog',
+            name='url',
+            field=models.TextField(blank=True, default='', help_text='The url that was requested'),
+        ),
+        migrations.AddField(
+            model_name='sessionlog',
+            name='upstream_url',
+            field=models.TextField(blank=True, default='', help_text='The url the request was forwarded to'),
+        ),
+        migrations.AddField(
+            model_name='sessionlog',
+            name='request_size',
+            field=models.PositiveIntegerField(blank=True, default=None, help_text='The size of the request body, in characters', null=True),
+        ),
+        migrations.AddField(
+            model_name='sessionlog',
+            name='response_size',
+            field=models.PositiveIntegerField(blank=True, default=None, help_text='The size of the response body, in characters', null=True),
+        ),
+        migrations.AddField(
+            model_name='sessionlog',
+            name='request_data',
+            field=models.BinaryField(blank=True, default=None, help_text='The headers and the body of the request, compressed', null=True),
+        ),
+        migrations.AddField(
+            model_name='sessionlog',
+            name='response_data',
+            field=models.BinaryField(blank=True, default=None, help_text='The body of the response, compressed', null=True),
+        ),
+        migrations.AlterField(
+            model_name='sessionlog',
+            name='request',
+            field=models.TextField(blank=True, default=None, help_text='The request that was done (uncompressed, legacy)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='sessionlog',
+            name='response',
+            field=models.TextField(blank=True, default=None, help_text='The response that was returned to the user (uncompressed, legacy)', null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+
+
+def set_report_session(apps, schema_editor):
+    Report = apps.get_model('testsession', 'Report')
+    SessionLog = apps.get_model('testsession', 'SessionLog')
+    Report.objects.update(session=Subquery(
+        SessionLog.objects.filter(pk=OuterRef('session_log')).values('session')[:1]
+    ))
+
+    # keep a single report per session and scenario case, the one the proxy updated
+    duplicates = Report.objects.filter(session__isnull=False).values('session', 'scenario_case').annotate(
+        count=Count('pk'), keep=Min('pk')
+    ).filter(count__gt=1)
+    for duplicate in duplicates:
+        Report.objects.filter(
+            session=duplicate['session'], scenario_case=duplicate['scenario_case']
+        ).exclude(pk=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0098_sessionlog_compressed_bodies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='session',
+            field=models.ForeignKey(help_text='The session to which this report belongs', null=True, on_delete=django.db.models.deletion.CASCADE, to='testsession.Session'),
+        ),
+        migrations.RunPython(set_report_session, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0099_report_session'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='report',
+            unique_together={('session', 'scenario_case')},
+        ),
+    ]
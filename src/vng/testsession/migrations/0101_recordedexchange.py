@@ -0,0 +1,43 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0100_report_unique_session_case'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessiontype',
+            name='replay',
+            field=models.BooleanField(blank=True, default=False, help_text='If enabled, the calls of the sandbox sessions are answered from the recorded exchanges instead of a deployed or live service'),
+        ),
+        migrations.CreateModel(
+            name='RecordedExchange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(help_text='The HTTP method of the request', max_length=10)),
+                ('path', models.CharField(help_text='The path of the request, relative to the service', max_length=1000)),
+                ('query', models.TextField(blank=True, default='', help_text='The query string of the request')),
+                ('request_hash', models.CharField(blank=True, default='', help_text='The SHA-256 of the request body, as sent to the service', max_length=64)),
+                ('status_code', models.PositiveIntegerField(help_text='The HTTP status code of the response')),
+                ('content_type', models.CharField(blank=True, default='', help_text='The content type of the response', max_length=200)),
+                ('location', models.TextField(blank=True, default='', help_text='The location header of the response')),
+                ('response_body', models.BinaryField(blank=True, default=b'', help_text='The body of the response, as sent by the service')),
+                ('source', models.CharField(blank=True, default='', help_text='Where the exchange was recorded from', max_length=200)),
+                ('recorded', models.DateTimeField(default=django.utils.timezone.now, help_text='The time at which the exchange was recorded')),
+                ('vng_endpoint', models.ForeignKey(help_text='The service that answered the call', on_delete=django.db.models.deletion.CASCADE, to='testsession.VNGEndpoint')),
+            ],
+            options={
+                'verbose_name': 'Recorded exchange',
+                'verbose_name_plural': 'Recorded exchanges',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recordedexchange',
+            index=models.Index(fields=['vng_endpoint', 'method', 'path'], name='testsession_exchange_lookup'),
+        ),
+    ]
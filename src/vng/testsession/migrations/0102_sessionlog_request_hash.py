@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0101_recordedexchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionlog',
+            name='request_hash',
+            field=models.CharField(blank=True, default='', help_text='The SHA-256 of the request body, if it was streamed and not logged as a whole', max_length=64),
+        ),
+    ]
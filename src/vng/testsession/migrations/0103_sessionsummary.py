@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0102_sessionlog_request_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionSummary',
+            fields=[
+                ('session', models.OneToOneField(help_text='The session summarized', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='testsession.Session')),
+                ('success', models.PositiveIntegerField(default=0, help_text='The number of scenario cases called successfully')),
+                ('failed', models.PositiveIntegerField(default=0, help_text='The number of scenario cases whose call failed')),
+                ('not_called', models.PositiveIntegerField(default=0, help_text='The number of reports of scenario cases not called')),
+                ('calls', models.PositiveIntegerField(default=0, help_text='The number of calls made in the session')),
+                ('last_call', models.DateTimeField(blank=True, help_text='The time of the last call made in the session', null=True)),
+            ],
+            options={
+                'verbose_name': 'Session summary',
+                'verbose_name_plural': 'Session summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0103_sessionsummary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sessionlog',
+            name='uuid',
+            field=models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, help_text='The universally unique identifier of this session log'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionlog',
+            index=models.Index(fields=['session', 'date', 'id'], name='testsession_log_keyset'),
+        ),
+    ]
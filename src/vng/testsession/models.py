@@ -1,5 +1,6 @@
 import json
 import uuid
+import zlib
 import re
 import time
 import operator
@@ -14,10 +15,11 @@ from django.conf import settings
 from django.core.validators import RegexValidator
 from django.core.files import File
 from django.db import models
-from django.db import transaction
-from django.db.models.signals import post_save
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 
@@ -31,8 +33,11 @@ from vng.accounts.models import User
 from vng.postman.choices import ResultChoices
 from vng.servervalidation.models import API
 
-from ..utils import choices
-from ..utils.auth import get_jwt
+from ..utils import badges, choices, pdf
+from ..utils.auth import check_jwt_credentials, get_jwt, invalidate_jwt_credentials, remember_jwt_credentials
+from .context import invalidate_proxy_context
+from .matching import invalidate_case_index
+from .rewrite import build_rewrite_table, truncate_text
 
 
 class SessionType(models.Model):
@@ -74,6 +79,10 @@ class SessionType(models.Model):
     active = models.BooleanField(blank=True, default=True, help_text=_(
         "Indicates whether this test scenario can be used via the web interface and the API"
     ))
+    replay = models.BooleanField(blank=True, default=False, help_text=_(
+        "If enabled, the calls of the sandbox sessions are answered from the recorded exchanges "
+        "instead of a deployed or live service"
+    ))
     api = models.ForeignKey(API, on_delete=models.PROTECT, null=True, blank=True, help_text=_(
         "The API to which this session type belongs"
     ))
@@ -92,6 +101,16 @@ class SessionType(models.Model):
         collection_ids = endpoints.values_list('scenario_collection')
         return ScenarioCase.objects.filter(collection__in=collection_ids)
 
+    @staticmethod
+    def count_scenario_cases(session_type_ids):
+        '''
+        Return the number of scenario cases of each session type, by id
+        '''
+        rows = ScenarioCase.objects.filter(collection__vngendpoint__session_type__in=session_type_ids).values(
+            'collection__vngendpoint__session_type'
+        ).annotate(n=models.Count('pk', distinct=True))
+        return {row['collection__vngendpoint__session_type']: row['n'] for row in rows}
+
     def add_auth_header(self):
         auth_header = self.injectheader_set.filter(key='Authorization').first()
         jwt_auth = get_jwt(self).credentials()['Authorization']
@@ -377,6 +396,20 @@ class QueryParamsScenario(models.Model):
             return '{} {}'.format(self.scenario_case, self.name)
 
 
+@receiver(post_save, sender=ScenarioCase, dispatch_uid='invalidate_index_case_saved')
+@receiver(post_delete, sender=ScenarioCase, dispatch_uid='invalidate_index_case_deleted')
+def invalidate_index_case(sender, instance, **kwargs):
+    invalidate_case_index(instance.collection_id)
+
+
+@receiver(post_save, sender=QueryParamsScenario, dispatch_uid='invalidate_index_query_param_saved')
+@receiver(post_delete, sender=QueryParamsScenario, dispatch_uid='invalidate_index_query_param_deleted')
+def invalidate_index_query_param(sender, instance, **kwargs):
+    collection_id = ScenarioCase.objects.filter(pk=instance.scenario_case_id).values_list('collection_id', flat=True).first()
+    if collection_id is not None:
+        invalidate_case_index(collection_id)
+
+
 class Session(models.Model):
 
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, help_text=_(
@@ -420,6 +453,9 @@ class Session(models.Model):
         "The name of the software tested by this session"
     ))
     product_role = models.CharField(max_length=100, blank=True, null=True)
+    rewrite_table = models.TextField(blank=True, null=True, default=None, help_text=_(
+        "The pairs of upstream and exposed URLs used to rewrite the proxied bodies, computed at bootstrap"
+    ))
 
     class Meta:
         verbose_name = _('Session')
@@ -452,17 +488,51 @@ class Session(models.Model):
     def is_shutting_down(self):
         return self.status == choices.StatusChoices.shutting_down
 
-    def get_report_stats(self):
-        success, failed, not_called = 0, 0, 0
-        reports = Report.objects.filter(session_log__in=self.sessionlog_set.all())
-        for report in reports:
-            if report.is_success():
-                success += 1
-            elif report.is_failed():
-                failed += 1
-            elif report.is_not_called():
-                not_called += 1
-        return success, failed, not_called + (self.session_type.scenario_cases.count() - reports.count())
+    def is_replaying(self):
+        return self.sandbox and self.session_type.replay
+
+    def compute_rewrite_table(self, exposed_urls=None):
+        '''
+        Build the rewrite table of the exposed urls, by default the ones of the session
+        '''
+        if exposed_urls is None:
+            exposed_urls = self.exposedurl_set.select_related('vng_endpoint')
+        return build_rewrite_table(exposed_urls, self.is_replaying())
+
+    def get_rewrite_table(self, exposed_urls=None):
+        if self.rewrite_table is not None:
+            return json.loads(self.rewrite_table)
+        return self.compute_rewrite_table(exposed_urls)
+
+    def update_rewrite_table(self):
+        self.rewrite_table = json.dumps(self.compute_rewrite_table())
+        self.save(update_fields=['rewrite_table'])
+
+    def get_summary(self):
+        '''
+        Return the summary loaded along with the session, as the lists do with
+        ``select_related('summary')``, else read it from the database
+        '''
+        if Session.summary.is_cached(self):
+            summary = Session.summary.related.get_cached_value(self)
+        else:
+            summary = SessionSummary.objects.filter(session=self).first()
+        if summary is None:
+            # not backfilled yet
+            SessionSummary.rebuild([self.pk])
+            summary = SessionSummary.objects.get(session=self)
+        return summary
+
+    def get_report_stats(self, case_count=None):
+        '''
+        Return the number of scenario cases succeeded, failed and not called;
+        ``case_count`` is the number of cases of the session type, if known
+        '''
+        summary = self.get_summary()
+        if case_count is None:
+            case_count = self.session_type.scenario_cases.count()
+        return summary.success, summary.failed, summary.not_called + (case_count - summary.reports)
+
 
 class ExposedUrl(models.Model):
 
@@ -489,9 +559,21 @@ class ExposedUrl(models.Model):
         return '{} {}'.format(self.session, self.vng_endpoint)
 
 
+def compress_text(text):
+    if text is None:
+        return None
+    return zlib.compress(text.encode('utf-8'))
+
+
+def decompress_text(data):
+    if data is None:
+        return None
+    return zlib.decompress(bytes(data)).decode('utf-8')
+
+
 class SessionLog(models.Model):
 
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False, help_text=_(
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, db_index=True, help_text=_(
         "The universally unique identifier of this session log"
     ))
     date = models.DateTimeField(default=timezone.now, help_text=_(
@@ -500,44 +582,183 @@ class SessionLog(models.Model):
     session = models.ForeignKey(Session, on_delete=models.SET_NULL, null=True, help_text=_(
         "The session to which this log belongs"
     ))
+    method = models.CharField(max_length=10, blank=True, default='', help_text=_(
+        "The HTTP method of the request"
+    ))
+    url = models.TextField(blank=True, default='', help_text=_(
+        "The url that was requested"
+    ))
+    upstream_url = models.TextField(blank=True, default='', help_text=_(
+        "The url the request was forwarded to"
+    ))
+    request_size = models.PositiveIntegerField(blank=True, null=True, default=None, help_text=_(
+        "The size of the request body, in characters"
+    ))
+    request_hash = models.CharField(max_length=64, blank=True, default='', help_text=_(
+        "The SHA-256 of the request body, if it was streamed and not logged as a whole"
+    ))
+    response_size = models.PositiveIntegerField(blank=True, null=True, default=None, help_text=_(
+        "The size of the response body, in characters"
+    ))
+    request_data = models.BinaryField(blank=True, null=True, default=None, help_text=_(
+        "The headers and the body of the request, compressed"
+    ))
+    response_data = models.BinaryField(blank=True, null=True, default=None, help_text=_(
+        "The body of the response, compressed"
+    ))
     request = models.TextField(blank=True, null=True, default=None, help_text=_(
-        "The request that was done"
+        "The request that was done (uncompressed, legacy)"
     ))
     response = models.TextField(blank=True, null=True, default=None, help_text=_(
-        "The response that was returned to the user"
+        "The response that was returned to the user (uncompressed, legacy)"
     ))
     response_status = models.PositiveIntegerField(blank=True, null=True, default=None, help_text=_(
         "The HTTP status code of the response"
     ))
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['session', 'date', 'id'], name='testsession_log_keyset'),
+        ]
+
     def __str__(self):
         return '{} - {} - {}'.format(str(self.date), str(self.session),
                                      str(self.response_status))
 
+    def set_request(self, method, url, headers, body, size=None):
+        '''
+        Store the request; ``size`` is the size of the whole body when ``body``
+        is not the body itself
+        '''
+        body = body or ''
+        if size is None:
+            size = len(body)
+            body = truncate_text(body, settings.PROXY_LOG_BODY_MAX_SIZE)
+        self.method = method
+        self.url = url
+        self.request_size = size
+        self.request_data = compress_text(json.dumps({
+            'header': headers,
+            'body': body,
+        }))
+        self.request = None
+        self.__dict__.pop('request_content', None)
+
+    def set_response(self, status_code, upstream_url, body, size=None):
+        '''
+        Store the response; ``size`` is the size of the whole body when ``body``
+        has already been truncated
+        '''
+        body = body or ''
+        if size is None:
+            size = len(body)
+            body = truncate_text(body, settings.PROXY_LOG_BODY_MAX_SIZE)
+        self.response_status = status_code
+        self.upstream_url = upstream_url
+        self.response_size = size
+        self.response_data = compress_text(body)
+        self.response = None
+
+    def compress_legacy(self):
+        '''
+        Move the request and the response stored as JSON text to the compressed columns
+        '''
+        request = self.request_content
+        method, __, url = request.get('path', '').partition(' ')
+        try:
+            response = json.loads(self.response)['response']
+        except (TypeError, ValueError, KeyError):
+            response = {}
+        status_code = self.response_status
+        if status_code is None:
+            status_code = response.get('status_code')
+        self.set_request(method, url, request.get('header', {}), request.get('body', ''))
+        self.set_response(status_code, response.get('path', '').partition(' ')[2], response.get('body', ''))
+
+    @cached_property
+    def request_content(self):
+        if self.request_data is not None:
+            return json.loads(decompress_text(self.request_data))
+        try:
+            return json.loads(self.request)['request']
+        except (TypeError, ValueError, KeyError):
+            return {}
+
     def request_path(self):
-        return json.loads(self.request)['request']['path']
+        if self.url:
+            return '{} {}'.format(self.method, self.url)
+        return self.request_content.get('path', '')
 
     def request_headers(self):
-        return json.loads(self.request)['request']['header']
+        return self.request_content.get('header', {})
 
     def request_body(self):
-        try:
-            return json.loads(self.request)['request']['body']
-        except:
-            return ""
+        return self.request_content.get('body', '')
 
     def response_body(self):
+        if self.response_data is not None:
+            return decompress_text(self.response_data)
         try:
             return json.loads(self.response)['response']['body']
         except:
             return ""
 
 
+class RecordedExchange(models.Model):
+
+    vng_endpoint = models.ForeignKey(VNGEndpoint, on_delete=models.CASCADE, help_text=_(
+        "The service that answered the call"
+    ))
+    method = models.CharField(max_length=10, help_text=_(
+        "The HTTP method of the request"
+    ))
+    path = models.CharField(max_length=1000, help_text=_(
+        "The path of the request, relative to the service"
+    ))
+    query = models.TextField(blank=True, default='', help_text=_(
+        "The query string of the request"
+    ))
+    request_hash = models.CharField(max_length=64, blank=True, default='', help_text=_(
+        "The SHA-256 of the request body, as sent to the service"
+    ))
+    status_code = models.PositiveIntegerField(help_text=_(
+        "The HTTP status code of the response"
+    ))
+    content_type = models.CharField(max_length=200, blank=True, default='', help_text=_(
+        "The content type of the response"
+    ))
+    location = models.TextField(blank=True, default='', help_text=_(
+        "The location header of the response"
+    ))
+    response_body = models.BinaryField(blank=True, default=b'', help_text=_(
+        "The body of the response, as sent by the service"
+    ))
+    source = models.CharField(max_length=200, blank=True, default='', help_text=_(
+        "Where the exchange was recorded from"
+    ))
+    recorded = models.DateTimeField(default=timezone.now, help_text=_(
+        "The time at which the exchange was recorded"
+    ))
+
+    class Meta:
+        verbose_name = _('Recorded exchange')
+        verbose_name_plural = _('Recorded exchanges')
+        indexes = [
+            models.Index(fields=['vng_endpoint', 'method', 'path'], name='testsession_exchange_lookup'),
+        ]
+
+    def __str__(self):
+        return '{} {} {}'.format(self.vng_endpoint, self.method, self.path)
+
+
 class Report(models.Model):
 
     class Meta:
-        unique_together = ('scenario_case', 'session_log')
+        unique_together = ('session', 'scenario_case')
 
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, null=True, help_text=_(
+        "The session to which this report belongs"
+    ))
     scenario_case = models.ForeignKey(ScenarioCase, on_delete=models.CASCADE, help_text=_(
         "The scenario case to which this report belongs"
     ))
@@ -548,6 +769,55 @@ class Report(models.Model):
         "Indicates the whether the call specified in the scenario case has been called yet, and if it has succeeded or not"
     ))
 
+    @classmethod
+    def upsert_call(cls, session, scenario_case_id, session_log, failed):
+        '''
+        Create or update in one statement the report of the session for the scenario
+        case with a matching call, following the rules of ``record_call``
+
+        Returns:
+            Tuple -- The result of the report before the call (None if there was no report) and after it
+        '''
+        result = choices.HTTPCallChoices.failed if failed else choices.HTTPCallChoices.success
+        # exact as long as the caller holds the lock of the session summary
+        previous = cls.objects.filter(
+            session=session, scenario_case_id=scenario_case_id
+        ).values_list('result', flat=True).first()
+        if failed or previous != choices.HTTPCallChoices.failed or session.sandbox:
+            current = result
+        else:
+            current = previous
+
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            with transaction.atomic():
+                report, __ = cls.objects.select_for_update().get_or_create(
+                    session=session, scenario_case_id=scenario_case_id,
+                    defaults={'session_log': session_log, 'result': result}
+                )
+                report.record_call(session_log, failed, session.sandbox)
+                report.save()
+            return previous, current
+
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} ({session}, {case}, {log}, {result}) VALUES (%s, %s, %s, %s) '
+                'ON CONFLICT ({session}, {case}) DO UPDATE '
+                'SET {log} = excluded.{log}, {result} = excluded.{result} '
+                'WHERE excluded.{result} = %s OR {table}.{result} <> %s OR %s'.format(
+                    table=qn(cls._meta.db_table),
+                    session=qn('session_id'),
+                    case=qn('scenario_case_id'),
+                    log=qn('session_log_id'),
+                    result=qn('result'),
+                ),
+                [
+                    session.pk, scenario_case_id, session_log.pk, result,
+                    choices.HTTPCallChoices.failed, choices.HTTPCallChoices.failed, session.sandbox,
+                ]
+            )
+        return previous, current
+
     def is_success(self):
         return self.result == choices.HTTPCallChoices.success
 
@@ -557,5 +827,229 @@ class Report(models.Model):
     def is_not_called(self):
         return self.result == choices.HTTPCallChoices.not_called
 
+    def record_call(self, session_log, failed, sandbox=False):
+        '''
+        Update the result with a call matching the scenario case. Once failed,
+        the result is kept failed unless the session is a sandbox.
+        '''
+        if failed:
+            self.result = choices.HTTPCallChoices.failed
+            self.session_log = session_log
+        elif not self.is_failed() or sandbox:
+            self.result = choices.HTTPCallChoices.success
+            self.session_log = session_log
+
     def __str__(self):
         return 'Case: {} - Log: {} - Result: {}'.format(self.scenario_case, self.session_log, self.result)
+
+
+class SessionSummary(models.Model):
+
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, primary_key=True, related_name='summary', help_text=_(
+        "The session summarized"
+    ))
+    success = models.PositiveIntegerField(default=0, help_text=_(
+        "The number of scenario cases called successfully"
+    ))
+    failed = models.PositiveIntegerField(default=0, help_text=_(
+        "The number of scenario cases whose call failed"
+    ))
+    not_called = models.PositiveIntegerField(default=0, help_text=_(
+        "The number of reports of scenario cases not called"
+    ))
+    calls = models.PositiveIntegerField(default=0, help_text=_(
+        "The number of calls made in the session"
+    ))
+    last_call = models.DateTimeField(blank=True, null=True, help_text=_(
+        "The time of the last call made in the session"
+    ))
+
+    class Meta:
+        verbose_name = _('Session summary')
+        verbose_name_plural = _('Session summaries')
+
+    def __str__(self):
+        return str(self.session_id)
+
+    @property
+    def reports(self):
+        return self.success + self.failed + self.not_called
+
+    def count(self, result, delta):
+        if result == choices.HTTPCallChoices.success:
+            self.success += delta
+        elif result == choices.HTTPCallChoices.failed:
+            self.failed += delta
+        elif result == choices.HTTPCallChoices.not_called:
+            self.not_called += delta
+
+    @classmethod
+    def lock(cls, session_id):
+        try:
+            return cls.objects.select_for_update().get(session_id=session_id)
+        except cls.DoesNotExist:
+            cls.rebuild([session_id])
+            return cls.objects.select_for_update().get(session_id=session_id)
+
+    @classmethod
+    def record_call(cls, session, session_log, scenario_case_id=None, failed=False):
+        '''
+        Count a call of the session and update the report of the scenario case it
+        matches, if any, in one transaction. The lock of the summary serializes the
+        calls of a session.
+        '''
+        with transaction.atomic():
+            summary = cls.lock(session.pk)
+            summary.calls += 1
+            if summary.last_call is None or summary.last_call < session_log.date:
+                summary.last_call = session_log.date
+            if scenario_case_id is not None:
+                previous, current = Report.upsert_call(session, scenario_case_id, session_log, failed)
+                if previous is not None:
+                    summary.count(previous, -1)
+                summary.count(current, 1)
+            summary.save()
+        if scenario_case_id is not None and previous != current:
+            badges.invalidate_badge(badges.SESSION, session.uuid)
+        return summary
+
+    @classmethod
+    def rebuild(cls, session_ids):
+        '''
+        Count again the reports and the calls of the sessions
+        '''
+        session_ids = list(session_ids)
+        summaries = {pk: cls(session_id=pk) for pk in session_ids}
+        reports = Report.objects.filter(session__in=session_ids).values('session', 'result').annotate(
+            n=models.Count('pk')
+        )
+        for row in reports:
+            summaries[row['session']].count(row['result'], row['n'])
+        logs = SessionLog.objects.filter(session__in=session_ids).values('session').annotate(
+            n=models.Count('pk'), last=models.Max('date')
+        )
+        for row in logs:
+            summaries[row['session']].calls = row['n']
+            summaries[row['session']].last_call = row['last']
+
+        with transaction.atomic():
+            existing = set(cls.objects.filter(session__in=session_ids).values_list('session_id', flat=True))
+            cls.objects.bulk_update(
+                [summary for pk, summary in summaries.items() if pk in existing],
+                ['success', 'failed', 'not_called', 'calls', 'last_call']
+            )
+            cls.objects.bulk_create(
+                [summary for pk, summary in summaries.items() if pk not in existing], ignore_conflicts=True
+            )
+        for session_uuid in Session.objects.filter(pk__in=session_ids).values_list('uuid', flat=True):
+            badges.invalidate_badge(badges.SESSION, session_uuid)
+
+    @classmethod
+    def refresh_reports(cls, session_id):
+        '''
+        Count again the reports of the session, after a report was changed directly
+        '''
+        counts = dict(Report.objects.filter(session=session_id).values_list('result').annotate(n=models.Count('pk')))
+        cls.objects.filter(session_id=session_id).update(
+            success=counts.get(choices.HTTPCallChoices.success, 0),
+            failed=counts.get(choices.HTTPCallChoices.failed, 0),
+            not_called=counts.get(choices.HTTPCallChoices.not_called, 0),
+        )
+        badges.invalidate_badge(
+            badges.SESSION, Session.objects.filter(pk=session_id).values_list('uuid', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Session, dispatch_uid='create_session_summary')
+def create_session_summary(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        # by id, so the session does not cache the summary the calls will update
+        SessionSummary.objects.get_or_create(session_id=instance.pk)
+
+
+@receiver(post_save, sender=Session, dispatch_uid='invalidate_badge_session_saved')
+@receiver(post_delete, sender=Session, dispatch_uid='invalidate_badge_session_deleted')
+def invalidate_badge_session(sender, instance, **kwargs):
+    badges.invalidate_badge(badges.SESSION, instance.uuid)
+
+
+@receiver(post_save, sender=Session, dispatch_uid='invalidate_pdfs_session_saved')
+@receiver(post_delete, sender=Session, dispatch_uid='invalidate_pdfs_session_deleted')
+def invalidate_pdfs_session(sender, instance, **kwargs):
+    pdf.invalidate_pdfs(pdf.SESSION, instance.uuid)
+
+
+@receiver(post_save, sender=Report, dispatch_uid='refresh_summary_report_saved')
+@receiver(post_delete, sender=Report, dispatch_uid='refresh_summary_report_deleted')
+def refresh_summary_report(sender, instance, raw=False, **kwargs):
+    if instance.session_id is not None and not raw:
+        SessionSummary.refresh_reports(instance.session_id)
+
+
+def refresh_rewrite_tables(sessions):
+    # the sessions not bootstrapped yet have no table, they compute it on demand
+    for session in sessions.exclude(rewrite_table=None).select_related('session_type'):
+        table = json.dumps(session.compute_rewrite_table())
+        # not saved, the exposed url and endpoint receivers already invalidate what depends on the session
+        Session.objects.filter(pk=session.pk).update(rewrite_table=table)
+
+
+def invalidate_session_type_context(session_type_id):
+    invalidate_proxy_context(
+        ExposedUrl.objects.filter(session__session_type=session_type_id)
+        .exclude(session__status=choices.StatusChoices.stopped)
+        .values_list('subdomain', flat=True)
+    )
+
+
+@receiver(post_save, sender=Session, dispatch_uid='invalidate_context_session_saved')
+def invalidate_context_session(sender, instance, **kwargs):
+    invalidate_proxy_context(instance.exposedurl_set.values_list('subdomain', flat=True))
+
+
+@receiver(post_save, sender=ExposedUrl, dispatch_uid='invalidate_context_exposed_url_saved')
+@receiver(post_delete, sender=ExposedUrl, dispatch_uid='invalidate_context_exposed_url_deleted')
+def invalidate_context_exposed_url(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_rewrite_tables(Session.objects.filter(pk=instance.session_id))
+    subdomains = set(ExposedUrl.objects.filter(session=instance.session_id).values_list('subdomain', flat=True))
+    subdomains.add(instance.subdomain)
+    invalidate_proxy_context(subdomains)
+
+
+@receiver(post_save, sender=SessionType, dispatch_uid='invalidate_context_session_type_saved')
+def invalidate_context_session_type(sender, instance, **kwargs):
+    invalidate_session_type_context(instance.pk)
+
+
+@receiver(post_init, sender=SessionType, dispatch_uid='remember_credentials_session_type')
+def remember_credentials_session_type(sender, instance, **kwargs):
+    remember_jwt_credentials(instance)
+
+
+@receiver(post_save, sender=SessionType, dispatch_uid='check_credentials_session_type_saved')
+def check_credentials_session_type(sender, instance, **kwargs):
+    check_jwt_credentials(instance)
+
+
+@receiver(post_delete, sender=SessionType, dispatch_uid='invalidate_credentials_session_type_deleted')
+def invalidate_credentials_session_type(sender, instance, **kwargs):
+    invalidate_jwt_credentials(instance.client_id)
+
+
+@receiver(post_save, sender=VNGEndpoint, dispatch_uid='refresh_rewrite_tables_endpoint_saved')
+def refresh_rewrite_tables_endpoint(sender, instance, raw=False, **kwargs):
+    # a deleted endpoint deletes its exposed urls, their receiver refreshes the tables
+    if not raw:
+        refresh_rewrite_tables(
+            Session.objects.filter(exposedurl__vng_endpoint=instance.pk)
+            .exclude(status=choices.StatusChoices.stopped).distinct()
+        )
+
+
+@receiver(post_save, sender=VNGEndpoint, dispatch_uid='invalidate_context_endpoint_saved')
+@receiver(post_delete, sender=VNGEndpoint, dispatch_uid='invalidate_context_endpoint_deleted')
+@receiver(post_save, sender=InjectHeader, dispatch_uid='invalidate_context_header_saved')
+@receiver(post_delete, sender=InjectHeader, dispatch_uid='invalidate_context_header_deleted')
+def invalidate_context_session_type_related(sender, instance, **kwargs):
+    invalidate_session_type_context(instance.session_type_id)
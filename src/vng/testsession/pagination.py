@@ -0,0 +1,84 @@
+"""
+Keyset pagination of the session logs.
+
+A page of logs is selected by the ``(date, id)`` of the last log of the page
+before it (or of the first log of the page after it), instead of by an
+offset, so every page is an index range scan on ``(session, date, id)``
+whatever its position in the session. The position is passed around as an
+opaque cursor in the query string.
+"""
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(log):
+    value = '{}|{}'.format(log.date.isoformat(), log.pk)
+    return base64.urlsafe_b64encode(value.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    '''
+    Return the (date, id) of the cursor, None if it is not valid
+    '''
+    cursor += '=' * (-len(cursor) % 4)
+    try:
+        date, __, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').partition('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return date, pk
+
+
+class KeysetPage:
+    '''
+    A page of ``page_size`` logs after (or before) the position of a cursor
+    '''
+
+    def __init__(self, queryset, page_size, after=None, before=None):
+        after = decode_cursor(after) if after else None
+        before = decode_cursor(before) if before and not after else None
+
+        if before is not None:
+            date, pk = before
+            queryset = queryset.filter(date__lte=date).filter(Q(date__lt=date) | Q(pk__lt=pk)).order_by('-date', '-pk')
+        else:
+            if after is not None:
+                date, pk = after
+                queryset = queryset.filter(date__gte=date).filter(Q(date__gt=date) | Q(pk__gt=pk))
+            queryset = queryset.order_by('date', 'pk')
+
+        # one more row tells whether there is a page further
+        rows = list(queryset[:page_size + 1])
+        further = len(rows) > page_size
+        rows = rows[:page_size]
+        if before is not None:
+            rows.reverse()
+            self.has_previous, self.has_next = further, True
+        else:
+            self.has_previous, self.has_next = after is not None, further
+
+        self.object_list = rows
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_previous or self.has_next
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
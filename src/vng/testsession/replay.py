@@ -0,0 +1,210 @@
+"""
+Record and replay of the upstream exchanges.
+
+A sandbox session of a session type with ``replay`` enabled is not deployed
+nor forwarded to a live service: its calls are answered from the exchanges
+recorded for the endpoints of the session type. The proxy still logs the
+calls, updates the reports and rewrites the urls of the replayed bodies.
+
+The exchanges are recorded from the session logs of earlier sessions or
+imported from a HAR file. The bodies are stored as sent to and by the
+service, with the address of a deployed service replaced by its replay
+upstream (see ``rewrite.replay_upstream``), so they are rewritten for the
+replaying session like the ones of a live service.
+
+A call is answered by the most recent exchange with the same method and
+path, preferring the ones with the same query string and request body. A
+call without any recorded exchange gets a 404.
+"""
+import base64
+import hashlib
+import json
+import logging
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from django.apps import apps
+
+from .rewrite import UrlRewriter, build_rewrite_table, replay_upstream
+
+logger = logging.getLogger(__name__)
+
+
+def body_hash(body):
+    if not body:
+        return ''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.sha256(body).hexdigest()
+
+
+def split_url(url, base):
+    '''
+    Return the path relative to the base and the query string of the url,
+    None if the url is not below the base
+    '''
+    base = base.rstrip('/')
+    if not url.startswith(base):
+        return None
+    rest = url[len(base):]
+    if rest and rest[0] not in '/?':
+        return None
+    path, __, query = rest.lstrip('/').partition('?')
+    return path, query
+
+
+def guess_content_type(body):
+    try:
+        json.loads(body)
+    except ValueError:
+        return 'text/plain; charset=utf-8'
+    return 'application/json'
+
+
+def record_session(session):
+    '''
+    Return the (unsaved) exchanges of the complete calls logged for the session
+    '''
+    SessionLog = apps.get_model('testsession', 'SessionLog')
+    RecordedExchange = apps.get_model('testsession', 'RecordedExchange')
+
+    request_rewriter = UrlRewriter.for_request(session.get_rewrite_table())
+    bases = []
+    for eu in session.exposedurl_set.select_related('vng_endpoint'):
+        table = build_rewrite_table([eu])
+        if table:
+            bases.append((table[0][0], eu.vng_endpoint))
+    # longest first, an upstream may be below another one
+    bases.sort(key=lambda base: len(base[0]), reverse=True)
+    normalizer = UrlRewriter((base, replay_upstream(endpoint)) for base, endpoint in bases)
+
+    exchanges = []
+    for log in SessionLog.objects.filter(session=session).order_by('date', 'pk'):
+        if not log.method:
+            log.compress_legacy()
+        body = log.response_body()
+        if log.response_status is None or not log.upstream_url or log.response_size != len(body):
+            # failed, truncated or binary, the body is not known
+            continue
+        for base, endpoint in bases:
+            split = split_url(log.upstream_url, base)
+            if split is not None:
+                break
+        else:
+            continue
+        request_body = log.request_body()
+        if log.request_size is not None and log.request_size != len(request_body):
+            request_hash = ''
+        else:
+            request_hash = body_hash(normalizer.rewrite(request_rewriter.rewrite(request_body)))
+        exchanges.append(RecordedExchange(
+            vng_endpoint=endpoint,
+            method=log.method.upper(),
+            path=split[0],
+            query=split[1],
+            request_hash=request_hash,
+            status_code=log.response_status,
+            content_type=guess_content_type(body),
+            response_body=normalizer.rewrite(body).encode('utf-8'),
+            source='session {}'.format(session.uuid),
+            recorded=log.date,
+        ))
+    return exchanges
+
+
+def import_har(session_type, har, vng_endpoint=None, source=''):
+    '''
+    Return the (unsaved) exchanges of the entries of a HAR document. The
+    entries are assigned to the endpoint of the session type whose url they
+    are below, or to ``vng_endpoint`` relative to the origin of their url.
+    '''
+    RecordedExchange = apps.get_model('testsession', 'RecordedExchange')
+    endpoints = sorted(
+        [ep for ep in session_type.vngendpoint_set.all() if ep.url is not None],
+        key=lambda ep: len(ep.url), reverse=True
+    )
+    exchanges = []
+    for entry in har['log']['entries']:
+        request, response = entry['request'], entry['response']
+        url = request['url']
+        for endpoint in endpoints:
+            split = split_url(url, endpoint.url)
+            if split is not None:
+                base = endpoint.url
+                break
+        else:
+            if vng_endpoint is None:
+                logger.warning('No endpoint of %s serves %s', session_type, url)
+                continue
+            endpoint = vng_endpoint
+            parts = requests.utils.urlparse(url)
+            base = '{}://{}/'.format(parts.scheme, parts.netloc)
+            split = split_url(url, base)
+        normalizer = UrlRewriter([(base, replay_upstream(endpoint))])
+
+        headers = CaseInsensitiveDict((h['name'], h['value']) for h in response.get('headers', []))
+        content = response.get('content', {})
+        text = content.get('text', '')
+        if content.get('encoding') == 'base64':
+            body = base64.b64decode(text)
+        else:
+            body = text.encode('utf-8')
+        content_type = content.get('mimeType') or headers.get('Content-Type', '')
+        request_body = request.get('postData', {}).get('text', '')
+        exchanges.append(RecordedExchange(
+            vng_endpoint=endpoint,
+            method=request['method'].upper(),
+            path=split[0],
+            query=split[1],
+            request_hash=body_hash(normalizer.rewrite(request_body)),
+            status_code=response['status'],
+            content_type=content_type,
+            location=normalizer.rewrite(headers.get('Location', '')),
+            response_body=normalizer.rewrite_body(body, content_type),
+            source=source,
+        ))
+    return exchanges
+
+
+def find_exchange(vng_endpoint, method, path, query, body):
+    RecordedExchange = apps.get_model('testsession', 'RecordedExchange')
+    # the bodies can be large, only the one of the match is loaded when it is read
+    candidates = list(RecordedExchange.objects.filter(
+        vng_endpoint=vng_endpoint, method=method.upper(), path=path
+    ).defer('response_body').order_by('-recorded', '-pk'))
+    if not candidates:
+        return None
+    digest = body_hash(body)
+    # max keeps the first, the most recent, of the best matches
+    return max(candidates, key=lambda e: (e.query == query, bool(digest) and e.request_hash == digest))
+
+
+def build_response(status_code, headers, body, url):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict({k: v for k, v in headers.items() if v})
+    response._content = bytes(body)
+    response._content_consumed = True
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = url
+    return response
+
+
+def replay_call(vng_endpoint, method, path, query, body, url):
+    '''
+    Return the response (a ``requests.Response``) of the exchange recorded for the call
+    '''
+    path = path.lstrip('/')
+    exchange = find_exchange(vng_endpoint, method, path, query, body)
+    if exchange is None:
+        logger.info('No exchange recorded for %s %s', method.upper(), url)
+        detail = 'No exchange was recorded for {} /{}'.format(method.upper(), path)
+        return build_response(
+            404, {'Content-Type': 'application/json'}, json.dumps({'detail': detail}).encode('utf-8'), url
+        )
+    return build_response(exchange.status_code, {
+        'Content-Type': exchange.content_type,
+        'Location': exchange.location,
+    }, exchange.response_body, url)
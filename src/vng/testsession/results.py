@@ -0,0 +1,86 @@
+"""
+Assembly of the results of a session.
+
+The result page, the result API and the badge of a session all pair the
+scenario cases of the session type with the reports of the session. A
+``SessionResult`` loads the endpoints, the cases and the reports in a fixed
+number of queries, whatever the number of cases, and joins them by id.
+"""
+from django.apps import apps
+
+from ..utils import choices
+
+
+class SessionResult:
+
+    def __init__(self, session, details=False):
+        '''
+        With ``details`` the query parameters of the cases and the status of
+        the logged calls are loaded too, for the report page
+        '''
+        VNGEndpoint = apps.get_model('testsession', 'VNGEndpoint')
+        ScenarioCase = apps.get_model('testsession', 'ScenarioCase')
+        Report = apps.get_model('testsession', 'Report')
+
+        self.session = session
+        self.endpoints = list(
+            VNGEndpoint.objects.filter(session_type=session.session_type_id).select_related('scenario_collection')
+        )
+        collection_ids = {ep.scenario_collection_id for ep in self.endpoints if ep.scenario_collection_id}
+        cases = ScenarioCase.objects.filter(collection__in=collection_ids).order_by('collection', 'order')
+        if details:
+            cases = cases.prefetch_related('queryparamsscenario_set')
+        self.cases = list(cases)
+        self.cases_by_collection = {}
+        for case in self.cases:
+            self.cases_by_collection.setdefault(case.collection_id, []).append(case)
+
+        reports = Report.objects.filter(session=session, scenario_case__in=[case.pk for case in self.cases])
+        if details:
+            reports = reports.select_related('session_log').defer(
+                'session_log__request_data', 'session_log__response_data',
+                'session_log__request', 'session_log__response',
+            )
+        self.reports = {report.scenario_case_id: report for report in reports}
+
+    def report(self, case):
+        '''
+        Return the report of the case, an unsaved one not called if the case has not been called
+        '''
+        report = self.reports.get(case.pk)
+        if report is None:
+            Report = apps.get_model('testsession', 'Report')
+            report = Report(session=self.session, result=choices.HTTPCallChoices.not_called)
+        report.scenario_case = case
+        return report
+
+    def case_reports(self):
+        '''
+        Return the reports of all the cases, in the order of the cases
+        '''
+        return [self.report(case) for case in self.cases]
+
+    def endpoint_reports(self):
+        '''
+        Return the pairs (endpoint, reports of its cases) of the endpoints with cases
+        '''
+        return [
+            (endpoint, [self.report(case) for case in self.cases_by_collection[endpoint.scenario_collection_id]])
+            for endpoint in self.endpoints
+            if endpoint.scenario_collection_id in self.cases_by_collection
+        ]
+
+    def has_cases(self):
+        return bool(self.cases)
+
+    def is_failed(self):
+        return any(report.is_failed() for report in self.reports.values())
+
+    def is_complete(self):
+        '''
+        Whether every case has been called
+        '''
+        return all(
+            case.pk in self.reports and not self.reports[case.pk].is_not_called()
+            for case in self.cases
+        )
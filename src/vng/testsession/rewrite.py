@@ -0,0 +1,307 @@
+"""
+URL rewriting of the bodies going through the proxy.
+
+The rewrite table of a session pairs the upstream URL of every exposed
+endpoint with the URL under which the platform exposes it; it is computed once
+when the session is bootstrapped.
+
+A ``UrlRewriter`` replaces a set of literal URLs by their substitutes in a
+single scan. The alternatives are tried longest first, so an URL is never
+partially rewritten by a shorter one sharing its prefix. Since every match is
+at most as long as the longest URL, the rewriter can also work on a stream of
+chunks, holding back just enough characters to never split a match.
+
+How a body is rewritten depends on its content type: JSON bodies have their
+string values rewritten, text bodies are rewritten as a whole, the text
+fields of multipart bodies are rewritten while their files are passed
+through, and binary bodies are passed through byte for byte. Binary and
+multipart bodies are logged only by their content type and size.
+"""
+import codecs
+import json
+import re
+from urllib import parse
+
+from subdomains.utils import reverse as reverse_sub
+
+
+JSON = 'json'
+TEXT = 'text'
+MULTIPART = 'multipart'
+BINARY = 'binary'
+
+TEXT_TYPES = (
+    'application/javascript',
+    'application/x-www-form-urlencoded',
+    'application/xml',
+)
+
+JSON_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+BINARY_BODY = '[{} body of {} bytes, not logged]'
+
+REPLAY_UPSTREAM = 'http://endpoint-{}.replay.invalid/'
+
+
+def body_kind(content_type):
+    '''
+    Return how a body of the content type is rewritten: JSON, TEXT, MULTIPART or BINARY
+    '''
+    mime = (content_type or '').split(';')[0].strip().lower()
+    if not mime or mime.startswith('text/') or mime in TEXT_TYPES or mime.endswith('+xml'):
+        return TEXT
+    if mime == 'application/json' or mime.endswith('+json'):
+        return JSON
+    if mime.startswith('multipart/'):
+        return MULTIPART
+    return BINARY
+
+
+def content_type_param(content_type, name):
+    for param in (content_type or '').split(';')[1:]:
+        key, __, value = param.strip().partition('=')
+        if key.strip().lower() == name:
+            return value.strip().strip('"')
+    return None
+
+
+def binary_log_text(content_type, size):
+    '''
+    Return the text logged in place of a binary body
+    '''
+    return BINARY_BODY.format((content_type or '').split(';')[0].strip(), size)
+
+
+def log_body(body, content_type, encoding=None):
+    '''
+    Return the text of a body for the session log, and its size if the text is
+    not the body itself
+    '''
+    if body and body_kind(content_type) in (BINARY, MULTIPART):
+        return binary_log_text(content_type, len(body)), len(body)
+    encoding = encoding or content_type_param(content_type, 'charset') or 'utf-8'
+    try:
+        return body.decode(encoding, errors='replace'), None
+    except LookupError:
+        return body.decode('utf-8', errors='replace'), None
+
+
+def replay_upstream(vng_endpoint):
+    '''
+    Return the upstream url the exchanges recorded for the endpoint refer to;
+    the address of a deployed service changes with every session
+    '''
+    if vng_endpoint.url is not None:
+        return vng_endpoint.url
+    return REPLAY_UPSTREAM.format(vng_endpoint.pk)
+
+
+def build_rewrite_table(exposed_urls, replay=False):
+    '''
+    Return the pairs [upstream url, exposed url] of the exposed urls of a session;
+    the deployed services of a replaying session are replaced by their replay upstream
+    '''
+    table = []
+    for eu in exposed_urls:
+        if eu.subdomain is None:
+            continue
+        sub = reverse_sub('run_test', eu.subdomain, kwargs={
+            'relative_url': ''
+        })
+        upstream = eu.vng_endpoint.url
+        if upstream is not None:
+            if not upstream.endswith('/'):
+                if sub.endswith('/'):
+                    sub = sub[:-1]
+            elif not sub.endswith('/'):
+                sub = sub + '/'
+        else:
+            if replay:
+                upstream = replay_upstream(eu.vng_endpoint)
+            elif eu.docker_url is None:
+                continue
+            else:
+                upstream = '{}://{}:{}/'.format(parse.urlparse(sub).scheme, eu.docker_url, eu.port)
+            if not sub.endswith('/'):
+                sub = sub + '/'
+        table.append([upstream, sub])
+    return table
+
+
+class UrlRewriter:
+
+    @classmethod
+    def for_response(cls, table):
+        return cls((upstream, exposed) for upstream, exposed in table)
+
+    @classmethod
+    def for_request(cls, table):
+        return cls((exposed, upstream) for upstream, exposed in table)
+
+    def __init__(self, substitutions):
+        self.substitutions = {}
+        for source, target in substitutions:
+            if source and source not in self.substitutions:
+                self.substitutions[source] = target
+        sources = sorted(self.substitutions, key=len, reverse=True)
+        self.max_length = len(sources[0]) if sources else 0
+        self.regex = re.compile('|'.join(re.escape(s) for s in sources)) if sources else None
+
+    def replace(self, match):
+        return self.substitutions[match.group(0)]
+
+    def rewrite(self, text):
+        if self.regex is None or not text:
+            return text
+        return self.regex.sub(self.replace, text)
+
+    def rewrite_json(self, text):
+        '''
+        Rewrite the string values of a JSON document, keeping its formatting
+        '''
+        if self.regex is None or '\\/' not in text:
+            # the urls contain no quotes, every match lies inside a string
+            return self.rewrite(text)
+        return JSON_STRING.sub(self.rewrite_json_string, text)
+
+    def rewrite_json_string(self, match):
+        token = match.group(0)
+        if '\\/' not in token:
+            return self.rewrite(token)
+        try:
+            value = json.loads(token)
+        except ValueError:
+            return self.rewrite(token)
+        rewritten = self.rewrite(value)
+        if rewritten == value:
+            return token
+        return json.dumps(rewritten, ensure_ascii=False)
+
+    def rewrite_multipart(self, body, boundary):
+        '''
+        Rewrite the text fields of a multipart body, the files are passed through
+        '''
+        if not boundary:
+            return body
+        delimiter = b'--' + boundary.encode('latin-1')
+        parts = body.split(delimiter)
+        for i, part in enumerate(parts):
+            head, separator, content = part.partition(b'\r\n\r\n')
+            if not separator:
+                continue
+            headers = head.decode('latin-1').lower()
+            part_type = ''
+            for line in headers.split('\r\n'):
+                if line.startswith('content-type:'):
+                    part_type = line.split(':', 1)[1].strip()
+            if 'filename=' in headers or body_kind(part_type) in (BINARY, MULTIPART):
+                continue
+            parts[i] = head + separator + self.rewrite_body(content, part_type)
+        return delimiter.join(parts)
+
+    def rewrite_body(self, body, content_type, encoding=None):
+        '''
+        Rewrite a body (bytes) according to its content type
+        '''
+        kind = body_kind(content_type)
+        if self.regex is None or not body or kind == BINARY:
+            return body
+        if kind == MULTIPART:
+            return self.rewrite_multipart(body, content_type_param(content_type, 'boundary'))
+        encoding = encoding or content_type_param(content_type, 'charset') or 'utf-8'
+        try:
+            text = body.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            return body
+        rewritten = self.rewrite_json(text) if kind == JSON else self.rewrite(text)
+        if rewritten == text:
+            return body
+        return rewritten.encode(encoding)
+
+    def rewrite_stream(self, chunks):
+        '''
+        Rewrite an iterable of strings, yielding the rewritten text as soon as
+        no match can span beyond it
+        '''
+        if self.regex is None:
+            yield from chunks
+            return
+
+        hold = self.max_length - 1
+        buffer = ''
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer += chunk
+            safe = len(buffer) - hold
+            if safe <= 0:
+                continue
+            output = []
+            position = 0
+            for match in self.regex.finditer(buffer):
+                if match.start() >= safe:
+                    break
+                output.append(buffer[position:match.start()])
+                output.append(self.replace(match))
+                position = match.end()
+            cut = max(position, safe)
+            output.append(buffer[position:cut])
+            buffer = buffer[cut:]
+            yield ''.join(output)
+        if buffer:
+            yield self.rewrite(buffer)
+
+
+def decode_stream(chunks, encoding):
+    '''
+    Decode an iterable of bytes without splitting multi-byte characters
+    '''
+    decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+class BodyCapture:
+    """
+    Keeps at most ``max_size`` characters of a body for the session log
+    """
+    TRUNCATED = '\n[... truncated, {} characters in total]'
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.parts = []
+        self.captured = 0
+        self.size = 0
+
+    def feed(self, text):
+        self.size += len(text)
+        if self.max_size is None:
+            self.parts.append(text)
+        elif self.captured < self.max_size:
+            part = text[:self.max_size - self.captured]
+            self.parts.append(part)
+            self.captured += len(part)
+
+    @property
+    def truncated(self):
+        return self.max_size is not None and self.size > self.max_size
+
+    def getvalue(self):
+        value = ''.join(self.parts)
+        if self.truncated:
+            value += self.TRUNCATED.format(self.size)
+        return value
+
+
+def truncate_text(text, max_size):
+    '''
+    Return the text cut to at most ``max_size`` characters, with the marker of BodyCapture
+    '''
+    capture = BodyCapture(max_size)
+    capture.feed(text)
+    return capture.getvalue()
@@ -31,7 +31,7 @@ def stop_session(session_uuid):
     run_tests(session.uuid)
     eu = ExposedUrl.objects.filter(session=session)
     for e_url in eu:
-        if e_url.vng_endpoint.url is None:
+        if e_url.vng_endpoint.url is None and not session.is_replaying():
             kuber = K8S(app_name=session.name)
             kuber.delete()
     session.status = choices.StatusChoices.stopped
@@ -188,6 +188,7 @@ def ZGW_deploy(session):
         'postgres'
     ])
     update_session_status(session, _('Installation successful'), 100)
+    session.update_rewrite_table()
     session.status = choices.StatusChoices.running
     session.save()
 
@@ -214,6 +215,24 @@ def external_ip_pooling(k8s, session, n_trial=15, purge=True, percentage=36, max
     return None
 
 
+def bootstrap_replay(session):
+    '''
+    Expose the endpoints of a session answered from the recorded exchanges,
+    nothing is deployed
+    '''
+    for ep in VNGEndpoint.objects.filter(session_type=session.session_type):
+        ExposedUrl.objects.create(
+            session=session,
+            vng_endpoint=ep,
+            subdomain=uuid.uuid4(),
+            port=ep.port
+        )
+    session.update_rewrite_table()
+    session.deploy_percentage = 100
+    session.status = choices.StatusChoices.running
+    session.save()
+
+
 @app.task
 def bootstrap_session(session_uuid, purged=False):
     '''
@@ -221,6 +240,9 @@ def bootstrap_session(session_uuid, purged=False):
     In case there is one or multiple docker images linked, it starts all of them
     '''
     session = Session.objects.get(uuid=session_uuid)
+    if session.is_replaying():
+        bootstrap_replay(session)
+        return
     if session.session_type.ZGW_images:
         ZGW_deploy(session)
         return
@@ -288,6 +310,7 @@ def bootstrap_session(session_uuid, purged=False):
 
         update_session_status(session, _('Installation performed successfully'), 100)
 
+    session.update_rewrite_table()
     session.status = choices.StatusChoices.running
     session.save()
 
@@ -0,0 +1,166 @@
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+import httpx
+from subdomains.utils import reverse as reverse_sub
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from ..asgi import ProxyApplication, build_environ
+from ..models import SessionLog
+from .factories import ExposedUrlFactory
+
+
+class BuildEnvironTests(SimpleTestCase):
+
+    def test_environ(self):
+        scope = {
+            'type': 'http',
+            'method': 'POST',
+            'path': '/api/v1/zaken',
+            'query_string': b'status=open',
+            'server': ('abc-testserver', 8000),
+            'client': ('127.0.0.1', 1234),
+            'headers': [
+                (b'host', b'abc-testserver:8000'),
+                (b'content-type', b'application/json'),
+                (b'accept-crs', b'EPSG:4326'),
+                (b'x-forwarded-for', b'10.0.0.1'),
+                (b'x-forwarded-for', b'10.0.0.2'),
+            ],
+        }
+        environ = build_environ(scope, b'{}')
+
+        self.assertEqual(environ['REQUEST_METHOD'], 'POST')
+        self.assertEqual(environ['PATH_INFO'], '/api/v1/zaken')
+        self.assertEqual(environ['QUERY_STRING'], 'status=open')
+        self.assertEqual(environ['HTTP_HOST'], 'abc-testserver:8000')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/json')
+        self.assertEqual(environ['HTTP_ACCEPT_CRS'], 'EPSG:4326')
+        self.assertEqual(environ['HTTP_X_FORWARDED_FOR'], '10.0.0.1,10.0.0.2')
+        self.assertEqual(environ['wsgi.input'].read(), b'{}')
+
+
+class LifespanTests(SimpleTestCase):
+
+    def test_startup_and_shutdown(self):
+        app = ProxyApplication(threads=1)
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.get_event_loop().run_until_complete(app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+
+def upstream_app(received):
+    '''
+    Return an ASGI application standing in for the upstream service, which
+    stores the request it got in ``received``
+    '''
+    async def app(scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body', False):
+                break
+        received.update(method=scope['method'], path=scope['path'], headers=dict(scope['headers']), body=body)
+        reply = json.dumps({'url': 'https://ref.tst.vng.cloud/zrc/zaken/1'}).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': 201,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(reply)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': reply})
+    return app
+
+
+@override_settings(SUBDOMAIN_SEPARATOR='-', PROXY_WRITE_BEHIND=False)
+class ProxyApplicationTests(TransactionTestCase):
+
+    def setUp(self):
+        self.exposed_url = ExposedUrlFactory(vng_endpoint__url='https://ref.tst.vng.cloud/zrc/')
+        self.exposed = reverse_sub('run_test', self.exposed_url.subdomain, kwargs={'relative_url': ''})
+        self.received = {}
+        self.app = ProxyApplication(threads=2)
+        self.app.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=upstream_app(self.received)))
+
+    def call(self, method, url, body, disconnect=False):
+        url = urlsplit(url)
+        scope = {
+            'type': 'http',
+            'method': method,
+            'scheme': 'http',
+            'path': url.path,
+            'query_string': url.query.encode(),
+            'server': (url.hostname, 80),
+            'client': ('127.0.0.1', 1234),
+            'headers': [
+                (b'host', url.hostname.encode()),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+            ],
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        sent = []
+        replied = asyncio.Event()
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            if not disconnect:
+                # the client waits for the reply
+                await replied.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if not message.get('more_body', False) and message['type'] == 'http.response.body':
+                replied.set()
+
+        async def run():
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                await self.app.client.aclose()
+
+        asyncio.get_event_loop().run_until_complete(run())
+        self.app.executor.shutdown()
+        return sent
+
+    def test_call_proxied(self):
+        body = json.dumps({'zaaktype': self.exposed + 'zaaktypen/1'}).encode('utf-8')
+
+        start, reply = self.call('POST', self.exposed + 'zaken?expand=status', body)
+
+        self.assertEqual(self.received['method'], 'POST')
+        self.assertEqual(self.received['path'], '/zrc/zaken')
+        self.assertEqual(json.loads(self.received['body']), {'zaaktype': 'https://ref.tst.vng.cloud/zrc/zaaktypen/1'})
+        self.assertEqual(self.received['headers'][b'content-length'], str(len(self.received['body'])).encode())
+        self.assertEqual(start['status'], 201)
+        self.assertEqual(json.loads(reply['body']), {'url': self.exposed + 'zaken/1'})
+
+        log = SessionLog.objects.get(session=self.exposed_url.session)
+        self.assertEqual(log.response_status, 201)
+        self.assertEqual(log.upstream_url, 'https://ref.tst.vng.cloud/zrc/zaken?expand=status')
+
+    @override_settings(ALLOWED_HOSTS=['example.com'])
+    def test_disallowed_host(self):
+        start, reply = self.call('GET', self.exposed + 'zaken', b'')
+
+        self.assertEqual(start['status'], 400)
+        self.assertEqual(self.received, {})
+
+    def test_client_disconnected(self):
+        sent = self.call('GET', self.exposed + 'zaken', b'', disconnect=True)
+
+        self.assertEqual(sent, [])
+        self.assertEqual(self.received, {})
+        self.assertFalse(SessionLog.objects.filter(session=self.exposed_url.session).exists())
@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ...api.v1.testsession.views import ResultTestsessionViewShield
+from ...utils import badges
+from ..models import SessionSummary
+from .factories import (
+    ScenarioCaseCollectionFactory, ScenarioCaseFactory, SessionFactory, SessionLogFactory, VNGEndpointFactory
+)
+
+
+class SessionBadgeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.session = SessionFactory()
+        collection = ScenarioCaseCollectionFactory()
+        VNGEndpointFactory(session_type=self.session.session_type, scenario_collection=collection)
+        self.case = ScenarioCaseFactory(collection=collection)
+        self.url = reverse('apiv1session:testsession-shield', kwargs={'uuid': self.session.uuid})
+
+    def test_conditional_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], 'Not completed')
+        self.assertIn('max-age', response['Cache-Control'])
+        etag = response['ETag']
+
+        with patch.object(ResultTestsessionViewShield, 'get_badge') as get_badge:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        get_badge.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_invalidated_by_calls(self):
+        etag = self.client.get(self.url)['ETag']
+
+        SessionSummary.record_call(self.session, SessionLogFactory(session=self.session), self.case.pk, False)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], 'Success')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_invalidated_by_session_save(self):
+        version = badges.get_badge_version(badges.SESSION, self.session.uuid)
+        self.session.save()
+        self.assertNotEqual(badges.get_badge_version(badges.SESSION, self.session.uuid), version)
+
+    def test_invalidated_by_session_delete(self):
+        version = badges.get_badge_version(badges.SESSION, self.session.uuid)
+        self.session.delete()
+        self.assertNotEqual(badges.get_badge_version(badges.SESSION, self.session.uuid), version)
+
+    def test_version_renewed_on_commit(self):
+        with patch('vng.utils.badges.transaction.on_commit') as on_commit:
+            badges.invalidate_badge(badges.SESSION, self.session.uuid)
+        version = badges.get_badge_version(badges.SESSION, self.session.uuid)
+
+        on_commit.call_args[0][0]()
+        self.assertNotEqual(badges.get_badge_version(badges.SESSION, self.session.uuid), version)
@@ -0,0 +1,34 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase, override_settings
+
+from ..models import ScenarioCaseCollection, Session, SessionType
+
+
+@override_settings(SUBDOMAIN_SEPARATOR='-', PROXY_WRITE_BEHIND=False)
+class BenchmarkProxyTests(TransactionTestCase):
+
+    def counts(self):
+        return [model.objects.count() for model in (SessionType, Session, ScenarioCaseCollection, get_user_model())]
+
+    def test_writes_not_allowed(self):
+        counts = self.counts()
+        with self.assertRaises(CommandError):
+            call_command('benchmark_proxy', stdout=StringIO())
+        self.assertEqual(self.counts(), counts)
+
+    def test_smoke(self):
+        counts = self.counts()
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'benchmark_proxy', '--allow-writes', cases='2', body_sizes='64', requests=4, concurrency=2,
+            profile_requests=1, stdout=stdout, stderr=stderr
+        )
+
+        self.assertEqual(stderr.getvalue(), '')
+        self.assertEqual(len(stdout.getvalue().splitlines()), 2)
+        self.assertEqual(self.counts(), counts)
+        self.assertFalse(get_user_model().objects.filter(username='proxy-benchmark').exists())
@@ -0,0 +1,95 @@
+from django.test import TestCase
+
+from ..context import get_proxy_context
+from .factories import ExposedUrlFactory, HeaderInjectionFactory, VNGEndpointFactory
+from ...utils import choices
+
+
+class ProxyContextTests(TestCase):
+
+    def setUp(self):
+        self.exposed_url = ExposedUrlFactory()
+        self.session = self.exposed_url.session
+        self.other = ExposedUrlFactory(
+            session=self.session,
+            vng_endpoint=VNGEndpointFactory(session_type=self.session.session_type)
+        )
+        HeaderInjectionFactory(session_type=self.session.session_type)
+
+    def test_load_context(self):
+        context = get_proxy_context(self.exposed_url.subdomain)
+        self.assertEqual(context.exposed_url, self.exposed_url)
+        self.assertEqual(context.session, self.session)
+        self.assertEqual(set(context.endpoints), {self.exposed_url, self.other})
+        self.assertEqual(context.inject_headers, [('key', 'dummy')])
+
+    def test_unknown_subdomain(self):
+        self.assertIsNone(get_proxy_context('unknown'))
+
+    def test_cached_context(self):
+        get_proxy_context(self.exposed_url.subdomain)
+        with self.assertNumQueries(0):
+            context = get_proxy_context(self.exposed_url.subdomain)
+            self.assertEqual(context.exposed_url, self.exposed_url)
+            context.vng_endpoint
+            context.session_type
+
+    def test_session_per_request(self):
+        context = get_proxy_context(self.exposed_url.subdomain)
+        other = get_proxy_context(self.exposed_url.subdomain)
+        self.assertIsNot(context, other)
+        self.assertIsNot(context.exposed_url, other.exposed_url)
+        self.assertIsNot(context.session, other.session)
+        self.assertIs(context.exposed_url.session, context.session)
+
+        context.session.status = choices.StatusChoices.stopped
+        self.assertFalse(other.session.is_stopped())
+        self.assertFalse(get_proxy_context(self.exposed_url.subdomain).session.is_stopped())
+
+    def test_invalidate_session_status(self):
+        get_proxy_context(self.exposed_url.subdomain)
+        self.session.status = choices.StatusChoices.stopped
+        self.session.save()
+
+        context = get_proxy_context(self.exposed_url.subdomain)
+        self.assertTrue(context.session.is_stopped())
+
+    def test_invalidate_inject_header(self):
+        get_proxy_context(self.exposed_url.subdomain)
+        HeaderInjectionFactory(session_type=self.session.session_type, key='other')
+
+        context = get_proxy_context(self.exposed_url.subdomain)
+        self.assertIn(('other', 'dummy'), context.inject_headers)
+
+    def test_rewriters_from_session_table(self):
+        self.session.update_rewrite_table()
+        table = self.session.get_rewrite_table()
+        self.assertEqual(len(table), 2)
+
+        context = get_proxy_context(self.exposed_url.subdomain)
+        upstream, exposed = table[0]
+        body = '{{"url": "{}/zaken/1"}}'.format(upstream)
+        rewritten = context.response_rewriter.rewrite(body)
+        self.assertEqual(rewritten, '{{"url": "{}/zaken/1"}}'.format(exposed))
+        self.assertEqual(context.request_rewriter.rewrite(rewritten), body)
+
+    def test_rewrite_table_follows_endpoint(self):
+        self.session.update_rewrite_table()
+        endpoint = self.exposed_url.vng_endpoint
+        endpoint.url = 'https://moved.example.com/api/'
+        endpoint.save()
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.get_rewrite_table(), self.session.compute_rewrite_table())
+        self.assertIn('https://moved.example.com/api/', [upstream for upstream, __ in self.session.get_rewrite_table()])
+        context = get_proxy_context(self.exposed_url.subdomain)
+        rewritten = context.response_rewriter.rewrite('https://moved.example.com/api/zaken')
+        self.assertNotIn('moved.example.com', rewritten)
+        self.assertEqual(context.request_rewriter.rewrite(rewritten), 'https://moved.example.com/api/zaken')
+
+    def test_rewrite_table_follows_exposed_urls(self):
+        self.session.update_rewrite_table()
+        self.other.delete()
+
+        self.session.refresh_from_db()
+        self.assertEqual(len(self.session.get_rewrite_table()), 1)
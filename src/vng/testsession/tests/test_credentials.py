@@ -0,0 +1,54 @@
+from unittest.mock import patch
+
+import jwt
+
+from django.test import TestCase, override_settings
+
+from ...utils import auth
+from ...utils.auth import get_jwt_credentials
+from .factories import SessionTypeFactory
+
+
+@override_settings(JWT_CREDENTIALS_LIFETIME=60 * 60, JWT_CREDENTIALS_MIN_LIFETIME=60)
+class JWTCredentialsTests(TestCase):
+
+    def setUp(self):
+        self.session_type = SessionTypeFactory(client_id='client', secret='secret')
+        # the tokens are kept by the process
+        auth.invalidate_jwt_credentials('client')
+
+    def test_token_reused(self):
+        first = get_jwt_credentials(self.session_type)
+        second = get_jwt_credentials(self.session_type)
+        self.assertEqual(first, second)
+
+        token = first['Authorization'].split()[-1]
+        decoded = jwt.decode(token, 'secret', algorithms=['HS256'])
+        self.assertEqual(decoded['client_id'], 'client')
+
+    def test_new_token_when_secret_changes(self):
+        first = get_jwt_credentials(self.session_type)
+        self.session_type.secret = 'other'
+        self.session_type.save()
+
+        token = get_jwt_credentials(self.session_type)['Authorization'].split()[-1]
+        self.assertNotEqual(first['Authorization'].split()[-1], token)
+        jwt.decode(token, 'other', algorithms=['HS256'])
+
+    def test_token_per_scopes(self):
+        read = get_jwt_credentials(self.session_type, scopes=['zds.scopes.zaken.lezen'])
+        create = get_jwt_credentials(self.session_type, scopes=['zds.scopes.zaken.aanmaken'])
+
+        decoded = jwt.decode(create['Authorization'].split()[-1], 'secret', algorithms=['HS256'])
+        self.assertEqual(decoded['zds']['scopes'], ['zds.scopes.zaken.aanmaken'])
+        self.assertNotEqual(read, create)
+
+    def test_new_token_when_too_short_lived(self):
+        with patch.object(auth, 'get_jwt', wraps=auth.get_jwt) as get_jwt:
+            get_jwt_credentials(self.session_type, min_lifetime=30 * 60)
+            get_jwt_credentials(self.session_type, min_lifetime=30 * 60)
+            self.assertEqual(get_jwt.call_count, 1)
+
+            # the token is accepted for an hour at most
+            get_jwt_credentials(self.session_type, min_lifetime=60 * 60)
+            self.assertEqual(get_jwt.call_count, 2)
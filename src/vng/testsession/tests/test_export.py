@@ -0,0 +1,86 @@
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ...utils import choices
+from ...utils.factories import UserFactory
+from ..models import Report, SessionLog
+from .factories import ExposedUrlFactory, QueryParamsScenarioFactory, ScenarioCaseFactory, SessionFactory
+
+
+class ExportSessionTests(TestCase):
+
+    def setUp(self):
+        self.session = SessionFactory()
+        self.case = ScenarioCaseFactory(url='zaken', http_method='POST')
+        QueryParamsScenarioFactory(scenario_case=self.case, name='page')
+        ExposedUrlFactory(
+            session=self.session, subdomain='tst', vng_endpoint__scenario_collection=self.case.collection
+        )
+        for i, status in enumerate([400, 201, 201]):
+            log = SessionLog(session=self.session)
+            log.set_request('POST', 'http://tst.example.com/zaken?page={}'.format(i),
+                            {'Content-Type': 'application/json'}, '{"a": %d}' % i)
+            log.set_response(status, 'https://ref.tst.vng.cloud/zrc/zaken', '{"id": %d}' % i)
+            log.save()
+        # only the latest call is kept in the report
+        Report.objects.create(
+            session=self.session, scenario_case=self.case, session_log=log, result=choices.HTTPCallChoices.success
+        )
+        log = SessionLog(session=self.session)
+        log.set_request('GET', 'http://tst.example.com/statussen', {}, '')
+        log.set_response(200, 'https://ref.tst.vng.cloud/zrc/statussen', '[]')
+        log.save()
+        self.client.force_login(self.session.user)
+
+    def export(self, export_format, **kwargs):
+        url = reverse('apiv1session:export_session', kwargs={'uuid': self.session.uuid, 'export_format': export_format})
+        return self.client.get(url, **kwargs)
+
+    def test_ndjson(self):
+        response = self.export('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        entries = [json.loads(line) for line in lines]
+
+        self.assertEqual([entry['request']['body'] for entry in entries], ['{"a": 0}', '{"a": 1}', '{"a": 2}', ''])
+        self.assertEqual(entries[2]['response']['status'], 201)
+        # every call that matched the case, each with its own result
+        self.assertEqual(entries[0]['scenario_cases'], [{
+            'scenario_case': self.case.pk, 'http_method': 'POST', 'url': 'zaken',
+            'result': choices.HTTPCallChoices.failed,
+        }])
+        self.assertEqual(entries[1]['scenario_cases'][0]['result'], choices.HTTPCallChoices.success)
+        self.assertEqual(entries[2]['scenario_cases'][0]['result'], choices.HTTPCallChoices.success)
+        self.assertEqual(entries[3]['scenario_cases'], [])
+
+    def test_call_without_response(self):
+        log = SessionLog(session=self.session)
+        log.set_request('POST', 'http://tst.example.com/zaken?page=9', {}, '')
+        log.save()
+
+        lines = b''.join(self.export('ndjson').streaming_content).decode('utf-8').splitlines()
+
+        # the proxy did not report it either
+        self.assertEqual(json.loads(lines[-1])['scenario_cases'], [])
+
+    def test_har(self):
+        response = self.export('har')
+        har = json.loads(b''.join(response.streaming_content).decode('utf-8'))
+
+        self.assertEqual(har['log']['version'], '1.2')
+        entries = har['log']['entries']
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(entries[1]['request']['queryString'], [{'name': 'page', 'value': '1'}])
+        self.assertEqual(entries[1]['request']['postData']['mimeType'], 'application/json')
+        self.assertEqual(entries[1]['response']['content']['text'], '{"id": 1}')
+        self.assertEqual(entries[1]['response']['statusText'], 'Created')
+        self.assertEqual(entries[0]['_scenarioCases'][0]['scenario_case'], self.case.pk)
+
+    def test_other_user(self):
+        self.client.force_login(UserFactory())
+        self.assertEqual(self.export('har').status_code, 403)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.export('xml').status_code, 404)
@@ -0,0 +1,102 @@
+from django.test import TestCase
+
+from ..logwriter import LogWriter
+from ..models import Report, SessionLog
+from .factories import ScenarioCaseFactory, SessionFactory, SessionLogFactory
+from ...utils import choices
+
+
+class LogWriterTests(TestCase):
+
+    def setUp(self):
+        self.session = SessionFactory()
+        self.case = ScenarioCaseFactory()
+        self.writer = LogWriter(batch_size=2, autostart=False)
+
+    def build_log(self, status):
+        return SessionLogFactory.build(session=self.session, response_status=status)
+
+    def test_logs_written_on_flush(self):
+        logs = [self.build_log(200) for i in range(3)]
+        for log in logs:
+            self.writer.add_log(log)
+        self.assertFalse(SessionLog.objects.filter(session=self.session).exists())
+
+        self.writer.flush()
+
+        self.assertEqual(SessionLog.objects.filter(session=self.session).count(), 3)
+        self.assertTrue(all(log.pk for log in logs))
+
+    def test_reports_merged_in_order(self):
+        failed = self.build_log(500)
+        success = self.build_log(200)
+        self.writer.add_log(failed)
+        self.writer.add_report(self.session, self.case.pk, failed, True)
+        self.writer.add_log(success)
+        self.writer.add_report(self.session, self.case.pk, success, False)
+
+        self.writer.flush()
+
+        report = Report.objects.get(scenario_case=self.case)
+        self.assertEqual(report.result, choices.HTTPCallChoices.failed)
+        self.assertEqual(report.session_log, failed)
+
+    def test_sandbox_report_updated(self):
+        self.session.sandbox = True
+        self.session.save()
+        failed = SessionLogFactory(session=self.session, response_status=500)
+        Report.objects.create(
+            session=self.session, scenario_case=self.case, session_log=failed,
+            result=choices.HTTPCallChoices.failed
+        )
+        success = self.build_log(200)
+        self.writer.add_log(success)
+        self.writer.add_report(self.session, self.case.pk, success, False)
+
+        self.writer.flush()
+
+        report = Report.objects.get(scenario_case=self.case)
+        self.assertEqual(report.result, choices.HTTPCallChoices.success)
+        self.assertEqual(report.session_log, success)
+
+    def test_streamed_log_updated(self):
+        log = self.build_log(200)
+        log.set_response(200, 'http://example.com/', '')
+        self.writer.add_log(log)
+        self.writer.flush()
+
+        log.set_response(200, 'http://example.com/', 'streamed')
+        self.writer.update_log(log)
+        self.writer.flush()
+
+        log.refresh_from_db()
+        self.assertEqual(log.response_body(), 'streamed')
+
+    def test_bad_event_lost_alone(self):
+        good = [self.build_log(200), self.build_log(200)]
+        # longer than the column of the method
+        bad = SessionLogFactory.build(session=self.session, method='X' * 20, response_status=200)
+        writer = LogWriter(batch_size=10, autostart=False)
+        writer.add_log(good[0])
+        writer.add_log(bad)
+        writer.add_log(good[1])
+        writer.add_report(self.session, self.case.pk, good[1], False)
+
+        with self.assertLogs('vng.testsession.logwriter', 'ERROR'):
+            writer.flush()
+
+        self.assertEqual(set(SessionLog.objects.filter(session=self.session)), set(good))
+        self.assertEqual(Report.objects.get(scenario_case=self.case).session_log, good[1])
+
+    def test_full_queue_persisted_by_the_caller(self):
+        writer = LogWriter(batch_size=10, autostart=False, queue_size=2)
+        logs = [self.build_log(200) for i in range(3)]
+
+        with self.assertLogs('vng.testsession.logwriter', 'WARNING'):
+            for log in logs:
+                writer.add_log(log)
+
+        self.assertEqual(SessionLog.objects.filter(session=self.session).count(), 2)
+        self.assertEqual(writer.queue.qsize(), 1)
+        writer.flush()
+        self.assertEqual(SessionLog.objects.filter(session=self.session).count(), 3)
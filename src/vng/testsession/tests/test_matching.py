@@ -0,0 +1,54 @@
+from django.test import TestCase
+
+from ..matching import get_case_index
+from .factories import ScenarioCaseFactory, ScenarioCaseCollectionFactory, QueryParamsScenarioFactory
+from ...utils import choices
+
+
+class ScenarioCaseIndexTests(TestCase):
+
+    def setUp(self):
+        self.collection = ScenarioCaseCollectionFactory()
+        self.case = ScenarioCaseFactory(collection=self.collection, url='zaken/{uuid}')
+        self.case_params = ScenarioCaseFactory(collection=self.collection, url='zaken')
+        QueryParamsScenarioFactory(scenario_case=self.case_params, name='status', expected_value='open')
+
+    def test_match_wildcard(self):
+        index = get_case_index(self.collection.pk)
+        case_id = index.match('get', 'http://example.com/api/v1/zaken/123', {})
+        self.assertEqual(case_id, self.case.pk)
+
+    def test_no_match_method(self):
+        index = get_case_index(self.collection.pk)
+        self.assertIsNone(index.match('post', 'http://example.com/api/v1/zaken/123', {}))
+
+    def test_match_query_params(self):
+        index = get_case_index(self.collection.pk)
+        url = 'http://example.com/api/v1/zaken?status=open'
+        self.assertEqual(index.match('GET', url, {'status': 'open'}), self.case_params.pk)
+        self.assertIsNone(index.match('GET', url, {'status': 'closed'}))
+
+    def test_most_specific_case_first(self):
+        less_specific = ScenarioCaseFactory(collection=self.collection, url='zaken')
+        QueryParamsScenarioFactory(scenario_case=less_specific, name='status')
+        index = get_case_index(self.collection.pk)
+        url = 'http://example.com/api/v1/zaken?status=open'
+        self.assertEqual(index.match('GET', url, {'status': 'open'}), self.case_params.pk)
+        self.assertEqual(index.match('GET', url, {'status': 'closed'}), less_specific.pk)
+
+    def test_invalidate_on_save(self):
+        index = get_case_index(self.collection.pk)
+        self.assertIs(index, get_case_index(self.collection.pk))
+
+        self.case.http_method = choices.HTTPMethodChoices.POST
+        self.case.save()
+
+        index = get_case_index(self.collection.pk)
+        self.assertEqual(index.match('POST', 'http://example.com/api/v1/zaken/123', {}), self.case.pk)
+
+    def test_invalidate_on_query_param(self):
+        get_case_index(self.collection.pk)
+        QueryParamsScenarioFactory(scenario_case=self.case, name='expand')
+
+        index = get_case_index(self.collection.pk)
+        self.assertIsNone(index.match('GET', 'http://example.com/api/v1/zaken/123', {}))
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import SessionLog
+from ..pagination import KeysetPage, decode_cursor
+from .factories import SessionFactory, SessionLogFactory
+
+
+class KeysetPageTests(TestCase):
+
+    def setUp(self):
+        self.session = SessionFactory()
+        now = timezone.now()
+        # two logs share their date, the id orders them
+        dates = [now, now + timedelta(seconds=1), now + timedelta(seconds=1), now + timedelta(seconds=2), now]
+        self.logs = sorted(
+            (SessionLogFactory(session=self.session, date=date, method='GET', url='zaken') for date in dates),
+            key=lambda log: (log.date, log.pk)
+        )
+        self.queryset = SessionLog.objects.filter(session=self.session)
+
+    def test_walk_forward_and_back(self):
+        first = KeysetPage(self.queryset, 2)
+        self.assertEqual(first.object_list, self.logs[:2])
+        self.assertFalse(first.has_previous)
+        self.assertTrue(first.has_next)
+
+        second = KeysetPage(self.queryset, 2, after=first.next_cursor)
+        self.assertEqual(second.object_list, self.logs[2:4])
+
+        last = KeysetPage(self.queryset, 2, after=second.next_cursor)
+        self.assertEqual(last.object_list, self.logs[4:])
+        self.assertFalse(last.has_next)
+        self.assertIsNone(last.next_cursor)
+
+        back = KeysetPage(self.queryset, 2, before=last.previous_cursor)
+        self.assertEqual(back.object_list, self.logs[2:4])
+        self.assertTrue(back.has_previous)
+        self.assertTrue(back.has_next)
+
+        back = KeysetPage(self.queryset, 2, before=back.previous_cursor)
+        self.assertEqual(back.object_list, self.logs[:2])
+        self.assertFalse(back.has_previous)
+
+    def test_invalid_cursor(self):
+        self.assertIsNone(decode_cursor('not a cursor'))
+        self.assertEqual(KeysetPage(self.queryset, 2, after='garbage').object_list, self.logs[:2])
+
+    def test_view(self):
+        url = reverse('testsession:session_log', kwargs={
+            'api_id': self.session.session_type.api.id,
+            'uuid': self.session.uuid,
+        })
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['log_list']), self.logs)
+
+        response = self.client.get(url, {'after': KeysetPage(self.queryset, 3).next_cursor})
+        self.assertEqual(list(response.context['log_list']), self.logs[3:])
+        deferred = response.context['log_list'][0].get_deferred_fields()
+        self.assertTrue({'request', 'response', 'request_data', 'response_data'} <= deferred)
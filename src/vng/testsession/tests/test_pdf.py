@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ...utils import pdf
+from .factories import SessionFactory
+
+HTML = '<html><body><form><input type="hidden" name="csrfmiddlewaretoken" value="{}"></form></body></html>'
+BASE_URL = 'http://testserver/'
+
+
+class PDFCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, CELERY_TASK_ALWAYS_EAGER=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.session = SessionFactory()
+
+    def test_csrf_token_ignored(self):
+        self.assertEqual(pdf.prepare_html(HTML.format('a'), BASE_URL), pdf.prepare_html(HTML.format('b'), BASE_URL))
+
+    @patch('weasyprint.HTML')
+    def test_rendered_once(self, html):
+        html.return_value.write_pdf.return_value = b'%PDF-1.4'
+        owner = (pdf.SESSION, self.session.uuid)
+
+        name, ready = pdf.request_pdf(HTML.format('a'), BASE_URL, owner)
+        self.assertTrue(ready)
+        self.assertTrue(name.startswith('session-{}-'.format(self.session.uuid)))
+        self.assertEqual(default_storage.open(pdf.pdf_path(name)).read(), b'%PDF-1.4')
+        self.assertFalse(default_storage.exists(pdf.html_path(name)))
+
+        self.assertEqual(pdf.request_pdf(HTML.format('b'), BASE_URL, owner), (name, True))
+        self.assertEqual(html.call_count, 1)
+
+        self.session.save()
+        self.assertFalse(default_storage.exists(pdf.pdf_path(name)))
+
+    @patch('weasyprint.HTML')
+    def test_former_pdf_replaced(self, html):
+        html.return_value.write_pdf.return_value = b'%PDF-1.4'
+        owner = (pdf.SESSION, self.session.uuid)
+        other_report = (pdf.SESSION, self.session.uuid, 'test', 1)
+
+        former, __ = pdf.request_pdf('<html>former</html>', BASE_URL, owner)
+        other, __ = pdf.request_pdf('<html>former</html>', BASE_URL, other_report)
+        name, __ = pdf.request_pdf('<html>changed</html>', BASE_URL, owner)
+
+        self.assertFalse(default_storage.exists(pdf.pdf_path(former)))
+        self.assertTrue(default_storage.exists(pdf.pdf_path(other)))
+        self.assertTrue(default_storage.exists(pdf.pdf_path(name)))
+
+    @patch('vng.utils.task.render_pdf.delay')
+    def test_rendering(self, delay):
+        owner = (pdf.SESSION, self.session.uuid)
+        name, ready = pdf.request_pdf(HTML.format('a'), BASE_URL, owner)
+        self.assertFalse(ready)
+        self.assertTrue(default_storage.exists(pdf.html_path(name)))
+
+        # a single rendering is started
+        pdf.request_pdf(HTML.format('a'), BASE_URL, owner)
+        delay.assert_called_once_with(name, BASE_URL)
+
+    @patch('weasyprint.HTML')
+    def test_failed_rendering_not_retried(self, html):
+        html.return_value.write_pdf.side_effect = ValueError('bad report')
+        owner = (pdf.SESSION, self.session.uuid)
+
+        with self.assertLogs('vng.utils.pdf', 'ERROR'), self.assertRaises(pdf.RenderingFailed):
+            pdf.request_pdf(HTML.format('a'), BASE_URL, owner)
+        with self.assertRaises(pdf.RenderingFailed):
+            pdf.request_pdf(HTML.format('a'), BASE_URL, owner)
+        self.assertEqual(html.call_count, 1)
+
+    @patch('weasyprint.HTML')
+    def test_failed_rendering_page(self, html):
+        html.return_value.write_pdf.side_effect = ValueError('bad report')
+        self.client.force_login(self.session.user)
+        url = reverse('testsession:session_report-pdf', kwargs={
+            'api_id': self.session.session_type.api.id, 'uuid': self.session.uuid
+        })
+
+        with self.assertLogs('vng.utils.pdf', 'ERROR'):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.client.get(url).status_code, 500)
+        self.assertEqual(html.call_count, 1)
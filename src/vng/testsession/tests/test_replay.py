@@ -0,0 +1,79 @@
+import json
+
+from django.test import TestCase
+
+from ..models import RecordedExchange, SessionLog
+from ..replay import find_exchange, import_har, record_session, replay_call
+from ..rewrite import replay_upstream
+from .factories import ExposedUrlFactory, SessionTypeFactory, VNGEndpointDockerFactory
+
+
+class RecordReplayTests(TestCase):
+
+    def setUp(self):
+        self.exposed_url = ExposedUrlFactory(session__sandbox=True)
+        self.session = self.exposed_url.session
+        self.endpoint = self.exposed_url.vng_endpoint
+
+    def log(self, method, path, body, request_body=''):
+        log = SessionLog(session=self.session)
+        log.set_request(method, 'http://tst-example.com/{}'.format(path), {}, request_body)
+        log.set_response(200, '{}/{}'.format(self.endpoint.url, path), body)
+        log.save()
+        return log
+
+    def test_record_session_logs(self):
+        self.log('GET', 'enkelvoudiginformatieobjecten?page=2', '{"count": 2}')
+        self.log('GET', 'enkelvoudiginformatieobjecten', '{"count": 1}')
+        RecordedExchange.objects.bulk_create(record_session(self.session))
+
+        response = replay_call(self.endpoint, 'get', 'enkelvoudiginformatieobjecten', 'page=2', None, 'x')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'count': 2})
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+
+        response = replay_call(self.endpoint, 'get', '/enkelvoudiginformatieobjecten', '', None, 'x')
+        self.assertEqual(response.json(), {'count': 1})
+
+    def test_match_request_body(self):
+        self.log('POST', 'zaken', '{"id": 1}', '{"a": 1}')
+        self.log('POST', 'zaken', '{"id": 2}', '{"a": 2}')
+        RecordedExchange.objects.bulk_create(record_session(self.session))
+
+        self.assertEqual(replay_call(self.endpoint, 'post', 'zaken', '', b'{"a": 1}', 'x').json(), {'id': 1})
+        # the most recent one otherwise
+        self.assertEqual(replay_call(self.endpoint, 'post', 'zaken', '', b'{"a": 3}', 'x').json(), {'id': 2})
+
+    def test_candidate_bodies_deferred(self):
+        self.log('GET', 'zaken', '{"id": 1}')
+        self.log('GET', 'zaken', '{"id": 2}')
+        RecordedExchange.objects.bulk_create(record_session(self.session))
+
+        exchange = find_exchange(self.endpoint, 'get', 'zaken', '', None)
+        self.assertIn('response_body', exchange.get_deferred_fields())
+        self.assertEqual(json.loads(bytes(exchange.response_body)), {'id': 2})
+
+    def test_not_recorded(self):
+        response = replay_call(self.endpoint, 'get', 'zaken', '', None, 'x')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('No exchange was recorded', response.json()['detail'])
+
+    def test_import_har_deployed_service(self):
+        session_type = SessionTypeFactory()
+        endpoint = VNGEndpointDockerFactory(session_type=session_type)
+        har = {'log': {'entries': [{
+            'request': {'method': 'GET', 'url': 'http://10.0.0.1:8000/api/v1/zaken/1'},
+            'response': {
+                'status': 200,
+                'headers': [],
+                'content': {'mimeType': 'application/json', 'text': json.dumps({
+                    'url': 'http://10.0.0.1:8000/api/v1/zaken/1'
+                })},
+            },
+        }]}}
+        exchange, = import_har(session_type, har, endpoint)
+        self.assertEqual(exchange.path, 'api/v1/zaken/1')
+        self.assertEqual(
+            json.loads(exchange.response_body.decode('utf-8')),
+            {'url': '{}api/v1/zaken/1'.format(replay_upstream(endpoint))}
+        )
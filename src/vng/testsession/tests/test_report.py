@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from ..models import Report
+from .factories import ScenarioCaseFactory, SessionFactory, SessionLogFactory
+from ...utils import choices
+
+
+class ReportUpsertTests(TestCase):
+
+    def setUp(self):
+        self.session = SessionFactory()
+        self.case = ScenarioCaseFactory()
+
+    def call(self, failed):
+        log = SessionLogFactory(session=self.session)
+        Report.upsert_call(self.session, self.case.pk, log, failed)
+        return log
+
+    def test_single_report_per_case(self):
+        self.call(False)
+        log = self.call(False)
+
+        report = Report.objects.get(session=self.session, scenario_case=self.case)
+        self.assertEqual(report.result, choices.HTTPCallChoices.success)
+        self.assertEqual(report.session_log, log)
+
+    def test_failure_kept(self):
+        failed = self.call(True)
+        self.call(False)
+
+        report = Report.objects.get(session=self.session, scenario_case=self.case)
+        self.assertEqual(report.result, choices.HTTPCallChoices.failed)
+        self.assertEqual(report.session_log, failed)
+
+    def test_failure_overridden_in_sandbox(self):
+        self.session.sandbox = True
+        self.session.save()
+        self.call(True)
+        log = self.call(False)
+
+        report = Report.objects.get(session=self.session, scenario_case=self.case)
+        self.assertEqual(report.result, choices.HTTPCallChoices.success)
+        self.assertEqual(report.session_log, log)
@@ -0,0 +1,56 @@
+from django.test import TestCase
+
+from ..models import Report
+from ..results import SessionResult
+from .factories import (
+    QueryParamsScenarioFactory, ScenarioCaseCollectionFactory, ScenarioCaseFactory, SessionFactory,
+    SessionLogFactory, VNGEndpointFactory
+)
+from ...utils import choices
+
+
+class SessionResultTests(TestCase):
+
+    def setUp(self):
+        self.session = SessionFactory()
+        self.collection = ScenarioCaseCollectionFactory()
+        self.endpoint = VNGEndpointFactory(session_type=self.session.session_type, scenario_collection=self.collection)
+        self.cases = [ScenarioCaseFactory(collection=self.collection, url='zaken/{}'.format(i)) for i in range(3)]
+        QueryParamsScenarioFactory(scenario_case=self.cases[0])
+
+    def report(self, case, result):
+        return Report.objects.create(
+            session=self.session, scenario_case=case, session_log=SessionLogFactory(session=self.session), result=result
+        )
+
+    def test_fixed_queries(self):
+        for case in self.cases:
+            self.report(case, choices.HTTPCallChoices.success)
+        with self.assertNumQueries(4):
+            result = SessionResult(self.session, details=True)
+            for endpoint, reports in result.endpoint_reports():
+                for report in reports:
+                    report.scenario_case.url
+                    list(report.scenario_case.queryparamsscenario_set.all())
+                    report.session_log.response_status
+        self.assertTrue(result.is_complete())
+
+    def test_missing_cases(self):
+        self.report(self.cases[1], choices.HTTPCallChoices.failed)
+        result = SessionResult(self.session)
+
+        reports = result.case_reports()
+        self.assertEqual([report.scenario_case for report in reports], self.cases)
+        self.assertEqual([report.result for report in reports], [
+            choices.HTTPCallChoices.not_called, choices.HTTPCallChoices.failed, choices.HTTPCallChoices.not_called
+        ])
+        self.assertTrue(result.is_failed())
+        self.assertFalse(result.is_complete())
+
+    def test_no_cases(self):
+        # the query parameters protect the cases of the collection from being deleted
+        self.endpoint.scenario_collection = ScenarioCaseCollectionFactory()
+        self.endpoint.save()
+        result = SessionResult(self.session)
+        self.assertFalse(result.has_cases())
+        self.assertEqual(result.endpoint_reports(), [])
@@ -0,0 +1,115 @@
+from django.test import SimpleTestCase
+
+from ..rewrite import (
+    BINARY, JSON, MULTIPART, TEXT, BodyCapture, UrlRewriter, body_kind,
+    decode_stream, log_body
+)
+
+
+class UrlRewriterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.rewriter = UrlRewriter([
+            ('https://ref.tst.vng.cloud/zrc', 'https://abc-api-test.nl'),
+            ('https://ref.tst.vng.cloud/zrc/api/v2', 'https://def-api-test.nl'),
+            ('http://10.0.0.1:8000/', 'https://ghi-api-test.nl/'),
+        ])
+        self.text = (
+            '{"url": "https://ref.tst.vng.cloud/zrc/api/v1/zaken/1", '
+            '"v2": "https://ref.tst.vng.cloud/zrc/api/v2/zaken/2", '
+            '"docker": "http://10.0.0.1:8000/api/v1/", "name": "zaak.with.dots"}'
+        )
+        self.expected = (
+            '{"url": "https://abc-api-test.nl/api/v1/zaken/1", '
+            '"v2": "https://def-api-test.nl/zaken/2", '
+            '"docker": "https://ghi-api-test.nl/api/v1/", "name": "zaak.with.dots"}'
+        )
+
+    def test_rewrite(self):
+        self.assertEqual(self.rewriter.rewrite(self.text), self.expected)
+
+    def test_literal(self):
+        rewriter = UrlRewriter([('http://a.b', 'http://c')])
+        self.assertEqual(rewriter.rewrite('http://aXb http://a.b'), 'http://aXb http://c')
+
+    def test_rewrite_stream_any_boundary(self):
+        for size in range(1, len(self.text) + 1):
+            chunks = [self.text[i:i + size] for i in range(0, len(self.text), size)]
+            with self.subTest(size=size):
+                self.assertEqual(''.join(self.rewriter.rewrite_stream(chunks)), self.expected)
+
+    def test_no_substitutions(self):
+        rewriter = UrlRewriter([])
+        self.assertEqual(''.join(rewriter.rewrite_stream(['a', 'b'])), 'ab')
+
+
+class RewriteBodyTests(SimpleTestCase):
+
+    def setUp(self):
+        self.rewriter = UrlRewriter([('https://ref.tst.vng.cloud/zrc', 'https://abc-api-test.nl')])
+
+    def test_body_kind(self):
+        self.assertEqual(body_kind('application/json; charset=utf-8'), JSON)
+        self.assertEqual(body_kind('application/hal+json'), JSON)
+        self.assertEqual(body_kind('text/html'), TEXT)
+        self.assertEqual(body_kind(None), TEXT)
+        self.assertEqual(body_kind('multipart/form-data; boundary=x'), MULTIPART)
+        self.assertEqual(body_kind('application/pdf'), BINARY)
+
+    def test_json_escaped_slashes(self):
+        body = b'{"url": "https:\\/\\/ref.tst.vng.cloud\\/zrc\\/api", "n": 1}'
+        self.assertEqual(
+            self.rewriter.rewrite_body(body, 'application/json'),
+            b'{"url": "https://abc-api-test.nl/api", "n": 1}'
+        )
+
+    def test_binary_untouched(self):
+        body = b'%PDF https://ref.tst.vng.cloud/zrc \xff\xfe'
+        self.assertIs(self.rewriter.rewrite_body(body, 'application/pdf'), body)
+
+    def test_undecodable_untouched(self):
+        body = b'https://ref.tst.vng.cloud/zrc \xff'
+        self.assertIs(self.rewriter.rewrite_body(body, 'text/plain; charset=utf-8'), body)
+
+    def test_multipart(self):
+        body = (
+            b'--XX\r\nContent-Disposition: form-data; name="zaak"\r\n\r\n'
+            b'https://ref.tst.vng.cloud/zrc/1\r\n'
+            b'--XX\r\nContent-Disposition: form-data; name="inhoud"; filename="a.bin"\r\n'
+            b'Content-Type: application/octet-stream\r\n\r\n'
+            b'https://ref.tst.vng.cloud/zrc/2\r\n--XX--\r\n'
+        )
+        rewritten = self.rewriter.rewrite_body(body, 'multipart/form-data; boundary=XX')
+        self.assertIn(b'https://abc-api-test.nl/1', rewritten)
+        self.assertIn(b'https://ref.tst.vng.cloud/zrc/2', rewritten)
+
+    def test_log_body(self):
+        self.assertEqual(
+            log_body(b'\x00' * 10, 'image/png'),
+            ('[image/png body of 10 bytes, not logged]', 10)
+        )
+        self.assertEqual(log_body('é'.encode('utf-8'), 'application/json'), ('é', None))
+
+
+class DecodeStreamTests(SimpleTestCase):
+
+    def test_split_multibyte(self):
+        data = 'zaak één'.encode('utf-8')
+        chunks = [data[i:i + 1] for i in range(len(data))]
+        self.assertEqual(''.join(decode_stream(chunks, 'utf-8')), 'zaak één')
+
+
+class BodyCaptureTests(SimpleTestCase):
+
+    def test_truncate(self):
+        capture = BodyCapture(5)
+        capture.feed('abc')
+        capture.feed('defgh')
+        self.assertTrue(capture.truncated)
+        self.assertTrue(capture.getvalue().startswith('abcde\n'))
+        self.assertIn('8 characters', capture.getvalue())
+
+    def test_unbounded(self):
+        capture = BodyCapture(None)
+        capture.feed('abc')
+        self.assertEqual(capture.getvalue(), 'abc')
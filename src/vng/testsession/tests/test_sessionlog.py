@@ -0,0 +1,46 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import SessionLog
+from .factories import SessionLogFactory
+
+
+class SessionLogStorageTests(TestCase):
+
+    def test_compressed_bodies(self):
+        log = SessionLogFactory(request=None, response=None)
+        log.set_request('POST', 'http://tst-example.com/api/v1/zaken', {'accept': 'application/json'}, '{"a": 1}')
+        log.set_response(201, 'https://ref.tst.vng.cloud/zrc/api/v1/zaken', '{"url": "x"}')
+        log.save()
+
+        log = SessionLog.objects.get(pk=log.pk)
+        self.assertEqual(log.request_path(), 'POST http://tst-example.com/api/v1/zaken')
+        self.assertEqual(log.request_headers(), {'accept': 'application/json'})
+        self.assertEqual(log.request_body(), '{"a": 1}')
+        self.assertEqual(log.response_body(), '{"url": "x"}')
+        self.assertEqual(log.response_status, 201)
+        self.assertEqual((log.request_size, log.response_size), (8, 12))
+
+    @override_settings(PROXY_LOG_BODY_MAX_SIZE=10)
+    def test_body_truncated(self):
+        log = SessionLogFactory.build()
+        log.set_response(200, 'http://example.com/', 'x' * 50)
+        self.assertEqual(log.response_size, 50)
+        self.assertTrue(log.response_body().startswith('x' * 10 + '\n[... truncated'))
+
+    def test_legacy_log(self):
+        log = SessionLogFactory()
+        self.assertEqual(log.request_path(), 'GET http://localhost:8000/runtest/154513515134/')
+        self.assertEqual(log.response_body(), '{}')
+
+        call_command('compress_session_logs', stdout=StringIO())
+
+        log = SessionLog.objects.get(pk=log.pk)
+        self.assertIsNone(log.request)
+        self.assertIsNone(log.response)
+        self.assertEqual(log.method, 'GET')
+        self.assertEqual(log.request_path(), 'GET http://localhost:8000/runtest/154513515134/')
+        self.assertEqual(log.response_body(), '{}')
+        self.assertEqual(log.response_status, 404)
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Report, Session, SessionSummary
+from .factories import (
+    ScenarioCaseCollectionFactory, ScenarioCaseFactory, SessionFactory, SessionLogFactory, VNGEndpointFactory
+)
+from ...utils import choices
+
+
+class SessionSummaryTests(TestCase):
+
+    def setUp(self):
+        self.session = SessionFactory()
+        collection = ScenarioCaseCollectionFactory()
+        VNGEndpointFactory(session_type=self.session.session_type, scenario_collection=collection)
+        self.cases = [ScenarioCaseFactory(collection=collection, url='zaken/{}'.format(i)) for i in range(3)]
+
+    def call(self, case, failed):
+        log = SessionLogFactory(session=self.session)
+        SessionSummary.record_call(self.session, log, case.pk if case else None, failed)
+        return log
+
+    def summary(self):
+        return SessionSummary.objects.get(session=self.session)
+
+    def test_created_with_session(self):
+        summary = self.summary()
+        self.assertEqual((summary.success, summary.failed, summary.calls), (0, 0, 0))
+        self.assertEqual(self.session.get_report_stats(), (0, 0, 3))
+
+    def test_record_calls(self):
+        self.call(self.cases[0], True)
+        self.call(self.cases[0], False)
+        self.call(self.cases[1], False)
+        last = self.call(None, False)
+
+        summary = self.summary()
+        self.assertEqual((summary.success, summary.failed, summary.not_called), (1, 1, 0))
+        self.assertEqual(summary.calls, 4)
+        self.assertEqual(summary.last_call, last.date)
+        self.assertEqual(self.session.get_report_stats(), (1, 1, 1))
+
+    def test_report_changed_directly(self):
+        self.call(self.cases[0], False)
+        report = Report.objects.get(session=self.session)
+        report.result = choices.HTTPCallChoices.not_called
+        report.save()
+
+        summary = self.summary()
+        self.assertEqual((summary.success, summary.not_called), (0, 1))
+
+    def test_backfill(self):
+        self.call(self.cases[0], False)
+        self.call(self.cases[1], True)
+        SessionSummary.objects.all().delete()
+
+        call_command('build_session_summaries', stdout=StringIO())
+
+        summary = self.summary()
+        self.assertEqual((summary.success, summary.failed, summary.calls), (1, 1, 2))
+
+    def test_summary_loaded_with_session(self):
+        self.call(self.cases[0], False)
+
+        session = Session.objects.select_related('summary').get(pk=self.session.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(session.get_report_stats(3), (1, 0, 2))
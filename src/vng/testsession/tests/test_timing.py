@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from prometheus_client import REGISTRY
+
+from ..timing import PhaseTimer
+
+
+class PhaseTimerTests(SimpleTestCase):
+
+    def test_server_timing(self):
+        timer = PhaseTimer()
+        with timer.phase('context'):
+            pass
+        timer.add('upstream', 0.25)
+
+        header = timer.server_timing()
+        names = [part.split(';')[0] for part in header.split(', ')]
+        self.assertEqual(names, ['context', 'upstream', 'total'])
+        self.assertIn('upstream;dur=250.0', header)
+
+    def test_observe(self):
+        labels = {'phase': 'upstream', 'session_type': 'timing-test', 'endpoint': 'ZRC'}
+        before = REGISTRY.get_sample_value('proxy_phase_duration_seconds_count', labels) or 0
+        timer = PhaseTimer()
+        timer.add('upstream', 0.2)
+
+        with self.assertLogs('performance', level='INFO'):
+            timer.observe('timing-test', 'ZRC', 'GET /api/v1/zaken')
+
+        self.assertEqual(REGISTRY.get_sample_value('proxy_phase_duration_seconds_count', labels), before + 1)
+        self.assertEqual(
+            REGISTRY.get_sample_value('proxy_phase_duration_seconds_bucket', dict(labels, le='0.25')), before + 1
+        )
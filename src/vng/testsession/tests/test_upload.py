@@ -0,0 +1,87 @@
+import hashlib
+import json
+from io import BytesIO
+
+import requests_mock
+from django_webtest import WebTest
+from subdomains.utils import reverse as reverse_sub
+
+from django.test import SimpleTestCase, override_settings
+
+from ..rewrite import UrlRewriter
+from ..upload import Upload
+from .factories import ExposedUrlFactory
+
+
+@override_settings(PROXY_STREAM_CHUNK_SIZE=7, PROXY_STREAM_REQUEST_PREVIEW=16)
+class UploadTests(SimpleTestCase):
+
+    def setUp(self):
+        self.rewriter = UrlRewriter([('https://abc-api-test.nl', 'https://ref.tst.vng.cloud/zrc')])
+
+    def upload(self, body, content_type):
+        return Upload(BytesIO(body), len(body), content_type, None, self.rewriter)
+
+    def test_json_rewritten(self):
+        body = b'{"zaak": "https://abc-api-test.nl/api/v1/zaken/1", "inhoud": "' + b'A' * 100 + b'"}'
+        upload = self.upload(body, 'application/json')
+
+        data = upload.body()
+        sent = data.read()
+        self.assertEqual(sent, body.replace(b'https://abc-api-test.nl', b'https://ref.tst.vng.cloud/zrc'))
+        self.assertEqual(len(data), len(sent))
+        self.assertEqual(upload.size, len(body))
+        self.assertEqual(upload.hexdigest, hashlib.sha256(body).hexdigest())
+        self.assertEqual(
+            upload.log_text(),
+            '{{"zaak": "https:\n[... truncated, {} bytes in total]'.format(len(body))
+        )
+
+    def test_binary_passed_through(self):
+        body = b'%PDF https://abc-api-test.nl \xff' * 10
+        upload = self.upload(body, 'application/pdf')
+
+        data = upload.body()
+        self.assertIs(data, upload)
+        self.assertEqual(len(data), len(body))
+        sent = b''.join(iter(lambda: data.read(8192), b''))
+        self.assertEqual(sent, body)
+        self.assertEqual(upload.log_text(), '[application/pdf body of {} bytes, not logged]'.format(len(body)))
+
+
+@override_settings(
+    SUBDOMAIN_SEPARATOR='-', PROXY_STREAM_REQUEST_THRESHOLD=100, PROXY_STREAM_CHUNK_SIZE=16, PROXY_WRITE_BEHIND=False
+)
+class UploadProxyTests(WebTest):
+
+    def setUp(self):
+        self.exposed_url = ExposedUrlFactory(vng_endpoint__url='https://ref.tst.vng.cloud/drc/')
+        self.exposed = reverse_sub('run_test', self.exposed_url.subdomain, kwargs={'relative_url': ''})
+
+    def test_rewritten_upload_sent_with_its_length(self):
+        body = json.dumps({
+            'informatieobjecttype': self.exposed + 'informatieobjecttypen/1',
+            'inhoud': 'A' * 500,
+        }).encode('utf-8')
+        expected = body.replace(self.exposed.encode('utf-8'), b'https://ref.tst.vng.cloud/drc/')
+        received = {}
+
+        def upstream(request, context):
+            received['headers'] = request.headers
+            received['body'] = request.body.read() if hasattr(request.body, 'read') else request.body
+            context.status_code = 201
+            return '{}'
+
+        url = reverse_sub('run_test', self.exposed_url.subdomain, kwargs={
+            'relative_url': 'enkelvoudiginformatieobjecten'
+        })
+        with requests_mock.Mocker() as m:
+            m.post('https://ref.tst.vng.cloud/drc/enkelvoudiginformatieobjecten', text=upstream)
+            self.app.post(
+                url, body, content_type='application/json', user=self.exposed_url.session.user,
+                extra_environ={'HTTP_HOST': '{}-example.com'.format(self.exposed_url.subdomain)}, status=201,
+            )
+
+        self.assertEqual(received['body'], expected)
+        self.assertEqual(received['headers']['Content-Length'], str(len(expected)))
+        self.assertNotIn('Transfer-Encoding', received['headers'])
@@ -0,0 +1,53 @@
+import requests
+import requests_mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..upstream import UpstreamClient
+
+
+@override_settings(
+    PROXY_UPSTREAM_POOL_SIZE=5,
+    PROXY_UPSTREAM_CONNECT_TIMEOUT=1,
+    PROXY_UPSTREAM_READ_TIMEOUT=2,
+    PROXY_UPSTREAM_CONNECT_RETRIES=0
+)
+class UpstreamClientTests(SimpleTestCase):
+
+    def test_session_per_host(self):
+        client = UpstreamClient()
+        with requests_mock.Mocker() as m:
+            m.get('https://ref.tst.vng.cloud/zrc/api/v1/zaken', json=[])
+            m.get('https://ref.tst.vng.cloud/drc/api/v1/objecten', json=[])
+            m.get('http://10.0.0.1:8000/api/v1/', json=[])
+            client.request('get', 'https://ref.tst.vng.cloud/zrc/api/v1/zaken')
+            client.request('get', 'https://ref.tst.vng.cloud/drc/api/v1/objecten')
+            client.request('get', 'http://10.0.0.1:8000/api/v1/')
+
+        self.assertEqual(set(client.sessions), {'https://ref.tst.vng.cloud', 'http://10.0.0.1:8000'})
+        stats = client.stats()
+        self.assertEqual(stats['https://ref.tst.vng.cloud']['requests'], 2)
+        self.assertEqual(stats['http://10.0.0.1:8000']['requests'], 1)
+
+    def test_timeout_and_redirects(self):
+        client = UpstreamClient()
+        with requests_mock.Mocker() as m:
+            m.post('https://ref.tst.vng.cloud/zrc/api/v1/zaken', status_code=302, headers={'location': '/'})
+            response = client.request('post', 'https://ref.tst.vng.cloud/zrc/api/v1/zaken', data='{}')
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(m.last_request.timeout, (1, 2))
+
+    def test_failure_counted(self):
+        client = UpstreamClient()
+        with requests_mock.Mocker() as m:
+            m.get('https://ref.tst.vng.cloud/zrc/api/v1/zaken', exc=requests.exceptions.ConnectTimeout)
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                client.request('get', 'https://ref.tst.vng.cloud/zrc/api/v1/zaken')
+        self.assertEqual(client.stats()['https://ref.tst.vng.cloud']['failures'], 1)
+
+    def test_cookies_not_kept(self):
+        client = UpstreamClient()
+        with requests_mock.Mocker() as m:
+            m.get('https://ref.tst.vng.cloud/', headers={'Set-Cookie': 'sessionid=secret; Path=/'})
+            client.request('get', 'https://ref.tst.vng.cloud/')
+        self.assertEqual(len(client.sessions['https://ref.tst.vng.cloud'].cookies), 0)
@@ -26,6 +26,7 @@ from ..models import (
     ScenarioCase, VNGEndpoint, ExposedUrl, TestSession, InjectHeader
 )
 from ..permission import IsOwner
+from ..rewrite import UrlRewriter, build_rewrite_table
 
 from .factories import (
     SessionFactory, SessionTypeFactory, VNGEndpointDockerFactory, ExposedUrlEchoFactory, VNGEndpointEchoFactory,
@@ -858,41 +859,40 @@ class TestAuthProxy(WebTest):
 class TestRewriteBody(WebTest):
 
     def setUp(self):
-        self.euv = RunTest()
         self.ep = ExposedUrlFactory()
         self.ep_docker = VNGEndpointDockerFactory()
         self.ep_d = ExposedUrlFactory(vng_endpoint=self.ep_docker, docker_url='127.0.0.1')
-        self.host = 'example.com'
+        self.ep_s = ExposedUrlFactory(vng_endpoint__url='https://test.openzaak.nl/zaken/api/v1/')
 
-        self.ep_s = ExposedUrlFactory()
-        self.ep_s.vng_endpoint.subdomain = 'sub'
-        self.ep_s.vng_endpoint.save()
-        self.host_sub = 'sub.example.com'
+        table = build_rewrite_table([self.ep, self.ep_d, self.ep_s])
+        self.request_rewriter = UrlRewriter.for_request(table)
+        self.response_rewriter = UrlRewriter.for_response(table)
+        self.host, self.host_d, self.host_s = [exposed for upstream, exposed in table]
 
     def test_request(self):
         content = 'dummy{}/dummy'.format(self.host)
-        res = self.euv.sub_url_request(content, self.host, self.ep)
+        res = self.request_rewriter.rewrite(content)
         self.assertEqual('dummy{}/dummy'.format(self.ep.vng_endpoint.url), res)
 
-    def test_request_subdomain(self):
-        content = 'dummy{}/dummy'.format(self.host_sub)
-        res = self.euv.sub_url_request(content, self.host_sub, self.ep_s)
-        self.assertEqual('dummy{}/dummy'.format(self.ep_s.vng_endpoint.url), res)
+    def test_request_other_endpoint(self):
+        content = 'dummy{}dummy'.format(self.host_s)
+        res = self.request_rewriter.rewrite(content)
+        self.assertEqual('dummy{}dummy'.format(self.ep_s.vng_endpoint.url), res)
 
     def test_response(self):
         content = 'dummy{}/dummy'.format(self.ep.vng_endpoint.url)
-        res = self.euv.sub_url_response(content, self.host, self.ep)
+        res = self.response_rewriter.rewrite(content)
         self.assertEqual('dummy{}/dummy'.format(self.host), res)
 
     def test_request_docker(self):
-        content = 'dummy{}/dummy'.format(self.host)
-        res = self.euv.sub_url_request(content, self.host, self.ep_d)
-        self.assertEqual('dummy://{}:8080/dummy'.format(self.ep_d.docker_url), res)
+        content = 'dummy{}dummy'.format(self.host_d)
+        res = self.request_rewriter.rewrite(content)
+        self.assertEqual('dummy{}://{}:8080/dummy'.format(settings.DEFAULT_URL_SCHEME, self.ep_d.docker_url), res)
 
     def test_response_docker(self):
-        content = 'dummy://{}:8080/dummy'.format(self.ep_d.docker_url)
-        res = self.euv.sub_url_response(content, self.host, self.ep_d)
-        self.assertEqual('dummy{}/dummy'.format(self.host), res)
+        content = 'dummy{}://{}:8080/dummy'.format(settings.DEFAULT_URL_SCHEME, self.ep_d.docker_url)
+        res = self.response_rewriter.rewrite(content)
+        self.assertEqual('dummy{}dummy'.format(self.host_d), res)
 
 
 @override_settings(SUBDOMAIN_SEPARATOR='-')
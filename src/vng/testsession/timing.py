@@ -0,0 +1,72 @@
+"""
+Timing of the phases of the proxied calls.
+
+A ``PhaseTimer`` measures the phases of one call (loading the context,
+calling the upstream, rewriting, logging, updating the report). The phases
+are returned to the client in the ``Server-Timing`` header, written to the
+``performance`` log and added to a Prometheus histogram labelled by session
+type and endpoint.
+
+With several worker processes, set the ``prometheus_multiproc_dir``
+environment variable to a shared directory so the metrics endpoint
+aggregates the histograms of all of them.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CollectorRegistry, Histogram, REGISTRY, generate_latest, multiprocess
+
+performance_logger = logging.getLogger('performance')
+
+PHASE_DURATION = Histogram(
+    'proxy_phase_duration_seconds',
+    'Duration of the phases of the calls through the proxy',
+    ['phase', 'session_type', 'endpoint'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+class PhaseTimer:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, duration):
+        self.phases.append((name, duration))
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join(
+            '{};dur={:.1f}'.format(name, duration * 1000)
+            for name, duration in self.phases + [('total', self.total())]
+        )
+
+    def observe(self, session_type, endpoint, path=''):
+        phases = self.phases + [('total', self.total())]
+        for name, duration in phases:
+            PHASE_DURATION.labels(name, session_type, endpoint).observe(duration)
+        performance_logger.info('proxy | %s | %s | %s | %s', session_type, endpoint, path, ' '.join(
+            '{}={:.1f}ms'.format(name, duration * 1000) for name, duration in phases
+        ))
+
+
+def render_metrics():
+    if 'prometheus_multiproc_dir' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
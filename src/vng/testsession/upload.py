@@ -0,0 +1,143 @@
+"""
+Streaming of the large request bodies to the upstream services.
+
+A request body larger than ``PROXY_STREAM_REQUEST_THRESHOLD`` bytes is not
+read into memory: an ``Upload`` reads it from the client in chunks of
+``PROXY_STREAM_CHUNK_SIZE`` bytes. Binary and multipart bodies are passed
+through while they are sent upstream. Text and JSON bodies are rewritten
+chunk by chunk into a spooled temporary file, which is kept in memory up to
+``PROXY_STREAM_REQUEST_THRESHOLD`` bytes and written to disk above it, and
+sent from there. Either way the upstream gets a ``Content-Length``: the
+reference APIs read an empty body when a request is sent chunked.
+
+Only the SHA-256, the size and the first ``PROXY_STREAM_REQUEST_PREVIEW``
+bytes of the body are kept for the session log.
+"""
+import hashlib
+import tempfile
+
+from django.conf import settings
+
+from .rewrite import BINARY, MULTIPART, binary_log_text, body_kind, content_type_param, decode_stream
+
+
+def is_large_upload(request):
+    threshold = settings.PROXY_STREAM_REQUEST_THRESHOLD
+    if threshold is None:
+        return False
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return False
+    return length > threshold
+
+
+class SpooledBody:
+    '''
+    A rewritten body in a spooled temporary file, sent with its length
+    '''
+
+    def __init__(self, file, length):
+        self.file = file
+        self.length = length
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+    def __len__(self):
+        return self.length
+
+    def close(self):
+        self.file.close()
+
+
+class Upload:
+
+    TRUNCATED = '\n[... truncated, {} bytes in total]'
+
+    def __init__(self, stream, length, content_type, encoding, rewriter):
+        self.stream = stream
+        self.length = length
+        self.remaining = length
+        self.content_type = content_type
+        self.encoding = encoding or content_type_param(content_type, 'charset') or 'utf-8'
+        self.rewriter = rewriter
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.preview = b''
+        self.passthrough = rewriter.regex is None or body_kind(content_type) in (BINARY, MULTIPART)
+        self.spooled = None
+
+    @classmethod
+    def from_request(cls, request, rewriter):
+        return cls(request, int(request.META['CONTENT_LENGTH']), request.META.get('CONTENT_TYPE'),
+                   request.encoding, rewriter)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        chunk = self.stream.read(size)
+        if not chunk:
+            # the client went away
+            self.remaining = 0
+            return b''
+        self.remaining -= len(chunk)
+        self.feed(chunk)
+        return chunk
+
+    def __len__(self):
+        return self.length
+
+    def feed(self, chunk):
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        missing = settings.PROXY_STREAM_REQUEST_PREVIEW - len(self.preview)
+        if missing > 0:
+            self.preview += chunk[:missing]
+
+    def chunks(self):
+        while True:
+            chunk = self.read(settings.PROXY_STREAM_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def rewritten(self):
+        for text in self.rewriter.rewrite_stream(decode_stream(self.chunks(), self.encoding)):
+            yield text.encode(self.encoding)
+
+    def body(self):
+        '''
+        Return the body to send upstream, with its length: the upload itself
+        when it is passed through, the spooled rewritten body otherwise
+        '''
+        if self.passthrough:
+            return self
+        spool = tempfile.SpooledTemporaryFile(max_size=settings.PROXY_STREAM_REQUEST_THRESHOLD)
+        for chunk in self.rewritten():
+            spool.write(chunk)
+        length = spool.tell()
+        spool.seek(0)
+        self.spooled = SpooledBody(spool, length)
+        return self.spooled
+
+    def close(self):
+        if self.spooled is not None:
+            self.spooled.close()
+
+    @property
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+    def log_text(self):
+        '''
+        Return the text logged in place of the body
+        '''
+        if body_kind(self.content_type) in (BINARY, MULTIPART):
+            return binary_log_text(self.content_type, self.size)
+        text = self.preview.decode(self.encoding, errors='replace')
+        if self.size > len(self.preview):
+            text += self.TRUNCATED.format(self.size)
+        return text
@@ -0,0 +1,107 @@
+"""
+Pooled HTTP client used by the proxy to reach the upstream services.
+
+One ``requests.Session`` is kept per upstream host (scheme and netloc), so the
+TCP/TLS connections to the reference implementations and to the load balancers
+of the sessions are reused between proxied calls. The pool size, the
+timeouts and the number of retries on connection failures are configured
+through the ``PROXY_UPSTREAM_*`` settings.
+"""
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from django.conf import settings
+
+
+class UpstreamClient:
+
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None, connect_retries=None):
+        self.pool_size = pool_size or settings.PROXY_UPSTREAM_POOL_SIZE
+        self.timeout = (
+            connect_timeout or settings.PROXY_UPSTREAM_CONNECT_TIMEOUT,
+            read_timeout or settings.PROXY_UPSTREAM_READ_TIMEOUT,
+        )
+        self.connect_retries = settings.PROXY_UPSTREAM_CONNECT_RETRIES if connect_retries is None else connect_retries
+        self.sessions = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def get_session(self, host):
+        session = self.sessions.get(host)
+        if session is not None:
+            return session
+        with self.lock:
+            if host not in self.sessions:
+                retry = Retry(
+                    total=self.connect_retries, connect=self.connect_retries,
+                    read=0, redirect=0, status=0, raise_on_status=False
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_size,
+                    max_retries=retry, pool_block=False
+                )
+                session = requests.Session()
+                # the session is shared by all the callers, never keep cookies
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.sessions[host] = session
+                self.counters[host] = Counter()
+            return self.sessions[host]
+
+    def request(self, method, url, **kwargs):
+        parsed = urlsplit(url)
+        host = '{}://{}'.format(parsed.scheme, parsed.netloc)
+        session = self.get_session(host)
+        kwargs.setdefault('timeout', self.timeout)
+        kwargs.setdefault('allow_redirects', False)
+        counter = self.counters[host]
+        counter['requests'] += 1
+        try:
+            return session.request(method.upper(), url, **kwargs)
+        except requests.exceptions.RequestException:
+            counter['failures'] += 1
+            raise
+
+    def stats(self):
+        '''
+        Return for each upstream host the number of requests and failures,
+        together with the state of its connection pools
+        '''
+        result = {}
+        for host, session in list(self.sessions.items()):
+            pools = []
+            for adapter in set(session.adapters.values()):
+                for key in adapter.poolmanager.pools.keys():
+                    pool = adapter.poolmanager.pools.get(key)
+                    if pool is None:
+                        continue
+                    pools.append({
+                        'host': pool.host,
+                        'port': pool.port,
+                        'connections_opened': pool.num_connections,
+                        'requests': pool.num_requests,
+                        'idle_connections': pool.pool.qsize() if pool.pool is not None else 0,
+                        'max_size': self.pool_size,
+                    })
+            result[host] = dict(self.counters[host], pools=pools)
+        return result
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_upstream_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = UpstreamClient()
+    return _client
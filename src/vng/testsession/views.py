@@ -19,12 +19,15 @@ from vng.servervalidation.models import ServerRun, TestScenario, API
 
 from .models import (
     ScenarioCase, Session, SessionLog, ExposedUrl,
-    TestSession, Report, SessionType, VNGEndpoint
+    TestSession, SessionType, VNGEndpoint
 )
 
+from .logwriter import flush_log_writer
+from .pagination import KeysetPage
+from .results import SessionResult
 from .task import bootstrap_session, stop_session
 from .forms import SessionForm
-from ..utils import choices
+from ..utils import choices, pdf
 from ..utils.views import OwnerSingleObject, PDFGenerator
 
 
@@ -46,7 +49,12 @@ class SessionListView(LoginRequiredMixin, ListView):
         context.update({
             'choices': _choices,
         })
-        sessions_related = [(session, *session.get_report_stats()) for session in context['object_list']]
+        sessions = context['object_list']
+        case_counts = SessionType.count_scenario_cases({session.session_type_id for session in sessions})
+        sessions_related = [
+            (session, *session.get_report_stats(case_counts.get(session.session_type_id, 0)))
+            for session in sessions
+        ]
         context['object_list'] = sessions_related
         return context
 
@@ -56,7 +64,7 @@ class SessionListView(LoginRequiredMixin, ListView):
         '''
         return Session.objects.filter(
             user=self.request.user, session_type__api__id=self.kwargs['api_id']
-        ).order_by('-started')
+        ).select_related('summary').order_by('-started')
 
 
 class SessionFormView(FormView):
@@ -105,11 +113,23 @@ class SessionLogView(ListView):
     paginate_by = 200
 
     def get_queryset(self):
-        return SessionLog.objects.filter(session__uuid=self.kwargs['uuid']).order_by('date')
+        self.session = get_object_or_404(
+            Session.objects.select_related('session_type__api', 'summary'), uuid=self.kwargs['uuid']
+        )
+        # the bodies are only shown by the detail view
+        return SessionLog.objects.filter(session=self.session).only(
+            'uuid', 'date', 'session', 'method', 'url', 'response_status'
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        page = KeysetPage(
+            queryset, page_size, after=self.request.GET.get('after'), before=self.request.GET.get('before')
+        )
+        return None, page, page.object_list, page.has_other_pages()
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
-        session = get_object_or_404(Session, uuid=self.kwargs['uuid'])
+        session = self.session
         context['api_id'] = session.session_type.api.id
         stats = session.get_report_stats()
         _choices = dict(choices.StatusChoices.choices)
@@ -187,6 +207,7 @@ class StopSession(OwnerSingleObject, View):
 
         session.status = choices.StatusChoices.shutting_down
         session.save()
+        flush_log_writer()
         stop_session.delay(session.uuid)
         return HttpResponseRedirect(reverse('testsession:sessions', kwargs={
             'api_id': api_id
@@ -204,26 +225,7 @@ class SessionReport(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        report = list(Report.objects.filter(session_log__session=self.session))
-        report_ordered = []
-        for endpoint in context['session'].session_type.vngendpoint_set.all():
-            collection = endpoint.scenario_collection
-            if collection:
-                cases = collection.scenariocase_set.all()
-                if not cases.exists():
-                    continue
-
-                cases_ordered = []
-                for case in collection.scenariocase_set.all():
-                    is_in = False
-                    for rp in report:
-                        if rp.scenario_case == case:
-                            cases_ordered.append(rp)
-                            is_in = True
-                            break
-                    if not is_in:
-                        cases_ordered.append(Report(scenario_case=case, result=choices.HTTPCallChoices.not_called))
-                report_ordered.append((endpoint, cases_ordered))
+        report_ordered = SessionResult(self.session, details=True).endpoint_reports()
         context.update({
             'session': self.session,
             'object_list': report_ordered,
@@ -236,6 +238,9 @@ class SessionReportPdf(PDFGenerator, SessionReport):
 
     template_name = 'testsession/session-report-PDF.html'
 
+    def get_pdf_owner(self):
+        return (pdf.SESSION, self.session.uuid)
+
 
 class SessionTestReport(OwnerSingleObject):
 
@@ -246,9 +251,9 @@ class SessionTestReport(OwnerSingleObject):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        session = ExposedUrl.objects.filter(test_session=self.object).first().session
+        self.session = ExposedUrl.objects.filter(test_session=self.object).first().session
         context.update({
-            'session': session
+            'session': self.session
         })
         return context
 
@@ -257,6 +262,9 @@ class SessionTestReportPDF(PDFGenerator, SessionTestReport):
 
     template_name = 'testsession/session-test-report-PDF.html'
 
+    def get_pdf_owner(self):
+        return (pdf.SESSION, self.session.uuid, 'test', self.object.uuid)
+
     def parse_json(self, obj):
         parsed = json.loads(obj)
         for run in parsed['run']['executions']:
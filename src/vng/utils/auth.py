@@ -1,9 +1,23 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+
 from zds_client import ClientAuth
 
-def get_jwt(object):
+MAX_ENTRIES = 1024
+
+_credentials = {}
+_lock = threading.Lock()
+
+
+def get_jwt(object, **claims):
     return ClientAuth(
         client_id=object.client_id,
         secret=object.secret,
+        **claims
         # scopes=['zds.scopes.zaken.lezen',
         #         'zds.scopes.zaaktypes.lezen',
         #         'zds.scopes.zaken.aanmaken',
@@ -11,3 +25,52 @@ def get_jwt(object):
         #         'zds.scopes.zaken.bijwerken'],
         # zaaktypes=['*']
     )
+
+
+def credentials_key(client_id, secret, claims=None):
+    secret_hash = hashlib.sha256((secret or '').encode('utf-8')).hexdigest()
+    return (client_id, secret_hash, json.dumps(claims or {}, sort_keys=True))
+
+
+def get_jwt_credentials(object, min_lifetime=0, **claims):
+    '''
+    Return the JWT authorization header of the client credentials of the object,
+    with the extra claims (such as the scopes). A signed token is reused as long
+    as the APIs accept it for more than ``min_lifetime`` seconds, and at least
+    JWT_CREDENTIALS_MIN_LIFETIME seconds, so it does not expire while it is used.
+    '''
+    key = credentials_key(object.client_id, object.secret, claims)
+    now = time.monotonic()
+    min_lifetime = max(min_lifetime, settings.JWT_CREDENTIALS_MIN_LIFETIME)
+    entry = _credentials.get(key)
+    if entry is not None and entry[0] - now > min_lifetime:
+        return dict(entry[1])
+
+    credentials = get_jwt(object, **claims).credentials()
+    with _lock:
+        if len(_credentials) >= MAX_ENTRIES:
+            for expired in [k for k, value in _credentials.items() if value[0] <= now]:
+                del _credentials[expired]
+        _credentials[key] = (now + settings.JWT_CREDENTIALS_LIFETIME, credentials)
+    return dict(credentials)
+
+
+def invalidate_jwt_credentials(client_id):
+    with _lock:
+        for key in [key for key in _credentials if key[0] == client_id]:
+            del _credentials[key]
+
+
+def remember_jwt_credentials(instance):
+    instance._jwt_credentials = (instance.__dict__.get('client_id'), instance.__dict__.get('secret'))
+
+
+def check_jwt_credentials(instance):
+    '''
+    Drop the cached tokens of the instance if its credentials changed since it was loaded
+    '''
+    previous = getattr(instance, '_jwt_credentials', (None, None))
+    if previous != (instance.client_id, instance.secret):
+        invalidate_jwt_credentials(previous[0])
+        invalidate_jwt_credentials(instance.client_id)
+        remember_jwt_credentials(instance)
@@ -0,0 +1,82 @@
+"""
+Caching of the shields.io badges.
+
+The badges are polled constantly, so a badge is computed once and served from
+the default cache until its object changes. The entry of a badge is keyed by
+the kind and the identifier (the uuid in the url) of its object and by a
+version stamp; the signal handlers of the models renew the stamp whenever
+the object or its results change, so no database query is done to serve a
+cached badge. The stamp is renewed again once the change is committed, as a
+badge computed meanwhile still saw the former state. The stamps expire with
+the badges, so polling unknown objects leaves nothing behind.
+
+The responses carry an ``ETag`` and a ``Last-Modified`` header, so pollers
+revalidating a badge get a 304, and the ``Cache-Control`` header of
+``BADGE_CACHE_CONTROL``.
+"""
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+VERSION_KEY = 'badge-version:{}:{}'
+BADGE_KEY = 'badge:{}:{}:{}'
+
+SERVER_RUN = 'server-run'
+ENVIRONMENT = 'environment'
+SESSION = 'session'
+DESIGN_RULE_SESSION = 'design-rule-session'
+
+
+def get_badge_version(kind, key):
+    version_key = VERSION_KEY.format(kind, str(key).lower())
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(version_key, version, settings.BADGE_CACHE_TIMEOUT):
+            version = cache.get(version_key, version)
+    return version
+
+
+def renew_badge_version(kind, key):
+    cache.set(VERSION_KEY.format(kind, str(key).lower()), uuid.uuid4().hex, settings.BADGE_CACHE_TIMEOUT)
+
+
+def invalidate_badge(kind, key):
+    if key is not None:
+        renew_badge_version(kind, key)
+        transaction.on_commit(lambda: renew_badge_version(kind, key))
+
+
+def badge_response(request, kind, key, build):
+    '''
+    Return the response with the badge of the object, computed by ``build``
+    if it is not cached
+    '''
+    badge_key = BADGE_KEY.format(kind, str(key).lower(), get_badge_version(kind, key))
+    entry = cache.get(badge_key)
+    if entry is None:
+        badge = build()
+        content = json.dumps(badge, sort_keys=True, cls=DjangoJSONEncoder)
+        entry = {
+            'badge': badge,
+            'etag': '"{}"'.format(hashlib.md5(content.encode('utf-8')).hexdigest()),
+            'last_modified': int(time.time()),
+        }
+        cache.set(badge_key, entry, settings.BADGE_CACHE_TIMEOUT)
+
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+    if response is None:
+        response = JsonResponse(entry['badge'])
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    response['Cache-Control'] = settings.BADGE_CACHE_CONTROL
+    return response
@@ -8,6 +8,7 @@ from urllib.parse import urlparse
 from django.conf import settings
 
 from ..utils.commands import run_command_with_shell
+from .newman_pool import NewmanWorkerError, get_newman_pool
 
 logger = logging.getLogger(__name__)
 
@@ -34,9 +35,9 @@ class NewmanManager:
         self.file = file
         self.file_to_be_discarted = []
         self.global_vars = ''
+        self.env_vars = {}
         self.api_endpoint = api_endpoint
-        if not os.path.exists(self.REPORT_FOLDER):
-            os.makedirs(self.REPORT_FOLDER)
+        os.makedirs(self.REPORT_FOLDER, exist_ok=True)
 
     def __del__(self):
         for file in self.file_to_be_discarted:
@@ -51,23 +52,41 @@ class NewmanManager:
     def replace_parameters(self, _dict):
         for k, v in _dict.items():
             self.global_vars += self.ENV_VAR_SYNTAX.format(k, v)
+            self.env_vars[k] = str(v)
 
     def execute_test(self):
         self.file_path = self.file.path
         filename = str(uuid.uuid4())
-        output, error = self.run_command(
-            self.RUN_REPORT, self.newman_path, self.file_path, filename, filename
-        )
-        if error:
-            assert False, error
-            logger.exception(error)
-            raise DidNotRunException()
+        if settings.NEWMAN_BACKEND == 'pool':
+            self.run_in_pool(filename)
+        else:
+            output, error = self.run_command(
+                self.RUN_REPORT, self.newman_path, self.file_path, filename, filename
+            )
+            if error:
+                assert False, error
+                logger.exception(error)
+                raise DidNotRunException()
         f_html = open('{}/{}.html'.format(self.REPORT_FOLDER, filename))
         f_json = open('{}/{}.json'.format(self.REPORT_FOLDER, filename))
         self.file_to_be_discarted.append(f_html)
         self.file_to_be_discarted.append(f_json)
         return f_html, f_json
 
+    def run_in_pool(self, filename):
+        '''
+        Run the collection on a worker of the Newman pool
+        '''
+        try:
+            get_newman_pool().run(
+                self.file_path, self.env_vars,
+                '{}/{}.html'.format(self.REPORT_FOLDER, filename),
+                '{}/{}.json'.format(self.REPORT_FOLDER, filename),
+            )
+        except NewmanWorkerError as e:
+            logger.exception(e)
+            raise DidNotRunException(str(e)) from e
+
 
 class OpenAPIConverter:
     converter_path = os.path.join(settings.BASE_DIR, 'node_modules', 'openapi-to-postmanv2', 'bin', 'openapi2postmanv2.js')
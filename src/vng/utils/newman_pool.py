@@ -0,0 +1,208 @@
+"""
+Pool of long-lived Newman workers.
+
+Starting node and loading Newman takes seconds for every collection run. With
+``NEWMAN_BACKEND = 'pool'`` the ``NewmanManager`` hands its runs to a pool of
+at most ``NEWMAN_WORKERS`` node processes running ``newman_worker.js``, which
+take the run requests as JSON lines on their standard input and answer with
+the statistics of the run on their standard output. The reports are written
+to the same files as with the command line.
+
+A worker is checked with a ping before it is given a run, replaced when it
+does not answer, and recycled after a failed run and after
+``NEWMAN_WORKER_MAX_RUNS`` runs so the memory of node does not grow without
+bounds.
+
+The pool belongs to a process, so every celery child process has its own:
+a celery worker started with a concurrency of N can run up to
+N x ``NEWMAN_WORKERS`` node processes, each of which may grow its heap up to
+``NEWMAN_WORKER_MAX_HEAP`` MB. Size these settings for the memory of the host.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'newman_worker.js')
+MARKER = '@@newman-worker '
+
+
+class NewmanWorkerError(Exception):
+    pass
+
+
+class NewmanWorker:
+
+    # the command line of the worker, built from the settings if not given
+    command = None
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.runs = 0
+        self.process = subprocess.Popen(
+            self.get_command(),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=settings.BASE_DIR, universal_newlines=True,
+        )
+        self.lines = queue.Queue()
+        threading.Thread(target=self.read_lines, daemon=True).start()
+
+    def get_command(self):
+        if self.command is not None:
+            return self.command
+        return ['node', '--max-old-space-size={}'.format(settings.NEWMAN_WORKER_MAX_HEAP), WORKER_SCRIPT]
+
+    def read_lines(self):
+        for line in self.process.stdout:
+            self.lines.put(line)
+        self.lines.put(None)
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def request(self, message, timeout):
+        '''
+        Send the request and return its response
+
+        Raises:
+            NewmanWorkerError -- The worker did not answer in time or died
+        '''
+        message = dict(message, id=next(self.ids))
+        try:
+            self.process.stdin.write(json.dumps(message) + '\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            raise NewmanWorkerError('The Newman worker is gone') from e
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self.lines.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                raise NewmanWorkerError('The Newman worker did not answer in {} seconds'.format(timeout))
+            if line is None:
+                self.lines.put(None)
+                raise NewmanWorkerError('The Newman worker exited with {}'.format(self.process.wait()))
+            if not line.startswith(MARKER):
+                # output of a collection that did not go through the console
+                logger.debug('Newman worker: %s', line.rstrip())
+                continue
+            response = json.loads(line[len(MARKER):])
+            if response.get('id') == message['id']:
+                return response
+
+    def ping(self):
+        if not self.is_alive():
+            return False
+        try:
+            return self.request({'type': 'ping'}, settings.NEWMAN_WORKER_PING_TIMEOUT).get('ok', False)
+        except NewmanWorkerError:
+            return False
+
+    def run(self, collection, env_vars, html, json_report):
+        self.runs += 1
+        return self.request({
+            'type': 'run',
+            'collection': collection,
+            'envVar': env_vars,
+            'html': html,
+            'json': json_report,
+        }, settings.NEWMAN_RUN_TIMEOUT)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+
+class NewmanPool:
+
+    def __init__(self, size, max_runs):
+        self.max_runs = max_runs
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.workers = set()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        self.slots.acquire()
+        try:
+            while True:
+                try:
+                    worker = self.idle.get_nowait()
+                except queue.Empty:
+                    break
+                if worker.ping():
+                    return worker
+                logger.warning('Replacing a Newman worker that does not answer')
+                self.discard(worker)
+            worker = NewmanWorker()
+            with self.lock:
+                self.workers.add(worker)
+            return worker
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, worker, broken=False):
+        if broken or worker.runs >= self.max_runs or not worker.is_alive():
+            self.discard(worker)
+        else:
+            self.idle.put(worker)
+        self.slots.release()
+
+    def discard(self, worker):
+        with self.lock:
+            self.workers.discard(worker)
+        worker.close()
+
+    def run(self, collection, env_vars, html, json_report):
+        '''
+        Run the collection on a worker and return the statistics of the run
+
+        Raises:
+            NewmanWorkerError -- The run could not be done
+        '''
+        worker = self.acquire()
+        broken = True
+        try:
+            response = worker.run(collection, env_vars, html, json_report)
+            # node may be left in a bad state by the run
+            broken = not response.get('ok')
+        finally:
+            self.release(worker, broken)
+        if not response.get('ok'):
+            raise NewmanWorkerError(response.get('error'))
+        return response
+
+    def close(self):
+        with self.lock:
+            workers = list(self.workers)
+            self.workers.clear()
+        for worker in workers:
+            worker.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_newman_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = NewmanPool(settings.NEWMAN_WORKERS, settings.NEWMAN_WORKER_MAX_RUNS)
+                atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,93 @@
+/*
+ * Long-lived Newman worker, see vng/utils/newman_pool.py
+ *
+ * Reads one JSON request per line on stdin and writes one JSON response per
+ * line on stdout, prefixed by the marker below so the output of the
+ * collections is not mistaken for a response. The requests are handled one
+ * at a time:
+ *
+ *   {"id": 1, "type": "ping"}
+ *   {"id": 2, "type": "run", "collection": "...", "envVar": {"name": "value"},
+ *    "html": "report.html", "json": "report.json"}
+ */
+'use strict';
+
+const readline = require('readline');
+const newman = require('newman');
+
+const MARKER = '@@newman-worker ';
+
+// whatever the collections log must not get in the way of the responses
+console.log = console.error;
+console.info = console.error;
+
+function respond(message) {
+    process.stdout.write(MARKER + JSON.stringify(message) + '\n');
+}
+
+function run(request, done) {
+    const envVar = Object.keys(request.envVar || {}).map(key => ({key: key, value: request.envVar[key]}));
+    newman.run({
+        collection: request.collection,
+        envVar: envVar,
+        reporters: ['htmlextra', 'json'],
+        reporter: {
+            htmlextra: {export: request.html, darkTheme: true, testPaging: true, logs: true},
+            json: {export: request.json},
+        },
+    }, (error, summary) => {
+        if (error) {
+            done({id: request.id, ok: false, error: String(error.stack || error)});
+            return;
+        }
+        done({
+            id: request.id,
+            ok: true,
+            stats: summary.run.stats,
+            failures: summary.run.failures.length,
+            error: summary.error ? String(summary.error) : null,
+        });
+    });
+}
+
+const queue = [];
+let busy = false;
+
+function next() {
+    if (busy || !queue.length) {
+        return;
+    }
+    const request = queue.shift();
+    if (request.type === 'ping') {
+        respond({id: request.id, ok: true, memory: process.memoryUsage().rss});
+        next();
+        return;
+    }
+    busy = true;
+    try {
+        run(request, response => {
+            busy = false;
+            respond(response);
+            next();
+        });
+    } catch (error) {
+        busy = false;
+        respond({id: request.id, ok: false, error: String(error.stack || error)});
+        next();
+    }
+}
+
+readline.createInterface({input: process.stdin}).on('line', line => {
+    if (!line.trim()) {
+        return;
+    }
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (error) {
+        respond({id: null, ok: false, error: 'Invalid request: ' + error.message});
+        return;
+    }
+    queue.push(request);
+    next();
+}).on('close', () => process.exit(0));
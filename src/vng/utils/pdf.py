@@ -0,0 +1,140 @@
+"""
+Rendering of the PDF reports off the request.
+
+The HTML of a report is rendered in the request, which is fast, and the PDF
+is rendered from it by WeasyPrint in a celery task, which can take tens of
+seconds for large reports. The PDFs are stored in ``PDF_CACHE_FOLDER`` of
+the default storage under the object they report on (a session or a provider
+run) and the SHA-256 of the HTML they were rendered from, so an unchanged
+report is served directly and a changed report gets a new PDF, which replaces
+the former PDFs of the report. The PDFs of an object are deleted when the
+object changes. While a PDF is rendered the views answer with a "rendering"
+page, and when its rendering failed with an error page until a new rendering
+can be started.
+"""
+import hashlib
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+RENDERING_KEY = 'pdf-rendering:{}'
+FAILED_KEY = 'pdf-failed:{}'
+
+SESSION = 'session'
+SERVER_RUN = 'server-run'
+
+# the token of the forms changes at every request and is of no use in a PDF
+CSRF_TOKEN = re.compile(r'''(name=["']csrfmiddlewaretoken["'] value=["'])[^"']*''')
+
+
+class RenderingFailed(Exception):
+    pass
+
+
+def pdf_path(name):
+    return '{}/{}.pdf'.format(settings.PDF_CACHE_FOLDER, name)
+
+
+def html_path(name):
+    return '{}/{}.html'.format(settings.PDF_CACHE_FOLDER, name)
+
+
+def report_name(owner):
+    '''
+    Return the name of the report of the owner, a tuple starting with the kind
+    and the key of the object the report is on
+    '''
+    return '-'.join(str(part) for part in owner)
+
+
+def stored_files(prefix):
+    '''
+    Return the names of the files in ``PDF_CACHE_FOLDER`` starting with the prefix
+    '''
+    try:
+        files = default_storage.listdir(settings.PDF_CACHE_FOLDER)[1]
+    except FileNotFoundError:
+        return []
+    return [name for name in files if name.startswith(prefix)]
+
+
+def prepare_html(html, base_url):
+    '''
+    Return the HTML to render and its digest
+    '''
+    html = CSRF_TOKEN.sub(r'\1', html)
+    digest = hashlib.sha256('{}\n{}'.format(base_url, html).encode('utf-8')).hexdigest()
+    return html, digest
+
+
+def request_pdf(html, base_url, owner):
+    '''
+    Start the rendering of the PDF of the HTML if it is not stored nor being rendered
+
+    Returns:
+        Tuple -- The name of the PDF and whether it is ready
+
+    Raises:
+        RenderingFailed -- The last rendering of the PDF failed
+    '''
+    from .task import render_pdf
+
+    html, digest = prepare_html(html, base_url)
+    name = '{}-{}'.format(report_name(owner), digest)
+    if default_storage.exists(pdf_path(name)):
+        return name, True
+    if cache.get(FAILED_KEY.format(name)):
+        raise RenderingFailed(name)
+    if cache.add(RENDERING_KEY.format(name), True, settings.PDF_RENDER_TIMEOUT):
+        if default_storage.exists(html_path(name)):
+            default_storage.delete(html_path(name))
+        default_storage.save(html_path(name), ContentFile(html.encode('utf-8')))
+        render_pdf.delay(name, base_url)
+    # done already when the tasks are run eagerly
+    if cache.get(FAILED_KEY.format(name)):
+        raise RenderingFailed(name)
+    return name, default_storage.exists(pdf_path(name))
+
+
+def render_stored_html(name, base_url):
+    '''
+    Render the PDF of the stored HTML of the name, store it and delete the
+    former PDFs of the report
+    '''
+    # WeasyPrint loads cairo and pango, only the workers rendering PDFs need them
+    from weasyprint import HTML
+
+    try:
+        if default_storage.exists(pdf_path(name)) or not default_storage.exists(html_path(name)):
+            return
+        with default_storage.open(html_path(name)) as f:
+            html = f.read().decode('utf-8')
+        pdf = HTML(string=html, base_url=base_url).write_pdf()
+        default_storage.save(pdf_path(name), ContentFile(pdf))
+        default_storage.delete(html_path(name))
+        report = name.rpartition('-')[0]
+        for stored in stored_files(report + '-'):
+            stored_name = stored.rpartition('.')[0]
+            # not the other reports on the same object, whose names extend this one
+            if stored.endswith('.pdf') and stored_name != name and stored_name.rpartition('-')[0] == report:
+                default_storage.delete('{}/{}'.format(settings.PDF_CACHE_FOLDER, stored))
+    except Exception:
+        logger.exception('The PDF %s could not be rendered', name)
+        # the same HTML would fail again, so it is not rendered again for a while
+        cache.set(FAILED_KEY.format(name), True, settings.PDF_RENDER_TIMEOUT)
+    finally:
+        cache.delete(RENDERING_KEY.format(name))
+
+
+def invalidate_pdfs(kind, key):
+    '''
+    Delete the stored PDFs of the object
+    '''
+    for stored in stored_files('{}-'.format(report_name((kind, key)))):
+        default_storage.delete('{}/{}'.format(settings.PDF_CACHE_FOLDER, stored))
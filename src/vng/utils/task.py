@@ -0,0 +1,7 @@
+from ..celery.celery import app
+from .pdf import render_stored_html
+
+
+@app.task
+def render_pdf(name, base_url):
+    render_stored_html(name, base_url)
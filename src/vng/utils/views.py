@@ -1,12 +1,12 @@
 import functools
 from collections.abc import Iterable
 
-from weasyprint import HTML
-
 from django import http
-from django.http import Http404, HttpResponse
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.conf import settings
 from django.template import loader, TemplateDoesNotExist
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, render
 from django.views.defaults import ERROR_500_TEMPLATE_NAME
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext_lazy as _
@@ -17,6 +17,8 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic.list import MultipleObjectMixin, MultipleObjectTemplateResponseMixin, ListView
 from django.views.generic.detail import DetailView
 
+from .pdf import RenderingFailed, pdf_path, request_pdf
+
 
 def rsetattr(obj, attr, val):
     pre, _, post = attr.rpartition('.')
@@ -116,11 +118,30 @@ class OwnerSingleObject(ObjectOwner, DetailView):
 
 
 class PDFGenerator():
+    '''
+    Serve the view rendered as PDF; the PDF is rendered by a celery task and
+    a "rendering" page is returned until it is ready, or an error page when
+    it could not be rendered, see ``vng.utils.pdf``
+    '''
+
+    def get_pdf_owner(self):
+        '''
+        Return the (kind, key) of the object the report is on, whose changes drop
+        the PDF, followed by what tells the report from the other reports on it
+        '''
+        raise NotImplementedError
 
     def get(self, request, *args, **kwargs):
-        response = super().get(request, *args, **kwargs).render().content.decode('utf-8')
-        pdf = HTML(string=response, base_url=request.build_absolute_uri('/')).write_pdf()
-        response = HttpResponse(pdf, content_type='application/pdf')
+        html = super().get(request, *args, **kwargs).render().content.decode('utf-8')
+        try:
+            name, ready = request_pdf(html, request.build_absolute_uri('/'), self.get_pdf_owner())
+        except RenderingFailed:
+            return render(request, 'pdf-failed.html', status=500)
+        if not ready:
+            response = render(request, 'pdf-rendering.html', {'refresh': settings.PDF_RENDER_REFRESH}, status=202)
+            response['Retry-After'] = str(settings.PDF_RENDER_REFRESH)
+            return response
+        response = FileResponse(default_storage.open(pdf_path(name)), content_type='application/pdf')
         if hasattr(self, 'filename'):
             response['Content-Disposition'] = 'attachment; filename="{}"'.format(self.filename)
         return response